@@ -0,0 +1,196 @@
+import os
+import json
+import asyncio
+import logging
+from datetime import datetime
+from typing import AsyncIterator, Union
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlmodel.ext.asyncio.session import AsyncSession
+from models import Episode, EpisodeCreate, GenerationStatus, PENDING_TITLE
+from generation_queue import generation_queue
+from title_service import title_service
+from episode_queries import summarize_episode
+from event_hub import event_hub
+from database import async_session
+from metrics import FALLBACKS
+from tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+class BatchTooLarge(ValueError):
+    """Raised when an import has more records or bytes than the configured limits"""
+
+def validate_record(raw) -> Union[EpisodeCreate, str]:
+    """An EpisodeCreate, or the error message if the record doesn't validate"""
+    try:
+        return EpisodeCreate.model_validate(raw)
+    except ValidationError as e:
+        return "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors())
+
+def parse_line(line: bytes) -> Union[EpisodeCreate, str]:
+    try:
+        return validate_record(json.loads(line))
+    except json.JSONDecodeError as e:
+        return f"Invalid JSON: {e.msg}"
+    except UnicodeDecodeError:
+        return "Invalid JSON: not UTF-8"
+
+class BatchImporter:
+    def __init__(self, max_items: int = 500, max_body_bytes: int = 1024 * 1024, title_batch_size: int = 10):
+        self.max_items = max_items
+        self.max_body_bytes = max_body_bytes
+        # Descriptions sent per batched title completion
+        self.title_batch_size = title_batch_size
+        self.tasks: set[asyncio.Task] = set()
+
+    async def read_records(self, chunks: AsyncIterator[bytes], content_type: str) -> list[Union[EpisodeCreate, str]]:
+        """Read a JSON array or NDJSON body into EpisodeCreate records as it arrives.
+
+        NDJSON is parsed line by line, so an import over either limit is refused without
+        reading the rest of it. Records that don't validate are kept as an error message
+        so results line up with input positions.
+        """
+        if "ndjson" in content_type or "jsonlines" in content_type:
+            is_json = False
+        elif "application/json" in content_type:
+            is_json = True
+        else:
+            # Decided by the first byte of the body
+            is_json = None
+        records: list[Union[EpisodeCreate, str]] = []
+        buffer = b""
+        received = 0
+
+        def add_lines(lines: list[bytes]):
+            records.extend(parse_line(line) for line in lines if line.strip())
+            if len(records) > self.max_items:
+                raise BatchTooLarge(f"At most {self.max_items} episodes per import")
+
+        async for chunk in chunks:
+            received += len(chunk)
+            if received > self.max_body_bytes:
+                raise BatchTooLarge(f"Imports are limited to {self.max_body_bytes} bytes")
+            buffer += chunk
+            if is_json is None and buffer.strip():
+                is_json = buffer.lstrip().startswith(b"[")
+            if is_json is False:
+                *lines, buffer = buffer.split(b"\n")
+                add_lines(lines)
+
+        if not is_json:
+            add_lines([buffer])
+            return records
+        try:
+            raw_records = json.loads(buffer)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON: {e.msg}")
+        if isinstance(raw_records, dict):
+            raw_records = [raw_records]
+        if not isinstance(raw_records, list):
+            raise ValueError("Expected a JSON array of episodes")
+        if len(raw_records) > self.max_items:
+            raise BatchTooLarge(f"At most {self.max_items} episodes per import")
+        return [validate_record(raw) for raw in raw_records]
+
+    async def insert(self, session: AsyncSession, records: list[EpisodeCreate]) -> list[Episode]:
+        """Insert every record in one transaction with a single bulk INSERT ... RETURNING"""
+        now = datetime.utcnow()
+        rows = [
+            {
+                "title": PENDING_TITLE,
+                "description": record.description,
+                "submitted_by": record.submitted_by,
+                "timestamp": now,
+                "updated_at": now,
+                "generation_status": GenerationStatus.PENDING.value,
+            }
+            for record in records
+        ]
+        episodes = list((await session.exec(
+            insert(Episode).returning(Episode, sort_by_parameter_order=True), params=rows
+        )).scalars().all())
+        await session.commit()
+        return episodes
+
+    async def generate_titles(self, chunk: list[tuple[int, Episode]], use_cache: bool):
+        """Fill in titles for a chunk with one completion; on failure each episode's own title stage runs instead"""
+        if len(chunk) < 2:
+            return
+        try:
+            with tracer.span("title.batch", size=len(chunk)):
+                titles = await title_service.generate_episode_titles([episode.description for _, episode in chunk], use_cache=use_cache)
+        except Exception as e:
+            FALLBACKS.inc(stage="title_batch")
+            logger.warning("⚠️  Batched title generation failed, falling back to one request per episode: %s: %s", type(e).__name__, e)
+            return
+        for (_, episode), title in zip(chunk, titles):
+            await generation_queue.save_stage(episode.id, title=title)
+
+    async def generate(self, index: int, episode: Episode, bypass_cache: bool, results: asyncio.Queue):
+        # Through the shared queue, so imports and single submissions share GENERATION_WORKERS
+        await generation_queue.generate(episode.id, bypass_cache)
+        async with async_session() as session:
+            saved = await session.get(Episode, episode.id)
+        if saved:
+            results.put_nowait({"index": index, **summarize_episode(saved)})
+        else:
+            results.put_nowait({"index": index, "id": episode.id, "error": "Episode was deleted during generation"})
+
+    async def run(self, accepted: list[tuple[int, Episode]], bypass_ids: set[int], results: asyncio.Queue):
+        """Generate every accepted episode, reporting each one to `results` as it finishes"""
+        async def run_chunk(chunk: list[tuple[int, Episode]]):
+            # Skip the cache for the whole batched prompt if anyone in it asked to
+            use_cache = not any(episode.id in bypass_ids for _, episode in chunk)
+            await self.generate_titles(chunk, use_cache)
+            await asyncio.gather(*(self.generate(index, episode, episode.id in bypass_ids, results) for index, episode in chunk))
+
+        chunks = [accepted[i:i + self.title_batch_size] for i in range(0, len(accepted), self.title_batch_size)]
+        try:
+            await asyncio.gather(*(run_chunk(chunk) for chunk in chunks))
+        finally:
+            results.put_nowait(None)
+
+    async def import_records(self, session: AsyncSession, records: list[Union[EpisodeCreate, str]]) -> AsyncIterator[dict]:
+        """Insert the valid records, start generation and return an iterator of per-item results"""
+        valid = [(index, record) for index, record in enumerate(records) if isinstance(record, EpisodeCreate)]
+        episodes = await self.insert(session, [record for _, record in valid]) if valid else []
+        accepted = [(index, episode) for (index, _), episode in zip(valid, episodes)]
+        bypass_ids = {episode.id for (_, record), episode in zip(valid, episodes) if record.bypass_cache}
+        logger.info("📥 Imported %d episode(s), %d rejected", len(accepted), len(records) - len(accepted))
+
+        for _, episode in accepted:
+            # Batched titles are saved before the episodes are queued
+            generation_queue.register(episode.id)
+            event_hub.publish("episode_created", summarize_episode(episode))
+
+        # Generation runs as its own task so it finishes even if the client disconnects
+        results: asyncio.Queue = asyncio.Queue()
+        task = asyncio.create_task(self.run(accepted, bypass_ids, results))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return self.stream_results(records, accepted, results)
+
+    async def stream_results(self, records, accepted, results: asyncio.Queue) -> AsyncIterator[dict]:
+        for index, record in enumerate(records):
+            if not isinstance(record, EpisodeCreate):
+                yield {"index": index, "error": record}
+        for index, episode in accepted:
+            yield {"index": index, "id": episode.id, "status": "queued"}
+        while (result := await results.get()) is not None:
+            yield result
+        yield {"done": True, "accepted": len(accepted), "rejected": len(records) - len(accepted)}
+
+    async def stop(self):
+        """Cancel running imports; their episodes are resumed by the generation queue on next start"""
+        tasks = list(self.tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+# Global instance
+batch_importer = BatchImporter(
+    max_items=int(os.getenv("BATCH_IMPORT_MAX_ITEMS", "500")),
+    max_body_bytes=int(os.getenv("BATCH_IMPORT_MAX_BYTES", str(1024 * 1024))),
+    title_batch_size=int(os.getenv("TITLE_BATCH_SIZE", "10")),
+)
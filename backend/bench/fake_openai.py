@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the OpenAI API used by the benchmarks
+
+Serves chat.completions (plain and streamed) and images.generate with configurable latency,
+5xx errors and 429 rate limits, plus PNG downloads for the image URLs it hands out.
+
+Usage: python bench/fake_openai.py --port 8765 --chat-latency 0.3 --rate-limit-rate 0.05
+       OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=sk-fake python main.py
+"""
+import io
+import re
+import json
+import time
+import random
+import asyncio
+import argparse
+import threading
+from dataclasses import dataclass, field
+from PIL import Image
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+# The batched title prompt asks for "a JSON array of N strings"
+BATCH_TITLES_PATTERN = re.compile(r"JSON array of (\d+) strings")
+# Streamed replies arrive in this many pieces spread over the chat latency
+STREAM_CHUNKS = 8
+
+@dataclass
+class FakeOpenAIConfig:
+    chat_latency: float = 0.3       # seconds, before jitter
+    model_latency: dict[str, float] = field(default_factory=dict)  # per-model chat latency overrides
+    image_latency: float = 1.0
+    download_latency: float = 0.02
+    jitter: float = 0.25            # latency is scaled by a uniform 1 ± jitter
+    error_rate: float = 0.0         # fraction of API calls answered with a 500
+    rate_limit_rate: float = 0.0    # fraction answered with a 429 and Retry-After
+    retry_after: float = 0.2
+    image_size: int = 1024
+    seed: int = 0
+
+def render_png(size: int) -> bytes:
+    """A gradient, so derivative encoding does real work instead of compressing a flat colour"""
+    image = Image.linear_gradient("L").resize((size, size)).convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    return buffer.getvalue()
+
+def create_app(config: FakeOpenAIConfig) -> FastAPI:
+    app = FastAPI(title="Fake OpenAI")
+    rng = random.Random(config.seed)
+    png = render_png(config.image_size)
+    counters = {"chat": 0, "images": 0, "downloads": 0, "errors": 0, "rate_limited": 0}
+    app.state.counters = counters
+
+    async def delay(seconds: float):
+        await asyncio.sleep(max(0.0, seconds * rng.uniform(1 - config.jitter, 1 + config.jitter)))
+
+    def injected_failure():
+        roll = rng.random()
+        if roll < config.rate_limit_rate:
+            counters["rate_limited"] += 1
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                status_code=429,
+                headers={"retry-after": str(config.retry_after)},
+            )
+        if roll < config.rate_limit_rate + config.error_rate:
+            counters["errors"] += 1
+            return JSONResponse({"error": {"message": "The server had an error", "type": "server_error"}}, status_code=500)
+        return None
+
+    rate_limit_headers = {
+        "x-ratelimit-limit-requests": "10000",
+        "x-ratelimit-remaining-requests": "9999",
+        "x-ratelimit-reset-requests": "6ms",
+    }
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        counters["chat"] += 1
+        if (failure := injected_failure()) is not None:
+            return failure
+        latency = config.model_latency.get(body.get("model"), config.chat_latency)
+
+        n = counters["chat"]
+        model = body.get("model", "gpt-4")
+        prompt = body["messages"][-1]["content"]
+        if (match := BATCH_TITLES_PATTERN.search(prompt)):
+            content = json.dumps([f"Benchmark Title {n}.{i}" for i in range(int(match.group(1)))])
+        elif "comedy_description" in prompt:
+            content = json.dumps({
+                "title": f"Benchmark Title {n}",
+                "comedy_description": f"In this benchmark episode {n}, our heroic development team battles a fake API.",
+            })
+        else:
+            content = f"Benchmark Completion {n}"
+        usage = {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4, "total_tokens": (len(prompt) + len(content)) // 4}
+        if body.get("stream"):
+            return StreamingResponse(
+                stream_chunks(n, model, content, usage if body.get("stream_options", {}).get("include_usage") else None, latency),
+                media_type="text/event-stream", headers=rate_limit_headers,
+            )
+
+        await delay(latency)
+        return JSONResponse({
+            "id": f"chatcmpl-{n}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage,
+        }, headers=rate_limit_headers)
+
+    async def stream_chunks(n: int, model: str, content: str, usage, latency: float):
+        def event(choices: list, **extra) -> str:
+            chunk = {"id": f"chatcmpl-{n}", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                     "choices": choices, **extra}
+            return f"data: {json.dumps(chunk)}\n\n"
+
+        size = max(1, -(-len(content) // STREAM_CHUNKS))
+        for start in range(0, len(content), size):
+            await delay(latency / STREAM_CHUNKS)
+            yield event([{"index": 0, "delta": {"role": "assistant", "content": content[start:start + size]}, "finish_reason": None}])
+        yield event([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        if usage is not None:
+            yield event([], usage=usage)
+        yield "data: [DONE]\n\n"
+
+    @app.post("/v1/images/generations")
+    async def images_generations(request: Request):
+        await request.json()
+        counters["images"] += 1
+        if (failure := injected_failure()) is not None:
+            return failure
+        await delay(config.image_latency)
+        base_url = str(request.base_url).rstrip("/")
+        return JSONResponse({
+            "created": int(time.time()),
+            "data": [{"url": f"{base_url}/files/{counters['images']}.png", "revised_prompt": None}],
+        }, headers=rate_limit_headers)
+
+    @app.get("/files/{name}")
+    async def download(name: str):
+        counters["downloads"] += 1
+        await delay(config.download_latency)
+        return Response(png, media_type="image/png")
+
+    return app
+
+class FakeOpenAIServer:
+    """Runs the fake API under uvicorn on its own thread and event loop,
+    so its latency isn't distorted by the load on the app being measured"""
+
+    def __init__(self, config: FakeOpenAIConfig, port: int = 0):
+        import uvicorn
+        self.app = create_app(config)
+        # Outlive the client's 30s keep-alive so pooled connections aren't closed under it, like the real API
+        self.server = uvicorn.Server(uvicorn.Config(
+            self.app, host="127.0.0.1", port=port, log_level="warning", lifespan="off", timeout_keep_alive=120,
+        ))
+        self.thread = threading.Thread(target=self.server.run, name="fake-openai", daemon=True)
+
+    @property
+    def counters(self) -> dict:
+        return self.app.state.counters
+
+    @property
+    def base_url(self) -> str:
+        port = self.server.servers[0].sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}/v1"
+
+    def start(self) -> "FakeOpenAIServer":
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def stop(self):
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
+
+def add_config_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--chat-latency", type=float, default=FakeOpenAIConfig.chat_latency, help="Seconds per chat completion")
+    parser.add_argument("--model-latency", action="append", default=[], metavar="MODEL=SECONDS",
+                        help="Chat latency for one model, e.g. gpt-4o-mini=0.1 to benchmark LLM_HEDGE_MODEL (repeatable)")
+    parser.add_argument("--image-latency", type=float, default=FakeOpenAIConfig.image_latency, help="Seconds per image generation")
+    parser.add_argument("--error-rate", type=float, default=FakeOpenAIConfig.error_rate, help="Fraction of API calls failing with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=FakeOpenAIConfig.rate_limit_rate, help="Fraction of API calls failing with 429")
+    parser.add_argument("--image-size", type=int, default=FakeOpenAIConfig.image_size, help="Width/height of the served PNG")
+    parser.add_argument("--seed", type=int, default=FakeOpenAIConfig.seed)
+
+def config_from_args(args: argparse.Namespace) -> FakeOpenAIConfig:
+    return FakeOpenAIConfig(
+        chat_latency=args.chat_latency,
+        model_latency={model: float(seconds) for model, seconds in (item.split("=", 1) for item in args.model_latency)},
+        image_latency=args.image_latency,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        image_size=args.image_size,
+        seed=args.seed,
+    )
+
+if __name__ == "__main__":
+    import uvicorn
+    parser = argparse.ArgumentParser(description="Fake OpenAI API for local benchmarking")
+    parser.add_argument("--port", type=int, default=8765)
+    add_config_arguments(parser)
+    args = parser.parse_args()
+    uvicorn.run(create_app(config_from_args(args)), host="127.0.0.1", port=args.port, timeout_keep_alive=120)
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Benchmark the backend against a local fake OpenAI API and compare with a stored baseline
+
+Runs scripted workloads against main.app in-process (no network between client and app),
+reports p50/p95/p99 latency and requests/s per endpoint, and exits non-zero when an
+endpoint regressed beyond the tolerance.
+
+Usage: python bench/run.py                              # all workloads, compare with bench/baseline.json
+       python bench/run.py list_readers --duration 5
+       python bench/run.py --save-baseline              # record a new baseline on this machine
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import tempfile
+from dataclasses import asdict
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+from fake_openai import FakeOpenAIServer, add_config_arguments, config_from_args
+from workloads import WORKLOADS, WorkloadOptions, BenchContext, reset_database
+
+# Regressions smaller than this are noise at any tolerance
+ABSOLUTE_SLACK_MS = 2.0
+# A p95 over fewer samples than this is too noisy to compare
+MIN_SAMPLES = 20
+
+def prepare_environment(workdir: str, openai_base_url: str):
+    """Point the app at a throwaway database, image directory and the fake API before it is imported"""
+    os.chdir(workdir)
+    os.environ["OPENAI_API_KEY"] = "sk-bench"
+    os.environ["OPENAI_BASE_URL"] = openai_base_url
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+    os.environ.setdefault("LLM_CACHE_PATH", os.path.join(workdir, "llm_cache.db"))
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+async def run_workloads(names: list[str], options: WorkloadOptions) -> dict:
+    import httpx
+    import main
+
+    results = {}
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120.0) as client:
+            for name in names:
+                await reset_database()
+                ctx = BenchContext(client, options)
+                print(f"⏱️  Running {name}...", flush=True)
+                await WORKLOADS[name](ctx)
+                ctx.recorder.finished = ctx.recorder.finished or time.perf_counter()
+                results[name] = ctx.recorder.summary()
+    return results
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Endpoints whose p95 grew or throughput dropped by more than `tolerance`"""
+    regressions = []
+    for workload, endpoints in results.items():
+        for endpoint, current in endpoints.items():
+            previous = baseline.get("results", {}).get(workload, {}).get(endpoint)
+            if not previous:
+                continue
+            comparable = min(current["count"], previous["count"]) >= MIN_SAMPLES
+            if comparable and current["p95_ms"] > previous["p95_ms"] * (1 + tolerance) + ABSOLUTE_SLACK_MS:
+                regressions.append(f"{workload} {endpoint}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+            if current["rps"] < previous["rps"] * (1 - tolerance):
+                regressions.append(f"{workload} {endpoint}: {previous['rps']} req/s -> {current['rps']} req/s")
+            if current["errors"] > previous["errors"] and current["errors"] > 0.01 * current["count"]:
+                regressions.append(f"{workload} {endpoint}: errors {previous['errors']} -> {current['errors']}")
+    return regressions
+
+def change(current: float, previous) -> str:
+    if not previous:
+        return ""
+    return f"{(current - previous) / previous * 100:+.0f}%"
+
+def print_report(results: dict, baseline: dict):
+    header = f"{'endpoint':<28}{'count':>7}{'err':>5}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'Δp95':>7}{'Δreq/s':>8}"
+    for workload, endpoints in results.items():
+        print(f"\n{workload}\n{header}")
+        for endpoint, stats in endpoints.items():
+            previous = baseline.get("results", {}).get(workload, {}).get(endpoint, {})
+            print(
+                f"{endpoint:<28}{stats['count']:>7}{stats['errors']:>5}{stats['rps']:>9}"
+                f"{stats['p50_ms']:>9}{stats['p95_ms']:>9}{stats['p99_ms']:>9}"
+                f"{change(stats['p95_ms'], previous.get('p95_ms')):>7}{change(stats['rps'], previous.get('rps')):>8}"
+            )
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Offline load test for the Netflux backend")
+    parser.add_argument("workloads", nargs="*", help=f"Workloads to run: {', '.join(WORKLOADS)} (default: all)")
+    parser.add_argument("--duration", type=float, default=WorkloadOptions.duration, help="Seconds per timed workload")
+    parser.add_argument("--concurrency", type=int, default=WorkloadOptions.concurrency, help="Simulated clients")
+    parser.add_argument("--episodes", type=int, default=WorkloadOptions.episodes, help="Submissions in submit_storm")
+    parser.add_argument("--seed-episodes", type=int, default=WorkloadOptions.seed_episodes, help="Rows loaded for read workloads")
+    parser.add_argument("--baseline", default=os.path.join(BENCH_DIR, "baseline.json"), help="Baseline file to compare with or save to")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed relative slowdown before failing")
+    parser.add_argument("--json", help="Also write the results to this file")
+    add_config_arguments(parser)
+    parser.set_defaults(image_latency=0.5)
+    args = parser.parse_args()
+
+    names = args.workloads or list(WORKLOADS)
+    if unknown := [name for name in names if name not in WORKLOADS]:
+        parser.error(f"unknown workload(s): {', '.join(unknown)}")
+    options = WorkloadOptions(
+        duration=args.duration,
+        concurrency=args.concurrency,
+        episodes=args.episodes,
+        seed_episodes=args.seed_episodes,
+        seed=args.seed,
+    )
+    fake_config = config_from_args(args)
+
+    fake_openai = FakeOpenAIServer(fake_config).start()
+    workdir = tempfile.mkdtemp(prefix="netflux-bench-")
+    prepare_environment(workdir, fake_openai.base_url)
+    try:
+        results = asyncio.run(run_workloads(names, options))
+    finally:
+        fake_openai.stop()
+    print(f"\n🤖 Fake OpenAI: {fake_openai.counters}")
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("options") != asdict(options) or baseline.get("fake_openai") != asdict(fake_config):
+            print("⚠️  Baseline was recorded with different options; comparisons are approximate")
+
+    print_report(results, baseline)
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "options": asdict(options),
+        "fake_openai": asdict(fake_config),
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        if baseline_exists := os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                # Keep workloads that weren't part of this run
+                report["results"] = {**json.load(f).get("results", {}), **results}
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"\n💾 {'Updated' if baseline_exists else 'Saved'} baseline {args.baseline}")
+        return 0
+
+    if not baseline:
+        print("\nℹ️  No baseline to compare with; run with --save-baseline to record one")
+        return 0
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("\n❌ Regressions:\n  " + "\n  ".join(regressions))
+        return 1
+    print(f"\n✅ No regressions beyond {args.tolerance:.0%}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+import math
+import time
+import random
+import asyncio
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from collections import defaultdict
+import httpx
+
+@dataclass
+class WorkloadOptions:
+    duration: float = 10.0          # seconds each timed workload runs
+    concurrency: int = 8            # simulated clients
+    episodes: int = 30              # submissions in the submit storm
+    seed_episodes: int = 500        # rows loaded before the read-heavy workloads
+    admin_interval: float = 2.0     # seconds between admin clears in the mixed workload
+    seed: int = 0
+
+def percentile(ordered: list[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(p / 100 * len(ordered)) - 1))]
+
+@dataclass
+class Recorder:
+    """Latency samples and failures per endpoint for one workload"""
+    samples: dict[str, list[float]] = field(default_factory=lambda: defaultdict(list))
+    errors: dict[str, int] = field(default_factory=lambda: defaultdict(int))
+    started: float = field(default_factory=time.perf_counter)
+    finished: float = 0.0
+    # Wall time over which an endpoint's samples were taken, when not the whole workload
+    windows: dict[str, float] = field(default_factory=dict)
+
+    async def request(self, client: httpx.AsyncClient, endpoint: str, method: str, url: str, **kwargs) -> httpx.Response:
+        """Send a request and record its latency under `endpoint`; 5xx and transport errors count as errors"""
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.errors[endpoint] += 1
+            raise
+        self.samples[endpoint].append(time.perf_counter() - start)
+        if response.status_code >= 500:
+            self.errors[endpoint] += 1
+        return response
+
+    def summary(self) -> dict[str, dict]:
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        report = {}
+        for endpoint in sorted(set(self.samples) | set(self.errors)):
+            ordered = sorted(self.samples[endpoint])
+            window = self.windows.get(endpoint, elapsed)
+            report[endpoint] = {
+                "count": len(ordered),
+                "errors": self.errors[endpoint],
+                "rps": round(len(ordered) / window, 2) if window > 0 else 0.0,
+                "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+                "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+                "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+                "max_ms": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+            }
+        return report
+
+class BenchContext:
+    """What a workload gets: an HTTP client bound to main.app, a recorder and the options"""
+
+    def __init__(self, client: httpx.AsyncClient, options: WorkloadOptions):
+        self.client = client
+        self.options = options
+        self.recorder = Recorder()
+        self.rng = random.Random(options.seed)
+        self.submitted = 0
+
+    def description(self) -> str:
+        self.submitted += 1
+        return (
+            f"Benchmark incident #{self.submitted}: a deploy at {self.rng.randint(1, 12)}pm rolled out a config change "
+            f"that left {self.rng.randint(2, 40)} services retrying against an exhausted connection pool."
+        )
+
+    async def submit(self) -> httpx.Response:
+        return await self.recorder.request(
+            self.client, "POST /api/episodes", "POST", "/api/episodes",
+            json={"description": self.description(), "submitted_by": "bench"},
+        )
+
+    async def read_listing(self, cursor):
+        """Fetch one page of the grid, returning the cursor for the next one (None wraps around)"""
+        params = {"limit": 50}
+        if cursor:
+            params["cursor"] = cursor
+        response = await self.recorder.request(self.client, "GET /api/episodes", "GET", "/api/episodes", params=params)
+        return response.json().get("next_cursor") if response.status_code == 200 else None
+
+    async def read_detail(self, episode_ids: list[int]):
+        if episode_ids:
+            episode_id = self.rng.choice(episode_ids)
+            await self.recorder.request(self.client, "GET /api/episodes/{id}", "GET", f"/api/episodes/{episode_id}")
+
+    async def read_status(self):
+        await self.recorder.request(self.client, "GET /api/status", "GET", "/api/status")
+
+    async def reader(self, deadline: float, episode_ids: list[int]):
+        """A viewer paging through the grid, opening episodes and polling status"""
+        cursor = None
+        while time.perf_counter() < deadline:
+            cursor = await self.read_listing(cursor)
+            await self.read_detail(episode_ids)
+            await self.read_status()
+
+async def reset_database():
+    """Empty the episode and image tables between workloads"""
+    from sqlalchemy import delete
+    from database import async_session
+    from models import Episode, ImageAsset
+    async with async_session() as session:
+        await session.exec(delete(Episode))
+        await session.exec(delete(ImageAsset))
+        await session.commit()
+
+async def seed_episodes(count: int) -> list[int]:
+    """Insert finished episodes directly, skipping generation"""
+    from sqlalchemy import insert
+    from database import async_session
+    from models import Episode, GenerationStatus
+    now = datetime.utcnow()
+    rows = [
+        {
+            "title": f"Seeded Episode {i}",
+            "description": f"Seeded incident {i} for read benchmarks",
+            "comedy_description": f"In which seeded incident {i} goes exactly as badly as expected.",
+            "submitted_by": f"seed-{i % 20}",
+            "timestamp": now - timedelta(seconds=count - i),
+            "updated_at": now - timedelta(seconds=count - i),
+            "generation_status": GenerationStatus.IMAGE_DONE.value,
+        }
+        for i in range(count)
+    ]
+    async with async_session() as session:
+        ids = list((await session.scalars(insert(Episode).returning(Episode.id), rows)).all())
+        await session.commit()
+    return ids
+
+async def wait_for_generation(timeout: float):
+    from generation_queue import generation_queue
+    await asyncio.wait_for(generation_queue.queue.join(), timeout)
+
+async def record_generation_latency(ctx: BenchContext, window: float):
+    """Submission-to-finished time of every generated episode, as a pseudo-endpoint"""
+    from sqlmodel import select
+    from database import async_session
+    from models import Episode, GenerationStatus
+    async with async_session() as session:
+        episodes = (await session.exec(select(Episode).where(Episode.submitted_by == "bench"))).all()
+    for episode in episodes:
+        if episode.generation_status == GenerationStatus.IMAGE_DONE.value:
+            ctx.recorder.samples["generation"].append((episode.updated_at - episode.timestamp).total_seconds())
+        else:
+            ctx.recorder.errors["generation"] += 1
+    ctx.recorder.windows["generation"] = window
+
+async def submit_storm(ctx: BenchContext):
+    """Clients submit episodes as fast as they can, then generation drains"""
+    remaining = ctx.options.episodes
+
+    async def submitter():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            await ctx.submit()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(submitter() for _ in range(ctx.options.concurrency)))
+    await wait_for_generation(timeout=max(120.0, ctx.options.episodes * 5.0))
+    await record_generation_latency(ctx, time.perf_counter() - start)
+
+async def list_readers(ctx: BenchContext):
+    """Many viewers paging the grid and opening episodes over a large board"""
+    episode_ids = await seed_episodes(ctx.options.seed_episodes)
+    ctx.recorder.started = time.perf_counter()
+    deadline = ctx.recorder.started + ctx.options.duration
+    await asyncio.gather(*(ctx.reader(deadline, episode_ids) for _ in range(ctx.options.concurrency)))
+
+async def searchers(ctx: BenchContext):
+    """Viewers searching a large board: common words, exact matches, prefixes typed so far and misses"""
+    await seed_episodes(ctx.options.seed_episodes)
+    count = ctx.options.seed_episodes
+    ctx.recorder.started = time.perf_counter()
+    deadline = ctx.recorder.started + ctx.options.duration
+
+    def query() -> str:
+        return ctx.rng.choice([
+            "seeded incident",
+            f"incident {ctx.rng.randrange(count)}",
+            f"seed-{ctx.rng.randrange(20)}",
+            "bench",
+            "exactly as bad",
+            "nothing matches this",
+        ])
+
+    async def searcher():
+        while time.perf_counter() < deadline:
+            await ctx.recorder.request(
+                ctx.client, "GET /api/episodes/search", "GET", "/api/episodes/search", params={"q": query(), "limit": 20},
+            )
+
+    await asyncio.gather(*(searcher() for _ in range(ctx.options.concurrency)))
+
+async def mixed_admin(ctx: BenchContext):
+    """Readers and submitters while an admin alternately archives and deletes the oldest episodes"""
+    episode_ids = await seed_episodes(ctx.options.seed_episodes)
+    ctx.recorder.started = time.perf_counter()
+    deadline = ctx.recorder.started + ctx.options.duration
+
+    async def submitter():
+        while time.perf_counter() < deadline:
+            await ctx.submit()
+            await asyncio.sleep(0.2)
+
+    async def admin():
+        archive = True
+        while (time.perf_counter() + ctx.options.admin_interval) < deadline:
+            await asyncio.sleep(ctx.options.admin_interval)
+            # Everything older than the newest half of the seeded rows
+            until = (datetime.utcnow() - timedelta(seconds=ctx.options.seed_episodes // 2)).isoformat()
+            await ctx.recorder.request(
+                ctx.client, "DELETE /api/admin/episodes", "DELETE", "/api/admin/episodes",
+                params={"until": until, "archive": str(archive).lower()},
+            )
+            archive = not archive
+            # Top the board back up so readers keep a steady working set
+            episode_ids[:] = await seed_episodes(ctx.options.seed_episodes // 2)
+
+    readers = max(1, ctx.options.concurrency - 2)
+    await asyncio.gather(submitter(), admin(), *(ctx.reader(deadline, episode_ids) for _ in range(readers)))
+    ctx.recorder.finished = time.perf_counter()
+    # Let submitted episodes finish so they don't spill into the next workload
+    await wait_for_generation(timeout=120.0)
+
+WORKLOADS = {
+    "submit_storm": submit_storm,
+    "list_readers": list_readers,
+    "searchers": searchers,
+    "mixed_admin": mixed_admin,
+}
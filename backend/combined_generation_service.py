@@ -0,0 +1,179 @@
+import os
+import re
+import json
+import asyncio
+import logging
+from contextlib import aclosing
+from typing import Optional
+from llm_cache import llm_cache
+from models import GeneratedEpisodeText, TITLE_MAX_LENGTH
+from episode_description_service import DESCRIPTION_MODEL
+from openai_client import describe_openai_error
+from metrics import FALLBACKS
+from tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+# Models that accept a strict JSON schema, and older ones that only have JSON mode;
+# anything else is asked for JSON in the prompt alone
+STRUCTURED_OUTPUT_MODELS = ("gpt-4o", "gpt-4.1")
+JSON_MODE_MODELS = ("gpt-4-turbo", "gpt-4-1106", "gpt-4-0125", "gpt-3.5-turbo")
+
+EPISODE_TEXT_SCHEMA = {
+    "name": "episode_text",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        # Title first, so it streams in (and is saved) before the description is written
+        "properties": {"title": {"type": "string"}, "comedy_description": {"type": "string"}},
+        "required": ["title", "comedy_description"],
+        "additionalProperties": False,
+    },
+}
+
+# A complete "title" string inside a JSON object that may still be streaming
+STREAMED_TITLE_PATTERN = re.compile(r'"title"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+def streamed_title(text: str) -> Optional[str]:
+    """The title from a partial JSON reply, once its closing quote has arrived"""
+    match = STREAMED_TITLE_PATTERN.search(text)
+    if not match:
+        return None
+    try:
+        title = json.loads(f'"{match.group(1)}"').strip().strip('"').strip("'").strip()
+    except ValueError:
+        return None
+    return title if 0 < len(title) <= TITLE_MAX_LENGTH else None
+
+def parse_episode_text(text: str) -> GeneratedEpisodeText:
+    """Validate a combined reply; raises ValueError when it isn't a usable JSON object"""
+    try:
+        start, end = text.index("{"), text.rindex("}") + 1
+    except ValueError:
+        raise ValueError("Combined reply is not a JSON object")
+    parsed = GeneratedEpisodeText.model_validate_json(text[start:end])
+    return GeneratedEpisodeText(
+        title=parsed.title.strip().strip('"').strip("'").strip(),
+        comedy_description=parsed.comedy_description.strip(),
+    )
+
+def is_episode_text(text: str) -> bool:
+    try:
+        parse_episode_text(text)
+    except ValueError:
+        return False
+    return True
+
+class CombinedGeneration:
+    """One in-flight combined completion; the title resolves as soon as it has streamed in"""
+
+    def __init__(self):
+        loop = asyncio.get_running_loop()
+        self.title_future: asyncio.Future = loop.create_future()
+        self.description_future: asyncio.Future = loop.create_future()
+        self.task: Optional[asyncio.Task] = None
+
+    async def title(self) -> Optional[str]:
+        """The generated title, or None if the combined call failed"""
+        return await asyncio.shield(self.title_future)
+
+    async def comedy_description(self) -> Optional[str]:
+        """The generated comedy description, or None if the combined call failed"""
+        return await asyncio.shield(self.description_future)
+
+    def resolve(self, title: Optional[str] = None, comedy_description: Optional[str] = None):
+        if not self.title_future.done():
+            self.title_future.set_result(title)
+        if not self.description_future.done():
+            self.description_future.set_result(comedy_description)
+
+class CombinedGenerationService:
+    """Writes the title and comedy description with a single streamed, structured completion"""
+
+    def __init__(self, model: str, response_format: str = "auto", max_tokens: int = 400):
+        self.model = model
+        # auto, json_schema, json_object or none
+        self.response_format = response_format
+        self.max_tokens = max_tokens
+
+    def format_for_model(self) -> Optional[dict]:
+        mode = self.response_format
+        if mode == "auto":
+            if self.model.startswith(STRUCTURED_OUTPUT_MODELS):
+                mode = "json_schema"
+            elif self.model.startswith(JSON_MODE_MODELS):
+                mode = "json_object"
+            else:
+                mode = "none"
+        if mode == "json_schema":
+            return {"type": "json_schema", "json_schema": EPISODE_TEXT_SCHEMA}
+        if mode == "json_object":
+            return {"type": "json_object"}
+        return None
+
+    def start(self, description: str, use_cache: bool = True) -> CombinedGeneration:
+        """Begin generating in the background; await the returned object's title() and comedy_description()"""
+        generation = CombinedGeneration()
+        generation.task = asyncio.create_task(self.generate(generation, description, use_cache))
+        return generation
+
+    async def generate(self, generation: CombinedGeneration, description: str, use_cache: bool):
+        logger.debug("🎬 Generating title and comedy description for: %.100s...", description)
+        prompt = f"""You are a Netflix content creator and comedy writer for "CaseMark Blitz Chronicles," a workplace comedy series about software development teams.
+
+Given this engineering story/issue:
+"{description}"
+
+Write two things:
+
+1. "title": a dramatic, clickbait-style, Netflix-style episode title (like "The Social Dilemma" or "The Tinder Swindler") of 3-8 words that relates to the issue and is intriguing without spoiling the story. Examples: "The Merge That Broke Everything", "Code Red: The Friday Deploy", "The Intern's Fatal Click".
+
+2. "comedy_description": a single paragraph episode description for that title that:
+- Starts with "In this [adjective] episode, our heroic development team..."
+- Transforms the mundane engineering issue into an epic quest or catastrophe
+- Uses dramatic language and overwrought metaphors
+- References common developer experiences (Stack Overflow, coffee, meetings, bugs, deployments, etc.)
+- Includes specific technical details but treats them as mysterious forces
+- Ends with a cliffhanger question about whether they'll solve the problem
+- Mentions "guest appearances" by personified developer frustrations
+- Length: 4-6 sentences, roughly 150-200 words
+
+Think "The Office" meets "Lord of the Rings" but for programmers.
+
+Return ONLY a JSON object of the form {{"title": "...", "comedy_description": "..."}}, with "title" first."""
+
+        text = ""
+        try:
+            with tracer.span("llm.combined", model=self.model) as span:
+                stream = llm_cache.cached_chat_stream(
+                    system_prompt="You are a Netflix comedy writer who turns mundane software engineering problems into dramatic clickbait titles and hilarious episode descriptions. You always answer in JSON.",
+                    user_prompt=prompt,
+                    model=self.model,
+                    max_tokens=self.max_tokens,
+                    temperature=0.8,
+                    use_cache=use_cache,
+                    response_format=self.format_for_model(),
+                    validate=is_episode_text,
+                )
+                async with aclosing(stream):
+                    async for chunk in stream:
+                        text += chunk
+                        if not generation.title_future.done() and (title := streamed_title(text)):
+                            span.set(title_chars=len(text))
+                            logger.info("✅ Generated title: %s", title)
+                            generation.title_future.set_result(title)
+                parsed = parse_episode_text(text)
+            generation.resolve(parsed.title, parsed.comedy_description)
+            logger.debug("✅ Generated comedy description: %.100s...", parsed.comedy_description)
+        except Exception as e:
+            FALLBACKS.inc(stage="combined")
+            logger.error("❌ Combined generation failed, using separate calls: %s", describe_openai_error(e))
+        finally:
+            # Whatever didn't arrive resolves to None so the stages fall back to their own calls
+            generation.resolve()
+
+# Global instance
+combined_generation_service = CombinedGenerationService(
+    model=os.getenv("COMBINED_MODEL") or DESCRIPTION_MODEL,
+    response_format=os.getenv("COMBINED_RESPONSE_FORMAT", "auto"),
+)
@@ -0,0 +1,180 @@
+import os
+import time
+import socket
+import asyncio
+import logging
+import secrets
+from datetime import datetime, timedelta
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+from sqlalchemy import case, delete, select, update
+from database import async_session, IS_SQLITE
+from models import Lease, RateBudget
+
+logger = logging.getLogger(__name__)
+
+def dialect_insert(table):
+    """INSERT with ON CONFLICT support for the configured database"""
+    if IS_SQLITE:
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert(table)
+
+class Coordinator:
+    """Database-backed coordination between uvicorn workers and app instances.
+
+    Leases are rows in one table, taken with a single conditional upsert: SQLite runs
+    writers one at a time and Postgres locks the conflicting row, so exactly one
+    process wins. Held leases are renewed in the background and expire if their
+    process dies. Disabled (a single process), every lease is granted locally and
+    the rate budget is left to the in-process limiter.
+    """
+
+    def __init__(self, enabled: bool = False, lease_seconds: float = 60.0, poll_interval: float = 0.5):
+        self.enabled = enabled
+        self.lease_seconds = lease_seconds
+        # How often a process waiting on someone else's lease checks again
+        self.poll_interval = poll_interval
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(4)}"
+        self.held: set[str] = set()
+        self._renew_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        if self.enabled:
+            logger.info("🤝 Coordinating with other workers through the database as %s", self.owner)
+            self._renew_task = asyncio.create_task(self._renew_loop())
+
+    async def stop(self):
+        """Stop renewing and hand back every lease this process holds"""
+        if self._renew_task:
+            self._renew_task.cancel()
+            await asyncio.gather(self._renew_task, return_exceptions=True)
+            self._renew_task = None
+        if self.enabled and self.held:
+            async with async_session() as session:
+                await session.exec(delete(Lease).where(Lease.owner == self.owner))
+                await session.commit()
+        self.held.clear()
+
+    async def _renew_loop(self):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not self.held:
+                continue
+            try:
+                async with async_session() as session:
+                    await session.exec(
+                        update(Lease).where(Lease.owner == self.owner)
+                        .values(expires_at=datetime.utcnow() + timedelta(seconds=self.lease_seconds))
+                    )
+                    await session.commit()
+            except Exception as e:
+                logger.warning("⚠️  Could not renew leases: %s: %s", type(e).__name__, e)
+
+    async def acquire(self, name: str) -> bool:
+        """Take the lease unless another live process holds it"""
+        if not self.enabled:
+            return True
+        now = datetime.utcnow()
+        table = Lease.__table__
+        statement = dialect_insert(table).values(name=name, owner=self.owner, expires_at=now + timedelta(seconds=self.lease_seconds))
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.name],
+            set_={"owner": statement.excluded.owner, "expires_at": statement.excluded.expires_at},
+            where=(table.c.expires_at < now) | (table.c.owner == self.owner),
+        ).returning(table.c.owner)
+        async with async_session() as session:
+            acquired = (await session.exec(statement)).first() is not None
+            await session.commit()
+        if acquired:
+            self.held.add(name)
+        return acquired
+
+    async def release(self, name: str):
+        if not self.enabled:
+            return
+        self.held.discard(name)
+        async with async_session() as session:
+            await session.exec(delete(Lease).where(Lease.name == name, Lease.owner == self.owner))
+            await session.commit()
+
+    @asynccontextmanager
+    async def claim(self, name: str) -> AsyncIterator[bool]:
+        """Try once for the lease; yields whether it was taken and releases it afterwards"""
+        acquired = await self.acquire(name)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                await self.release(name)
+
+    @asynccontextmanager
+    async def lease(self, name: str) -> AsyncIterator[None]:
+        """Wait until the lease is free, hold it for the block, then release it"""
+        while not await self.acquire(name):
+            await asyncio.sleep(self.poll_interval)
+        try:
+            yield
+        finally:
+            await self.release(name)
+
+    async def leased_keys(self, prefix: str) -> set[str]:
+        """What follows `prefix` in the name of every lease currently held by any process"""
+        if not self.enabled:
+            return set()
+        async with async_session() as session:
+            names = (await session.exec(
+                select(Lease.name).where(Lease.name.startswith(prefix), Lease.expires_at >= datetime.utcnow())
+            )).scalars().all()
+        return {name[len(prefix):] for name in names}
+
+    async def take_rate_budget(self, name: str, per_minute: float):
+        """Wait for a request slot in the budget all processes share"""
+        if not self.enabled:
+            return
+        while (wait := await self._take(name, per_minute)) > 0:
+            await asyncio.sleep(wait)
+
+    async def _take(self, name: str, per_minute: float) -> float:
+        """Take one token if there is one; otherwise return how long until there will be"""
+        rate = per_minute / 60.0
+        capacity = max(1.0, rate * 10)
+        now = time.time()
+        table = RateBudget.__table__
+        available = table.c.tokens + (now - table.c.updated_at) * rate
+        refilled = case((available > capacity, capacity), else_=available)
+        async with async_session() as session:
+            taken = (await session.exec(
+                update(table).where(table.c.name == name, refilled >= 1)
+                .values(tokens=refilled - 1, updated_at=now)
+                .returning(table.c.tokens)
+            )).first()
+            if taken is not None:
+                await session.commit()
+                return 0.0
+            current = (await session.exec(select(table.c.tokens, table.c.updated_at).where(table.c.name == name))).first()
+            if current is None:
+                # First request under this name starts with a full bucket; a process that loses the race tries again
+                created = (await session.exec(
+                    dialect_insert(table).values(name=name, tokens=capacity - 1, updated_at=now)
+                    .on_conflict_do_nothing().returning(table.c.name)
+                )).first()
+                await session.commit()
+                return 0.0 if created is not None else 0.01
+            await session.commit()
+        tokens = min(capacity, current.tokens + (now - current.updated_at) * rate)
+        return max(0.01, (1 - tokens) / rate)
+
+def workers_configured() -> int:
+    try:
+        return int(os.getenv("WEB_CONCURRENCY", "1"))
+    except ValueError:
+        return 1
+
+# Global instance
+coordinator = Coordinator(
+    # On by default whenever several workers are started; set it for several single-worker instances
+    enabled=os.getenv("COORDINATION_ENABLED", str(workers_configured() > 1)).lower() == "true",
+    lease_seconds=float(os.getenv("LEASE_SECONDS", "60")),
+)
@@ -1,55 +1,113 @@
-from sqlmodel import SQLModel, create_engine, Session
-from models import Episode, AdminSettings
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.pool import StaticPool
+from sqlmodel.ext.asyncio.session import AsyncSession
+from models import AdminSettings
+from tracing import tracer, instrument_engine
 import os
-import sqlite3
+import logging
 
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./netflux.db")
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
 
-engine = create_engine(DATABASE_URL, echo=True)
+def async_url(url: str) -> str:
+    """Point plain sqlite:// / postgresql:// URLs at their asyncio drivers"""
+    if url.startswith("sqlite://"):
+        return url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    if url.startswith("postgresql://"):
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql+asyncpg://", 1)
+    return url
 
-def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
-    
-    # Handle migration for image_url field
-    migrate_episode_table()
+# Applied to every new SQLite connection
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",          # readers don't block the writer and vice versa
+    "synchronous": "NORMAL",        # safe with WAL, far fewer fsyncs than FULL
+    "busy_timeout": os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"),
+    "mmap_size": os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)),
+    "cache_size": os.getenv("SQLITE_CACHE_SIZE", "-65536"),  # negative = KiB, i.e. 64 MiB
+    "temp_store": "MEMORY",
+}
+
+def build_engine(url: str):
+    echo = os.getenv("SQL_ECHO", "false").lower() == "true"
+    if not IS_SQLITE:
+        return create_async_engine(
+            url,
+            echo=echo,
+            pool_size=int(os.getenv("DB_POOL_SIZE", "10")),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "20")),
+            pool_pre_ping=True,
+        )
+    if url.endswith(("sqlite://", ":memory:")):
+        # One shared connection, otherwise every checkout sees a fresh empty database
+        return create_async_engine(url, echo=echo, poolclass=StaticPool)
+    return create_async_engine(
+        url,
+        echo=echo,
+        pool_size=int(os.getenv("DB_POOL_SIZE", "10")),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "20")),
+    )
+
+engine = build_engine(async_url(DATABASE_URL))
+async_session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+if tracer.enabled:
+    instrument_engine(engine.sync_engine)
+
+if IS_SQLITE:
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
 
-def migrate_episode_table():
-    """Add image_url and comedy_description columns to existing episode table if they don't exist"""
-    db_path = DATABASE_URL.replace("sqlite:///", "").replace("sqlite://", "")
+def alembic_config():
+    from alembic.config import Config
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    config.set_main_option("sqlalchemy.url", DATABASE_URL.replace("%", "%%"))
+    return config
+
+def run_upgrade(connection, config):
+    from alembic import command
+    config.attributes["connection"] = connection
+    command.upgrade(config, "head")
+
+def current_revision(connection):
+    from alembic.runtime.migration import MigrationContext
+    return MigrationContext.configure(connection).get_current_revision()
+
+async def create_db_and_tables():
+    """Bring the schema up to date with Alembic migrations"""
+    from alembic.script import ScriptDirectory
     
-    try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        # Check existing columns
-        cursor.execute("PRAGMA table_info(episode)")
-        columns = [column[1] for column in cursor.fetchall()]
-        
-        # Add image_url column if it doesn't exist
-        if 'image_url' not in columns:
-            cursor.execute("ALTER TABLE episode ADD COLUMN image_url TEXT")
-            conn.commit()
-            print("Added image_url column to episode table")
-        
-        # Add comedy_description column if it doesn't exist
-        if 'comedy_description' not in columns:
-            cursor.execute("ALTER TABLE episode ADD COLUMN comedy_description TEXT")
-            conn.commit()
-            print("Added comedy_description column to episode table")
-        
-        conn.close()
-    except Exception as e:
-        print(f"Migration warning: {e}")
-        # Continue even if migration fails - table might not exist yet
-
-def get_session():
-    with Session(engine) as session:
+    config = alembic_config()
+    head = ScriptDirectory.from_config(config).get_current_head()
+    
+    # Cheap check first so a normal startup doesn't load the migration environment
+    async with engine.connect() as connection:
+        current = await connection.run_sync(current_revision)
+    if current == head:
+        return
+    
+    logger.info("Migrating database from %s to %s", current or "unversioned", head)
+    async with engine.begin() as connection:
+        await connection.run_sync(run_upgrade, config)
+
+async def get_session():
+    async with async_session() as session:
         yield session
 
-def init_admin_settings():
-    with Session(engine) as session:
-        existing_settings = session.get(AdminSettings, 1)
+async def init_admin_settings():
+    async with async_session() as session:
+        existing_settings = await session.get(AdminSettings, 1)
         if not existing_settings:
             settings = AdminSettings(id=1, is_submission_open=True)
             session.add(settings)
-            session.commit()
\ No newline at end of file
+            await session.commit()
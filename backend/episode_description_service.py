@@ -1,23 +1,16 @@
 import os
-from openai import AsyncOpenAI
-from typing import Optional
-from dotenv import load_dotenv
+import logging
+from llm_cache import llm_cache
+from local_generators import local_generator
 
-# Load environment variables
-load_dotenv()
+logger = logging.getLogger(__name__)
+
+DESCRIPTION_MODEL = os.getenv("DESCRIPTION_MODEL", "gpt-4")
 
 class EpisodeDescriptionService:
-    def __init__(self):
-        # Initialize OpenAI client with API key from environment
-        api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY environment variable is required")
-        
-        self.client = AsyncOpenAI(api_key=api_key)
-    
-    async def generate_episode_description(self, title: str, issue: str) -> str:
+    async def generate_episode_description(self, title: str, issue: str, fallback: bool = True, use_cache: bool = True) -> str:
         """Generate a Netflix-style comedy episode description using ChatGPT"""
-        print(f"🎭 Generating comedy description for: {title}")
+        logger.debug("🎭 Generating comedy description for: %s", title)
         
         try:
             # Create a prompt for generating comedy episode descriptions
@@ -40,28 +33,28 @@ Input format:
 
 Transform the boring reality into comedy gold while keeping the core technical issue recognizable. Think "The Office" meets "Lord of the Rings" but for programmers."""
 
-            # Call ChatGPT API
-            response = await self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a Netflix comedy writer who specializes in turning mundane software engineering problems into epic, dramatic, and hilarious episode descriptions for a workplace comedy series."},
-                    {"role": "user", "content": prompt}
-                ],
+            # Call ChatGPT API (repeat issues are served from the response cache)
+            description = await llm_cache.cached_chat_completion(
+                system_prompt="You are a Netflix comedy writer who specializes in turning mundane software engineering problems into epic, dramatic, and hilarious episode descriptions for a workplace comedy series.",
+                user_prompt=prompt,
+                model=DESCRIPTION_MODEL,
                 max_tokens=300,
                 temperature=0.8,  # High creativity for comedy
+                use_cache=use_cache,
             )
             
-            # Extract the description
-            description = response.choices[0].message.content.strip()
-            
-            print(f"✅ Generated comedy description: {description[:100]}...")
+            logger.debug("✅ Generated comedy description: %.100s...", description)
             return description
             
         except Exception as e:
-            print(f"❌ Error generating comedy description: {str(e)}")
-            
-            # Fallback comedy description
-            return f"In this catastrophic episode, our heroic CaseMark development team faces the dreaded {title}! Armed with nothing but caffeinated beverages and increasingly desperate Stack Overflow searches, they must battle the mysterious forces of {issue}. Will they triumph over this technical nightmare, or will they be consumed by the ever-growing pile of error messages? Guest appearances by Imposter Syndrome and the dreaded Monday Morning Standup make this an episode you won't want to miss!"
+            logger.error("❌ Error generating comedy description: %s", e)
+            if not fallback:
+                raise
+            return self.fallback_description(title, issue)
+
+    def fallback_description(self, title: str, issue: str) -> str:
+        """Build a comedy description from the local keyword/template engine"""
+        return local_generator.description(title, issue)
 
 # Global instance
 episode_description_service = EpisodeDescriptionService()
\ No newline at end of file
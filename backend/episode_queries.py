@@ -0,0 +1,173 @@
+import base64
+import binascii
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import and_, delete, func, or_, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from models import Episode
+from image_store import release_image_references
+
+TEASER_LENGTH = 200
+
+# Columns that can be requested with ?fields=; teaser is a short excerpt of the description
+PROJECTABLE_COLUMNS = {
+    "id": Episode.id,
+    "title": Episode.title,
+    "description": Episode.description,
+    "comedy_description": Episode.comedy_description,
+    "submitted_by": Episode.submitted_by,
+    "timestamp": Episode.timestamp,
+    "image_url": Episode.image_url,
+    "image_variants": Episode.image_variants,
+    "generation_status": Episode.generation_status,
+    "teaser": func.substr(func.coalesce(Episode.comedy_description, Episode.description), 1, TEASER_LENGTH).label("teaser"),
+}
+
+# What list views need: no full-length text columns
+SUMMARY_FIELDS = ["id", "title", "submitted_by", "timestamp", "image_url", "image_variants", "generation_status", "teaser"]
+FULL_FIELDS = [name for name in PROJECTABLE_COLUMNS if name != "teaser"]
+
+def summarize_episode(episode: Episode) -> dict:
+    """The SUMMARY_FIELDS view of a loaded episode, as pushed to event subscribers"""
+    summary = {name: getattr(episode, name) for name in SUMMARY_FIELDS if name != "teaser"}
+    summary["teaser"] = (episode.comedy_description or episode.description)[:TEASER_LENGTH]
+    return summary
+
+class InvalidQuery(ValueError):
+    """Raised for malformed cursors or unknown field names"""
+
+def encode_cursor(timestamp: datetime, episode_id: int) -> str:
+    raw = f"{timestamp.isoformat()}|{episode_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, episode_id = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return datetime.fromisoformat(timestamp), int(episode_id)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise InvalidQuery("Invalid cursor")
+
+def parse_fields(fields: Optional[str]) -> list[str]:
+    """Turn ?fields=a,b into column names; 'summary' and 'full' are shortcuts"""
+    if not fields or fields == "full":
+        return FULL_FIELDS
+    if fields == "summary":
+        return SUMMARY_FIELDS
+    names = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in names if name not in PROJECTABLE_COLUMNS]
+    if unknown:
+        raise InvalidQuery(f"Unknown fields: {', '.join(unknown)}")
+    return names
+
+async def list_episodes_page(session: AsyncSession, limit: int, cursor: Optional[str], fields: list[str]) -> tuple[list[dict], Optional[str]]:
+    """Keyset-paginated listing, newest first, ordered on (timestamp, id)"""
+    # id and timestamp are always read so the next cursor can be built
+    names = list(dict.fromkeys(["id", "timestamp", *fields]))
+    statement = select(*(PROJECTABLE_COLUMNS[name] for name in names)).where(Episode.archived_at.is_(None))
+
+    if cursor:
+        after_timestamp, after_id = decode_cursor(cursor)
+        statement = statement.where(
+            or_(
+                Episode.timestamp < after_timestamp,
+                and_(Episode.timestamp == after_timestamp, Episode.id < after_id),
+            )
+        )
+
+    rows = (await session.exec(
+        statement.order_by(Episode.timestamp.desc(), Episode.id.desc()).limit(limit + 1)
+    )).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.timestamp, last.id)
+
+    items = [{name: row._mapping[name] for name in fields} for row in rows]
+    return items, next_cursor
+
+async def count_episodes(session: AsyncSession) -> int:
+    return (await session.exec(select(func.count()).select_from(Episode).where(Episode.archived_at.is_(None)))).one()
+
+async def episode_neighbours(session: AsyncSession, episode: Episode) -> tuple[Optional[int], Optional[int]]:
+    """Ids of the episodes just before (newer) and after (older) this one in list order.
+
+    Each side is a single-row seek on the (timestamp, id) index.
+    """
+    newer = (await session.exec(
+        select(Episode.id)
+        .where(
+            Episode.archived_at.is_(None),
+            or_(
+                Episode.timestamp > episode.timestamp,
+                and_(Episode.timestamp == episode.timestamp, Episode.id > episode.id),
+            )
+        )
+        .order_by(Episode.timestamp.asc(), Episode.id.asc())
+        .limit(1)
+    )).first()
+    older = (await session.exec(
+        select(Episode.id)
+        .where(
+            Episode.archived_at.is_(None),
+            or_(
+                Episode.timestamp < episode.timestamp,
+                and_(Episode.timestamp == episode.timestamp, Episode.id < episode.id),
+            )
+        )
+        .order_by(Episode.timestamp.desc(), Episode.id.desc())
+        .limit(1)
+    )).first()
+    return newer, older
+
+def episode_filters(since: Optional[datetime] = None, until: Optional[datetime] = None, submitted_by: Optional[str] = None) -> list:
+    """WHERE clauses for admin bulk operations; no arguments means every episode"""
+    conditions = []
+    if since:
+        conditions.append(Episode.timestamp >= since)
+    if until:
+        conditions.append(Episode.timestamp < until)
+    if submitted_by:
+        conditions.append(Episode.submitted_by == submitted_by)
+    return conditions
+
+async def delete_episodes(session: AsyncSession, conditions: list) -> tuple[int, list[str]]:
+    """Delete matching episodes with one DELETE ... RETURNING (caller commits).
+
+    Returns how many were deleted and the image files nothing references any more.
+    The returned rows are streamed, so memory grows with the number of distinct
+    images rather than with the number of episodes.
+    """
+    rows = await session.stream(
+        delete(Episode)
+        .where(*conditions)
+        .returning(Episode.image_key, Episode.image_url)
+        .execution_options(synchronize_session=False)
+    )
+    deleted = 0
+    key_counts = Counter()
+    orphaned = []
+    async for image_key, image_url in rows:
+        deleted += 1
+        if image_key:
+            key_counts[image_key] += 1
+        elif image_url:
+            # Legacy per-episode image: nobody else can be using it
+            orphaned.append(image_url.rsplit("/", 1)[-1])
+    orphaned += await release_image_references(session, key_counts)
+    return deleted, orphaned
+
+async def archive_episodes(session: AsyncSession, conditions: list) -> int:
+    """Hide matching episodes without deleting them or their images (caller commits); returns how many"""
+    now = datetime.utcnow()
+    result = await session.exec(
+        update(Episode)
+        .where(Episode.archived_at.is_(None), *conditions)
+        .values(archived_at=now, updated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
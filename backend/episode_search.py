@@ -0,0 +1,175 @@
+"""
+Full-text search over episodes (SQLite FTS5)
+
+The index is an external-content FTS5 table over the episode table, kept in sync
+by triggers, so it stores only the index and not a second copy of the text.
+Other databases fall back to an unranked substring search.
+"""
+import os
+import re
+import html
+import base64
+import binascii
+from typing import Optional
+from sqlalchemy import column, func, literal_column, or_, table
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from models import Episode
+from episode_queries import InvalidQuery, PROJECTABLE_COLUMNS, SUMMARY_FIELDS
+
+SEARCH_TABLE = "episode_search"
+SEARCH_COLUMNS = ("title", "description", "comedy_description", "submitted_by")
+# bm25 weight per column, in SEARCH_COLUMNS order: a hit in the title counts most,
+# and the long, wordy comedy description least
+SEARCH_WEIGHTS = (8.0, 4.0, 1.0, 2.0)
+MAX_TERMS = 16
+# Scoring every match of a word found in most episodes takes ~0.5s on 300k rows, so only the
+# newest this many matches are ranked; such words hardly tell episodes apart anyway
+MAX_RANKED_MATCHES = int(os.getenv("SEARCH_MAX_RANKED_MATCHES", "5000"))
+SNIPPET_TOKENS = 16
+
+# Highlight markers that can't occur in episode text; swapped for <mark> after escaping
+MARK_START, MARK_END = "\x02", "\x03"
+
+# Re-creating the episode table (e.g. a batch migration on SQLite) drops its triggers;
+# `python main.py --rebuild-search` puts them back
+SEARCH_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+        {", ".join(SEARCH_COLUMNS)},
+        content='episode', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_insert AFTER INSERT ON episode BEGIN
+        INSERT INTO {SEARCH_TABLE}(rowid, {", ".join(SEARCH_COLUMNS)})
+        VALUES (new.id, {", ".join(f"new.{name}" for name in SEARCH_COLUMNS)});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_delete AFTER DELETE ON episode BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, {", ".join(SEARCH_COLUMNS)})
+        VALUES ('delete', old.id, {", ".join(f"old.{name}" for name in SEARCH_COLUMNS)});
+    END""",
+    # Only the indexed columns: status, image and archive updates don't touch the index
+    f"""CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_update AFTER UPDATE OF {", ".join(SEARCH_COLUMNS)} ON episode BEGIN
+        INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, {", ".join(SEARCH_COLUMNS)})
+        VALUES ('delete', old.id, {", ".join(f"old.{name}" for name in SEARCH_COLUMNS)});
+        INSERT INTO {SEARCH_TABLE}(rowid, {", ".join(SEARCH_COLUMNS)})
+        VALUES (new.id, {", ".join(f"new.{name}" for name in SEARCH_COLUMNS)});
+    END""",
+    # Stored in the index, so ORDER BY rank uses the column weights without naming them
+    f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rank) VALUES ('rank', 'bm25({', '.join(map(str, SEARCH_WEIGHTS))})')",
+]
+
+SEARCH_TRIGGERS = [f"{SEARCH_TABLE}_insert", f"{SEARCH_TABLE}_delete", f"{SEARCH_TABLE}_update"]
+
+def create_search_index(connection):
+    """Create the index and its triggers if missing (sync; SQLite only)"""
+    if connection.dialect.name != "sqlite":
+        return
+    for statement in SEARCH_SCHEMA:
+        connection.exec_driver_sql(statement)
+
+def drop_search_index(connection):
+    if connection.dialect.name != "sqlite":
+        return
+    for trigger in SEARCH_TRIGGERS:
+        connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+    connection.exec_driver_sql(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+
+def rebuild_search_index(connection) -> int:
+    """Recreate anything missing, re-index every episode and merge the index; returns the row count"""
+    create_search_index(connection)
+    connection.exec_driver_sql(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')")
+    connection.exec_driver_sql(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')")
+    return connection.exec_driver_sql(f"SELECT count(*) FROM {SEARCH_TABLE}").scalar()
+
+def match_expression(terms: list[str]) -> str:
+    """An FTS5 query where every word must match, the last one also as a prefix (search as you type).
+
+    Words are quoted, so FTS5 operators in the input are taken literally. The last word is
+    asked for both whole and as a prefix, so an exact hit outranks longer words it starts.
+    """
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] = f"({quoted[-1]} OR {quoted[-1]}*)"
+    return " AND ".join(quoted)
+
+def mark_highlights(value: Optional[str]) -> Optional[str]:
+    """HTML-escape the text and turn the FTS5 markers into <mark> tags"""
+    if value is None:
+        return None
+    return html.escape(value).replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+
+def encode_offset(offset: int) -> str:
+    return base64.urlsafe_b64encode(f"search|{offset}".encode()).decode().rstrip("=")
+
+def decode_offset(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        kind, offset = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        if kind != "search" or int(offset) < 0:
+            raise ValueError(cursor)
+        return int(offset)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise InvalidQuery("Invalid cursor")
+
+async def search_episodes(session: AsyncSession, query: str, limit: int, cursor: Optional[str]) -> tuple[list[dict], Optional[str]]:
+    """Best matches first, as summaries with a highlighted title and snippet.
+
+    Ranked results have no stable sort key to seek on, so the cursor is an offset.
+    On SQLite only the newest MAX_RANKED_MATCHES matches are ranked and returned.
+    """
+    offset = decode_offset(cursor) if cursor else 0
+    terms = re.findall(r"\w+", query)[:MAX_TERMS]
+    if not terms:
+        return [], None
+    columns = [PROJECTABLE_COLUMNS[name] for name in SUMMARY_FIELDS]
+
+    if session.bind.dialect.name == "sqlite":
+        index = table(SEARCH_TABLE, column("rowid"), column("rank"))
+        matches = literal_column(SEARCH_TABLE).op("MATCH")(match_expression(terms))
+        # Walking matches newest first is cheap (no scoring), so this finds where the newest
+        # MAX_RANKED_MATCHES unarchived ones begin; None when there are fewer
+        floor = (await session.exec(
+            select(index.c.rowid)
+            .select_from(index)
+            .join(Episode, Episode.id == index.c.rowid)
+            .where(matches, Episode.archived_at.is_(None))
+            .order_by(index.c.rowid.desc())
+            .offset(MAX_RANKED_MATCHES - 1)
+            .limit(1)
+        )).first()
+        statement = (
+            select(
+                *columns,
+                func.highlight(literal_column(SEARCH_TABLE), 0, MARK_START, MARK_END).label("title_highlight"),
+                func.snippet(literal_column(SEARCH_TABLE), -1, MARK_START, MARK_END, "…", SNIPPET_TOKENS).label("snippet"),
+            )
+            .select_from(index)
+            .join(Episode, Episode.id == index.c.rowid)
+            .where(matches, Episode.archived_at.is_(None), index.c.rowid >= (floor or 0))
+            .order_by(index.c.rank)
+        )
+    else:
+        # Every word somewhere in the indexed columns, newest first; the teaser stands in for a snippet
+        statement = (
+            select(*columns, Episode.title.label("title_highlight"), PROJECTABLE_COLUMNS["teaser"].label("snippet"))
+            .where(Episode.archived_at.is_(None), *(
+                or_(*(func.lower(getattr(Episode, name)).contains(term.lower(), autoescape=True) for name in SEARCH_COLUMNS))
+                for term in terms
+            ))
+            .order_by(Episode.timestamp.desc(), Episode.id.desc())
+        )
+
+    rows = (await session.exec(statement.limit(limit + 1).offset(offset))).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_offset(offset + limit)
+
+    items = [
+        {
+            **{name: row._mapping[name] for name in SUMMARY_FIELDS},
+            "title_highlight": mark_highlights(row.title_highlight),
+            "snippet": mark_highlights(row.snippet),
+        }
+        for row in rows
+    ]
+    return items, next_cursor
@@ -0,0 +1,104 @@
+import os
+import json
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+def encode_json(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+class Event:
+    """A published event, encoded once and shared by every subscriber"""
+
+    __slots__ = ("id", "type", "data", "json", "sse")
+
+    def __init__(self, event_id: int, event_type: str, data: dict):
+        self.id = event_id
+        self.type = event_type
+        self.data = data
+        self.json = json.dumps({"id": event_id, "type": event_type, "data": data}, default=encode_json)
+        self.sse = f"id: {event_id}\nevent: {event_type}\ndata: {self.json}\n\n".encode()
+
+class Subscriber:
+    def __init__(self, max_queue: int):
+        self.queue: asyncio.Queue[Optional[Event]] = asyncio.Queue(maxsize=max_queue)
+        self.lagged = False
+
+class EventHub:
+    """In-process broadcast of episode changes to SSE/WebSocket viewers.
+
+    publish() never waits: each subscriber has a bounded queue, and a subscriber
+    that falls behind is disconnected rather than slowing down everyone else.
+    Clients reconnect with Last-Event-ID and get the missed events replayed from
+    a short history, or a `resync` event if they fell further behind than that.
+    With several worker processes, `relay` (see event_relay.py) carries each
+    event to the other processes' viewers.
+    """
+
+    def __init__(self, max_queue: int = 100, history_size: int = 256):
+        self.max_queue = max_queue
+        self.subscribers: set[Subscriber] = set()
+        self.history: deque[Event] = deque(maxlen=history_size)
+        self.last_id = 0
+        # Called with every event published here, to pass it on to other worker processes
+        self.relay: Optional[Callable[[Event], None]] = None
+
+    def publish(self, event_type: str, data: dict, relay: bool = True) -> Event:
+        """Broadcast an event; `relay=False` keeps it to this process's viewers"""
+        self.last_id += 1
+        event = Event(self.last_id, event_type, data)
+        self.history.append(event)
+        for subscriber in list(self.subscribers):
+            try:
+                subscriber.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self.drop(subscriber)
+        if relay and self.relay is not None:
+            self.relay(event)
+        return event
+
+    def disconnect(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+        # Make room for the sentinel so the reader wakes up and closes
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.queue.put_nowait(None)
+
+    def drop(self, subscriber: Subscriber):
+        """Disconnect a subscriber whose queue is full"""
+        subscriber.lagged = True
+        self.disconnect(subscriber)
+        logger.warning("🐢 Dropped a slow event subscriber (%d still connected)", len(self.subscribers))
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> Subscriber:
+        subscriber = Subscriber(self.max_queue)
+        if last_event_id is not None and last_event_id != self.last_id:
+            missed = [event for event in self.history if event.id > last_event_id]
+            # Ids restart with the process, so an id from the future also means "resync"
+            if last_event_id > self.last_id or len(missed) < self.last_id - last_event_id or len(missed) >= self.max_queue:
+                subscriber.queue.put_nowait(Event(self.last_id, "resync", {}))
+            else:
+                for event in missed:
+                    subscriber.queue.put_nowait(event)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+
+    def close(self):
+        """Wake every subscriber so streams end on shutdown"""
+        for subscriber in list(self.subscribers):
+            self.disconnect(subscriber)
+
+# Global instance
+event_hub = EventHub(
+    max_queue=int(os.getenv("EVENT_QUEUE_SIZE", "100")),
+    history_size=int(os.getenv("EVENT_HISTORY_SIZE", "256")),
+)
@@ -0,0 +1,120 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import delete, func
+from sqlmodel import select
+from database import async_session
+from models import RelayedEvent
+from event_hub import event_hub, encode_json, Event
+from coordination import coordinator
+
+logger = logging.getLogger(__name__)
+
+class EventRelay:
+    """Passes live-update events between worker processes through the database.
+
+    Events published in this process are appended to the relayedevent table, and
+    rows appended by other processes are polled for every `poll_interval` seconds
+    (the way settings_cache polls its version column) and broadcast to this
+    process's viewers. Only runs when the coordinator does: a single process has
+    nobody to relay to.
+    """
+
+    def __init__(self, poll_interval: float = 0.5, retention_seconds: float = 300.0):
+        self.poll_interval = poll_interval
+        # Rows older than this are deleted; every process has long since read them
+        self.retention_seconds = retention_seconds
+        self.outbox: list[Event] = []
+        self.last_seen = 0
+        self._wake = asyncio.Event()
+        self._pruned_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def send(self, event: Event):
+        """Queue a locally published event for the other processes"""
+        self.outbox.append(event)
+        self._wake.set()
+
+    async def start(self):
+        if not coordinator.enabled:
+            return
+        # Only events published from now on are relayed
+        async with async_session() as session:
+            self.last_seen = (await session.exec(select(func.max(RelayedEvent.id)))).one() or 0
+        event_hub.relay = self.send
+        self._task = asyncio.create_task(self._relay_loop())
+
+    async def stop(self):
+        event_hub.relay = None
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.warning("⚠️  Could not relay the last %d event(s): %s: %s", len(self.outbox), type(e).__name__, e)
+
+    async def _relay_loop(self):
+        while True:
+            try:
+                # Woken early by send() so other processes see local events promptly
+                await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+                await self.receive()
+                if time.monotonic() - self._pruned_at > self.retention_seconds:
+                    await self.prune()
+            except Exception as e:
+                logger.warning("⚠️  Could not relay events: %s: %s", type(e).__name__, e)
+
+    async def flush(self):
+        """Write queued local events to the table"""
+        if not self.outbox:
+            return
+        events, self.outbox = self.outbox, []
+        try:
+            async with async_session() as session:
+                session.add_all(
+                    RelayedEvent(origin=coordinator.owner, type=event.type, data=json.dumps(event.data, default=encode_json))
+                    for event in events
+                )
+                await session.commit()
+        except Exception:
+            # Kept, in order, for the next attempt
+            self.outbox[:0] = events
+            raise
+
+    async def receive(self) -> int:
+        """Broadcast events other processes have written since the last poll; returns how many"""
+        async with async_session() as session:
+            rows = (await session.exec(
+                select(RelayedEvent).where(RelayedEvent.id > self.last_seen).order_by(RelayedEvent.id)
+            )).all()
+        received = 0
+        for row in rows:
+            self.last_seen = row.id
+            if row.origin != coordinator.owner:
+                event_hub.publish(row.type, json.loads(row.data), relay=False)
+                received += 1
+        return received
+
+    async def prune(self):
+        cutoff = datetime.utcnow() - timedelta(seconds=self.retention_seconds)
+        async with async_session() as session:
+            await session.exec(delete(RelayedEvent).where(RelayedEvent.created_at < cutoff))
+            await session.commit()
+        self._pruned_at = time.monotonic()
+
+# Global instance
+event_relay = EventRelay(
+    poll_interval=float(os.getenv("EVENT_RELAY_POLL_SECONDS", "0.5")),
+    retention_seconds=float(os.getenv("EVENT_RELAY_RETENTION_SECONDS", "300")),
+)
@@ -0,0 +1,77 @@
+import os
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, Header, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from event_hub import event_hub, Subscriber
+
+router = APIRouter()
+
+# Comment line sent on idle streams so proxies don't time the connection out
+HEARTBEAT_SECONDS = float(os.getenv("EVENT_HEARTBEAT_SECONDS", "15"))
+
+def parse_event_id(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+async def sse_events(request: Request, subscriber: Subscriber):
+    try:
+        # Browsers reconnect after this many ms and send Last-Event-ID
+        yield b"retry: 3000\n\n"
+        while True:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), timeout=HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield b": ping\n\n"
+                continue
+            if event is None:
+                break
+            yield event.sse
+    finally:
+        event_hub.unsubscribe(subscriber)
+
+@router.get("/api/events")
+async def stream_events(request: Request, last_event_id: Optional[str] = Header(default=None)):
+    """Server-Sent Events feed of episode and settings changes"""
+    subscriber = event_hub.subscribe(parse_event_id(last_event_id or request.query_params.get("last_event_id")))
+    return StreamingResponse(
+        sse_events(request, subscriber),
+        media_type="text/event-stream",
+        headers={"cache-control": "no-cache", "x-accel-buffering": "no"},
+    )
+
+@router.websocket("/api/events/ws")
+async def websocket_events(websocket: WebSocket, last_event_id: Optional[str] = None):
+    """Same feed as /api/events, one JSON message per event"""
+    await websocket.accept()
+    subscriber = event_hub.subscribe(parse_event_id(last_event_id))
+
+    async def forward():
+        while (event := await subscriber.queue.get()) is not None:
+            await websocket.send_text(event.json)
+
+    async def wait_for_close():
+        # Clients don't send anything; reading is how a disconnect is noticed
+        try:
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+
+    sender = asyncio.create_task(forward())
+    receiver = asyncio.create_task(wait_for_close())
+    try:
+        await asyncio.wait([sender, receiver], return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        event_hub.unsubscribe(subscriber)
+        client_left = receiver.done()
+        for task in (sender, receiver):
+            task.cancel()
+        await asyncio.gather(sender, receiver, return_exceptions=True)
+    if not client_left and sender.exception() is None:
+        # Dropped for lagging (1013: try again later) or server shutting down (1001)
+        await websocket.close(code=1013 if subscriber.lagged else 1001)
@@ -0,0 +1,401 @@
+import os
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Optional
+from collections import defaultdict
+from sqlmodel import select
+from database import async_session
+from models import Episode, GenerationStatus, PENDING_TITLE
+from stage_executor import Stage, StageGraphExecutor, format_timings
+from image_service import image_service
+from image_store import add_image_reference
+from image_derivatives import image_derivative_service
+from episode_queries import summarize_episode
+from event_hub import event_hub
+from title_service import title_service
+from episode_description_service import episode_description_service
+from combined_generation_service import combined_generation_service
+from openai_client import describe_openai_error
+from metrics import STAGE_SECONDS, FALLBACKS, RETRIES, LATE_RESULTS
+from tracing import tracer
+from coordination import coordinator
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = (GenerationStatus.IMAGE_DONE.value, GenerationStatus.FAILED.value)
+
+class StageFailed(Exception):
+    """Raised when a generation stage keeps failing after all retries"""
+
+class GenerationQueue:
+    def __init__(self, worker_count: int = 3, max_attempts: int = 3, base_delay: float = 2.0, image_depends_on_title: bool = True,
+                 stage_budgets: Optional[dict[str, float]] = None, combined_text: bool = False, reclaim_interval: float = 30.0):
+        self.worker_count = worker_count
+        # When False the image prompt is built from the raw description, so the image starts alongside the title
+        self.image_depends_on_title = image_depends_on_title
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.queue: asyncio.Queue[int] = asyncio.Queue()
+        self.workers: list[asyncio.Task] = []
+        self.queued_ids: set[int] = set()
+        # Callers waiting for an episode to come out of the queue (bulk imports report each one)
+        self.waiters: defaultdict[int, list[asyncio.Future]] = defaultdict(list)
+        # Episodes whose submitter asked to skip the LLM response cache
+        self.cache_bypass_ids: set[int] = set()
+        # Stages of one episode save concurrently; each save must see the previous one's fields.
+        # Held from register() until forget(); saves arriving after that are dropped
+        self.save_locks: dict[int, asyncio.Lock] = {}
+        # Trace of the request that queued each episode, so its generation shows up in the same trace
+        self.trace_parents: dict[int, tuple[str, str]] = {}
+        # Seconds a text stage may wait on the LLM before settling for the local result (0 waits indefinitely)
+        self.stage_budgets = stage_budgets or {}
+        # Write title and description with one streamed completion, keeping the separate calls as fallback
+        self.combined_text = combined_text
+        # LLM calls that outlive their stage: late results that will replace a local one, and combined streams
+        self.late_tasks: set[asyncio.Task] = set()
+        # With several worker processes, how often to pick up episodes whose worker died or fell behind
+        self.reclaim_interval = reclaim_interval
+
+    async def start(self):
+        """Spawn the worker pool and re-queue jobs left unfinished by a previous run"""
+        for n in range(self.worker_count):
+            self.workers.append(asyncio.create_task(self._worker(n)))
+        await self.resume_unfinished()
+        if coordinator.enabled and self.reclaim_interval > 0:
+            self.workers.append(asyncio.create_task(self._reclaim_loop()))
+
+    async def stop(self):
+        """Cancel the worker pool; unfinished jobs are picked up again on next start"""
+        tasks = [*self.workers, *self.late_tasks]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.workers = []
+
+    def register(self, episode_id: int):
+        """Start accepting stage saves for an episode"""
+        self.save_locks.setdefault(episode_id, asyncio.Lock())
+
+    def enqueue(self, episode_id: int, bypass_cache: bool = False):
+        """Schedule generation for an episode (no-op if it's already queued)"""
+        self.register(episode_id)
+        if bypass_cache:
+            self.cache_bypass_ids.add(episode_id)
+        if episode_id in self.queued_ids:
+            return
+        self.queued_ids.add(episode_id)
+        if (trace_context := tracer.current_context()) is not None:
+            self.trace_parents[episode_id] = trace_context
+        self.queue.put_nowait(episode_id)
+
+    async def generate(self, episode_id: int, bypass_cache: bool = False):
+        """Queue an episode and wait until its generation has finished, here or in another worker process"""
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters[episode_id].append(waiter)
+        self.enqueue(episode_id, bypass_cache)
+        if not await waiter:
+            # Another worker process holds the episode; follow its progress through the database
+            await self.wait_until_finished(episode_id)
+
+    async def wait_until_finished(self, episode_id: int):
+        """Poll until the episode reaches a terminal status or is deleted"""
+        while True:
+            async with async_session() as session:
+                status = (await session.exec(select(Episode.generation_status).where(Episode.id == episode_id))).first()
+            if status is None or status in TERMINAL_STATUSES:
+                return
+            await asyncio.sleep(coordinator.poll_interval)
+
+    async def resume_unfinished(self, idle_for: float = 0):
+        """Queue every episode whose generation never reached a terminal status.
+
+        Episodes another worker process holds a lease on are left to it, as are
+        ones saved within the last `idle_for` seconds.
+        """
+        conditions = [Episode.generation_status.not_in(TERMINAL_STATUSES), Episode.archived_at.is_(None)]
+        if idle_for > 0:
+            conditions.append(Episode.updated_at < datetime.utcnow() - timedelta(seconds=idle_for))
+        async with async_session() as session:
+            episode_ids = (await session.exec(select(Episode.id).where(*conditions).order_by(Episode.id))).all()
+
+        leased = await coordinator.leased_keys("episode:")
+        episode_ids = [episode_id for episode_id in episode_ids if str(episode_id) not in leased and episode_id not in self.queued_ids]
+        for episode_id in episode_ids:
+            self.enqueue(episode_id)
+
+        if episode_ids:
+            logger.info("🔁 Resuming generation for %d unfinished episode(s)", len(episode_ids))
+
+    async def _reclaim_loop(self):
+        while True:
+            await asyncio.sleep(self.reclaim_interval)
+            try:
+                await self.resume_unfinished(idle_for=self.reclaim_interval)
+            except Exception as e:
+                logger.warning("⚠️  Could not check for abandoned episodes: %s: %s", type(e).__name__, e)
+
+    async def _worker(self, n: int):
+        while True:
+            episode_id = await self.queue.get()
+            processed = True
+            try:
+                processed = await self.process_episode(episode_id)
+            except Exception:
+                logger.exception("❌ Generation worker %d crashed on episode %s", n, episode_id)
+            finally:
+                self.queued_ids.discard(episode_id)
+                self.forget(episode_id)
+                for waiter in self.waiters.pop(episode_id, []):
+                    if not waiter.done():
+                        waiter.set_result(processed)
+                self.queue.task_done()
+
+    def forget(self, episode_id: int):
+        """Drop per-episode bookkeeping once its generation has finished"""
+        self.cache_bypass_ids.discard(episode_id)
+        self.save_locks.pop(episode_id, None)
+        self.trace_parents.pop(episode_id, None)
+
+    async def run_stage(self, name: str, episode_id: int, func, /, *args, **kwargs):
+        """Run one stage, retrying with exponential backoff on errors or empty results"""
+        for attempt in range(1, self.max_attempts + 1):
+            if attempt > 1:
+                RETRIES.inc(source=f"stage_{name}")
+            with tracer.span(f"stage.{name}", episode_id=episode_id, attempt=attempt) as span:
+                try:
+                    result = await func(*args, **kwargs)
+                    if result is not None:
+                        return result
+                    span.set(outcome="empty")
+                    logger.warning("⚠️  Stage '%s' returned nothing for episode %s (attempt %d/%d)", name, episode_id, attempt, self.max_attempts)
+                except Exception as e:
+                    span.set(outcome="error", error=describe_openai_error(e))
+                    logger.error("❌ Stage '%s' failed for episode %s (attempt %d/%d): %s", name, episode_id, attempt, self.max_attempts, describe_openai_error(e))
+
+            if attempt < self.max_attempts:
+                await asyncio.sleep(self.base_delay * 2 ** (attempt - 1))
+
+        FALLBACKS.inc(stage=name)
+        raise StageFailed(name)
+
+    async def run_text_stage(self, name: str, episode_id: int, local, save, func, /, *args, **kwargs) -> str:
+        """Run a text stage within its latency budget and save the result.
+
+        If the LLM misses the budget (or fails) `local()` is saved instead; a late LLM result
+        still replaces it through `save` if it arrives before the episode is finished.
+        """
+        async def generate() -> Optional[str]:
+            try:
+                return await self.run_stage(name, episode_id, func, *args, **kwargs)
+            except StageFailed:
+                return None
+
+        task = asyncio.create_task(generate())
+        budget = self.stage_budgets.get(name, 0)
+        try:
+            result = await asyncio.wait_for(asyncio.shield(task), budget) if budget > 0 else await task
+        except asyncio.TimeoutError:
+            FALLBACKS.inc(stage=f"{name}_budget")
+            logger.warning("⏱️  Stage '%s' missed its %.1fs budget for episode %s, using the local result", name, budget, episode_id)
+            value = local()
+            await save(value)
+            # Started only after the local save so the LLM result can't be overwritten by it
+            self.track(asyncio.create_task(self.apply_late_result(name, episode_id, task, save)))
+            return value
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+
+        value = result if result is not None else local()
+        await save(value)
+        return value
+
+    def track(self, task: asyncio.Task):
+        """Keep a background LLM task until it finishes, so stop() can cancel it"""
+        self.late_tasks.add(task)
+        task.add_done_callback(self.late_tasks.discard)
+
+    async def apply_late_result(self, name: str, episode_id: int, task: asyncio.Task, save):
+        try:
+            result = await task
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        if result is not None and await save(result):
+            LATE_RESULTS.inc(stage=name)
+            logger.info("🔁 Replaced the local %s of episode %s with the LLM result", name, episode_id)
+
+    async def save_stage(self, episode_id: int, image_failed: bool = False, **fields) -> Optional[Episode]:
+        """Persist the output of a stage and recompute the episode's status"""
+        lock = self.save_locks.get(episode_id)
+        if lock is None:
+            # Generation has finished (or never started here); a straggling late result is dropped
+            logger.debug("🗑️  Dropped a save for episode %s after its generation finished", episode_id)
+            return None
+        async with lock, async_session() as session:
+            episode = await session.get(Episode, episode_id)
+            if not episode:
+                return None
+            for key, value in fields.items():
+                setattr(episode, key, value)
+            if fields.get("image_key"):
+                await add_image_reference(session, fields["image_key"], image_service.filename_for_key(fields["image_key"]))
+            episode.generation_status = derive_status(episode, image_failed).value
+            episode.updated_at = datetime.utcnow()
+            session.add(episode)
+            with STAGE_SECONDS.time(stage="db_commit"), tracer.span("db.commit", episode_id=episode_id):
+                await session.commit()
+            await session.refresh(episode)
+            # Published under the lock so viewers see saves in commit order
+            event_hub.publish(stage_event(fields), summarize_episode(episode))
+            return episode
+
+    def build_stages(self, episode: Episode) -> list[Stage]:
+        """Stage graph: title first, then description and image side by side"""
+        episode_id = episode.id
+        use_cache = episode_id not in self.cache_bypass_ids
+        image_failed = False
+        combined = None
+
+        async def generate_title() -> str:
+            if combined is not None and (title := await combined.title()) is not None:
+                return title
+            return await title_service.generate_episode_title(episode.description, fallback=False, use_cache=use_cache)
+
+        async def generate_description(title: str) -> str:
+            if combined is not None and (comedy_description := await combined.comedy_description()) is not None:
+                return comedy_description
+            return await episode_description_service.generate_episode_description(title, episode.description, fallback=False, use_cache=use_cache)
+
+        async def title_stage(results: dict) -> str:
+            nonlocal combined
+            logger.info("🎬 Generating title for episode %s by %s", episode_id, episode.submitted_by)
+            if self.combined_text and "description" not in results:
+                # The title is saved as soon as it has streamed in, while the description is still being written
+                combined = combined_generation_service.start(episode.description, use_cache=use_cache)
+                self.track(combined.task)
+            return await self.run_text_stage(
+                "title", episode_id,
+                lambda: title_service.fallback_title(episode.description),
+                lambda title: self.save_stage(episode_id, title=title),
+                generate_title,
+            )
+
+        async def description_stage(results: dict) -> str:
+            title = results["title"]
+            logger.info("🎭 Generating comedy description for episode %s", episode_id)
+            return await self.run_text_stage(
+                "description", episode_id,
+                lambda: episode_description_service.fallback_description(title, episode.description),
+                # image_failed is read when the save happens, so a late save sees the image stage's outcome
+                lambda comedy_description: self.save_stage(episode_id, image_failed=image_failed, comedy_description=comedy_description),
+                generate_description, title,
+            )
+
+        async def image_stage(results: dict) -> Optional[str]:
+            nonlocal image_failed
+            title = results.get("title") if self.image_depends_on_title else None
+            logger.info("🎨 Generating image for episode %s", episode_id)
+            # Held until the reference is saved, so deleting an episode sharing the image can't remove the file first
+            async with image_service.holding(image_service.episode_image_key(title, episode.description)):
+                try:
+                    image_filename = await self.run_stage(
+                        "image", episode_id, image_service.generate_episode_image, title, episode.description, episode_id
+                    )
+                except StageFailed:
+                    # Continue without image - the episode is still usable
+                    image_failed = True
+                    await self.save_stage(episode_id, image_failed=True)
+                    logger.warning("⚠️  Episode %s finished without an image", episode_id)
+                    return None
+                image_key = image_service.key_for_filename(image_filename)
+                # Resized WebP copies for the grid; the original still works if encoding fails
+                image_variants = await image_derivative_service.ensure_derivatives(image_key, image_filename)
+                saved = await self.save_stage(
+                    episode_id,
+                    image_url=image_service.get_image_url(image_filename),
+                    image_key=image_key,
+                    image_variants=image_variants,
+                )
+            if not saved:
+                # Episode was deleted mid-generation; the orphan sweep reclaims the file
+                return image_filename
+            logger.info("✅ Image generated successfully: %s", image_filename)
+            return image_filename
+
+        return [
+            Stage("title", title_stage),
+            Stage("description", description_stage, depends_on=["title"]),
+            Stage("image", image_stage, depends_on=["title"] if self.image_depends_on_title else []),
+        ]
+
+    async def process_episode(self, episode_id: int) -> bool:
+        """Run the generation stage graph, skipping stages whose output is already saved.
+
+        Returns False when another worker process is generating the episode instead.
+        """
+        async with coordinator.claim(f"episode:{episode_id}") as claimed:
+            if not claimed:
+                logger.debug("🤝 Episode %s is being generated by another worker", episode_id)
+                return False
+            with tracer.start_trace("generate_episode", parent=self.trace_parents.pop(episode_id, None), episode_id=episode_id):
+                await self._process_episode(episode_id)
+            return True
+
+    async def _process_episode(self, episode_id: int):
+        async with async_session() as session:
+            episode = await session.get(Episode, episode_id)
+        if not episode:
+            # Deleted while waiting in the queue
+            return
+        if episode.generation_status in TERMINAL_STATUSES:
+            # Finished by another worker process while this one had it queued
+            return
+
+        results = {}
+        if episode.generation_status != GenerationStatus.PENDING.value:
+            results["title"] = episode.title
+        if episode.comedy_description is not None:
+            results["description"] = episode.comedy_description
+        if episode.image_url is not None:
+            results["image"] = episode.image_url
+
+        timings = await StageGraphExecutor(self.build_stages(episode)).run(results)
+        for stage, seconds in timings.items():
+            if stage != "total":
+                STAGE_SECONDS.observe(seconds, stage=stage)
+        logger.info("⏱️  Episode %s generation finished: %s", episode_id, format_timings(timings), extra={"episode_id": episode_id})
+
+def stage_event(fields: dict) -> str:
+    """Name of the event announcing a stage save"""
+    if "title" in fields:
+        return "title_ready"
+    if "comedy_description" in fields:
+        return "description_ready"
+    if "image_url" in fields:
+        return "image_ready"
+    return "episode_updated"
+
+def derive_status(episode: Episode, image_failed: bool = False) -> GenerationStatus:
+    """Work out the status from which stage outputs are present"""
+    if episode.generation_status == GenerationStatus.PENDING.value and episode.title == PENDING_TITLE:
+        return GenerationStatus.PENDING
+    if episode.comedy_description is None:
+        return GenerationStatus.TITLE_DONE
+    if episode.image_url is None:
+        return GenerationStatus.FAILED if image_failed else GenerationStatus.DESCRIPTION_DONE
+    return GenerationStatus.IMAGE_DONE
+
+# Global instance
+generation_queue = GenerationQueue(
+    worker_count=int(os.getenv("GENERATION_WORKERS", "3")),
+    max_attempts=int(os.getenv("GENERATION_MAX_ATTEMPTS", "3")),
+    image_depends_on_title=os.getenv("IMAGE_PROMPT_SOURCE", "title") != "description",
+    stage_budgets={
+        "title": float(os.getenv("TITLE_BUDGET_SECONDS", "10")),
+        "description": float(os.getenv("DESCRIPTION_BUDGET_SECONDS", "20")),
+    },
+    combined_text=os.getenv("GENERATION_MODE", "combined") == "combined",
+    reclaim_interval=float(os.getenv("GENERATION_RECLAIM_SECONDS", "30")),
+)
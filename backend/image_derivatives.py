@@ -0,0 +1,128 @@
+import os
+import uuid
+import base64
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+from database import async_session
+from models import ImageAsset
+from image_service import image_service
+from tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+# Widths served to the frontend via srcset; 1024 is the DALL-E original size
+DERIVATIVE_WIDTHS = (256, 512, 1024)
+WEBP_QUALITY = 80
+PLACEHOLDER_WIDTH = 16
+
+def derivative_filename(key: str, width: int) -> str:
+    return f"{key}_{width}.webp"
+
+def render_derivatives(source_path: str, output_dir: str, key: str) -> dict:
+    """Encode resized WebP copies and a tiny inline placeholder (runs in a worker process)"""
+    from io import BytesIO
+    from PIL import Image
+
+    with Image.open(source_path) as original:
+        image = original.convert("RGB")
+
+    widths = []
+    for width in DERIVATIVE_WIDTHS:
+        if width > image.width:
+            continue
+        height = round(image.height * width / image.width)
+        resized = image if width == image.width else image.resize((width, height), Image.Resampling.LANCZOS)
+        target = os.path.join(output_dir, derivative_filename(key, width))
+        # Unique per writer: another worker process may be rendering the same key
+        tmp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+        try:
+            resized.save(tmp_path, format="WEBP", quality=WEBP_QUALITY, method=4)
+            os.replace(tmp_path, target)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        widths.append(width)
+
+    # LQIP: a blurred 16px image small enough to inline in the API response
+    placeholder_height = max(1, round(image.height * PLACEHOLDER_WIDTH / image.width))
+    tiny = image.resize((PLACEHOLDER_WIDTH, placeholder_height), Image.Resampling.BILINEAR)
+    buffer = BytesIO()
+    tiny.save(buffer, format="WEBP", quality=30)
+    placeholder = "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode()
+
+    return {"widths": widths, "placeholder": placeholder}
+
+class ImageDerivativeService:
+    def __init__(self, max_workers: int = 2):
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._in_flight: dict[str, asyncio.Future] = {}
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        # Created on first use so importing this module doesn't start processes. Not forked
+        # from the app, whose logging and aiosqlite threads may hold locks at that moment
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("forkserver"))
+        return self._executor
+
+    def build_variants(self, key: str, widths: list[int], placeholder: Optional[str]) -> dict:
+        """srcset-ready description of the stored derivatives"""
+        sources = [
+            {"url": image_service.get_image_url(derivative_filename(key, width)), "width": width, "type": "image/webp"}
+            for width in widths
+        ]
+        return {
+            "placeholder": placeholder,
+            "sources": sources,
+            "srcset": ", ".join(f"{source['url']} {source['width']}w" for source in sources),
+        }
+
+    async def ensure_derivatives(self, key: str, filename: str) -> Optional[dict]:
+        """Return the variants for an image, encoding them on first use"""
+        # Single-flight: episodes sharing an image must not encode into the same temp files at once
+        future = self._in_flight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._ensure_derivatives(key, filename))
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(future)
+
+    async def _ensure_derivatives(self, key: str, filename: str) -> Optional[dict]:
+        async with async_session() as session:
+            asset = await session.get(ImageAsset, key)
+            if asset and asset.variants and all(
+                image_service.image_exists(derivative_filename(key, width)) for width in asset.variants["widths"]
+            ):
+                return self.build_variants(key, asset.variants["widths"], asset.variants["placeholder"])
+
+        try:
+            loop = asyncio.get_running_loop()
+            with tracer.span("image.derivatives", image_key=key):
+                rendered = await loop.run_in_executor(
+                    self.executor, render_derivatives, image_service.get_image_path(filename), image_service.storage_dir, key
+                )
+        except Exception as e:
+            logger.warning("⚠️  Could not create image derivatives for %s: %s: %s", filename, type(e).__name__, e)
+            return None
+
+        async with async_session() as session:
+            asset = await session.get(ImageAsset, key)
+            if asset:
+                asset.variants = rendered
+                session.add(asset)
+                await session.commit()
+
+        logger.info("🖼️  Created %d WebP derivative(s) for %s", len(rendered["widths"]), filename)
+        return self.build_variants(key, rendered["widths"], rendered["placeholder"])
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+# Global instance
+image_derivative_service = ImageDerivativeService(max_workers=int(os.getenv("IMAGE_PROCESS_WORKERS", "2")))
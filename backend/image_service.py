@@ -1,40 +1,67 @@
 import os
+import re
+import glob
+import uuid
+import asyncio
 import hashlib
+import logging
 import aiofiles
-import httpx
-from openai import AsyncOpenAI
-from typing import Optional
-import asyncio
-from datetime import datetime
-from dotenv import load_dotenv
+from typing import AsyncIterator, Optional
+from collections import Counter
+from contextlib import asynccontextmanager
+from database import async_session
+from models import ImageAsset
+from openai_client import openai_pool
+from metrics import STAGE_SECONDS, CACHE_REQUESTS
+from tracing import tracer, CLIENT
+from coordination import coordinator
+
+logger = logging.getLogger(__name__)
+
+IMAGE_MODEL = "dall-e-3"
+IMAGE_SIZE = "1024x1024"
+IMAGE_QUALITY = "standard"
+
+# Content-addressed images are named <32 hex chars>.png
+CONTENT_KEY_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+# DALL-E 3 PNGs are 1-3 MB; anything far larger is not a thumbnail
+MAX_IMAGE_BYTES = 20 * 1024 * 1024
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
 
-# Load environment variables
-load_dotenv()
+def file_sha256(filepath: str) -> str:
+    hasher = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
 
 class ImageGenerationService:
     def __init__(self, storage_dir: str = "static/images"):
         self.storage_dir = storage_dir
-        
-        # Initialize OpenAI client with API key from environment
-        api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY environment variable is required")
-        
-        self.client = AsyncOpenAI(api_key=api_key)
+        self._in_flight: dict[str, asyncio.Future] = {}
+        # Keys an episode is about to reference; their files must survive until it has
+        self._holds: Counter[str] = Counter()
         self.ensure_storage_directory()
         
     def ensure_storage_directory(self):
         """Create storage directory if it doesn't exist"""
         os.makedirs(self.storage_dir, exist_ok=True)
         
-    def generate_dalle_prompt(self, title: str, description: str) -> str:
-        """Generate a DALL-E prompt for Netflix-style episode thumbnail"""
+    def generate_dalle_prompt(self, title: Optional[str], description: str) -> str:
+        """Generate a DALL-E prompt for Netflix-style episode thumbnail
+        
+        When no title is given the prompt is built from the raw description alone,
+        so the image can be generated before the title is ready.
+        """
+        
+        title_line = f'Episode Title: "{title}"\n        ' if title else ""
         
         # Create a cinematic, Netflix-style prompt
         prompt = f"""Create a Netflix-style episode thumbnail for a TV show called "CaseMark Blitz Chronicles". 
         
-        Episode Title: "{title}"
-        Episode Description: "{description}"
+        {title_line}Episode Description: "{description}"
         
         Style requirements:
         - Cinematic, high-quality digital artwork
@@ -51,67 +78,190 @@ class ImageGenerationService:
         
         return prompt
     
-    async def generate_episode_image(self, title: str, description: str, episode_id: int) -> Optional[str]:
-        """Generate DALL-E image for episode"""
-        print(f"🎨 Starting image generation for episode {episode_id}")
+    def image_key(self, prompt: str) -> str:
+        """Content address for an image: a hash of the prompt and generation settings only"""
+        payload = f"{IMAGE_MODEL}|{IMAGE_SIZE}|{IMAGE_QUALITY}|{prompt}"
+        return hashlib.sha256(payload.encode()).hexdigest()[:32]
+    
+    def episode_image_key(self, title: Optional[str], description: str) -> str:
+        return self.image_key(self.generate_dalle_prompt(title, description))
+    
+    def filename_for_key(self, key: str) -> str:
+        return f"{key}.png"
+    
+    def key_for_filename(self, filename: str) -> Optional[str]:
+        """Return the content key for a content-addressed filename, None for legacy per-episode files"""
+        stem, ext = os.path.splitext(filename)
+        if ext == ".png" and CONTENT_KEY_PATTERN.fullmatch(stem):
+            return stem
+        return None
+    
+    def is_in_flight(self, key: str) -> bool:
+        return key in self._in_flight or key in self._holds
+    
+    @asynccontextmanager
+    async def holding(self, key: str) -> AsyncIterator[None]:
+        """Keep the image for `key` from being swept until the block has saved its reference.
+
+        The image:<key> lease stays held too, so other worker processes leave the file alone.
+        """
+        self._holds[key] += 1
+        try:
+            yield
+        finally:
+            self._holds[key] -= 1
+            if self._holds[key] <= 0:
+                del self._holds[key]
+                if key not in self._in_flight:
+                    await coordinator.release(f"image:{key}")
+    
+    async def generate_episode_image(self, title: Optional[str], description: str, episode_id: int) -> Optional[str]:
+        """Generate DALL-E image for episode, reusing any stored image with the same prompt"""
+        logger.debug("🎨 Starting image generation for episode %s", episode_id)
+        
+        # Generate DALL-E prompt
+        prompt = self.generate_dalle_prompt(title, description)
+        key = self.image_key(prompt)
         
+        # Single-flight: concurrent requests for the same content share one generation
+        future = self._in_flight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._generate_leased(key, prompt, episode_id))
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            logger.info("🔗 Joining in-flight generation %s for episode %s", key, episode_id)
+        
+        return await asyncio.shield(future)
+    
+    async def _generate_leased(self, key: str, prompt: str, episode_id: int) -> Optional[str]:
+        """Only one worker process generates an image; the others wait for its lease and then find the file"""
+        name = f"image:{key}"
+        while not await coordinator.acquire(name):
+            await asyncio.sleep(coordinator.poll_interval)
         try:
-            # Generate unique filename
-            content_hash = hashlib.md5(f"{title}{description}".encode()).hexdigest()[:8]
-            filename = f"episode_{episode_id}_{content_hash}.png"
+            return await self._generate_image(key, prompt, episode_id)
+        finally:
+            # Episodes still to save a reference release it when they are done
+            if key not in self._holds:
+                await coordinator.release(name)
+
+    async def _generate_image(self, key: str, prompt: str, episode_id: int) -> Optional[str]:
+        try:
+            filename = self.filename_for_key(key)
             filepath = os.path.join(self.storage_dir, filename)
             
-            print(f"📁 Target file path: {filepath}")
-            
-            # Check if image already exists
+            # Check if image already exists and is intact
             if os.path.exists(filepath):
-                print(f"♻️  Image already exists, using cached version: {filename}")
-                return filename
+                if await self.verify_image(key, filepath):
+                    CACHE_REQUESTS.inc(cache="image", result="hit")
+                    logger.info("♻️  Image already exists, using cached version: %s", filename)
+                    return filename
+                logger.warning("⚠️  Stored image %s is corrupt, regenerating", filename)
+                self.delete_image(filename)
             
-            # Generate DALL-E prompt
-            prompt = self.generate_dalle_prompt(title, description)
-            print(f"📝 Generated prompt: {prompt[:100]}...")
+            CACHE_REQUESTS.inc(cache="image", result="miss")
+            logger.debug("📝 Generated prompt: %.100s...", prompt)
             
             # Call DALL-E API
-            print("🔄 Calling DALL-E API...")
-            response = await self.client.images.generate(
-                model="dall-e-3",
-                prompt=prompt,
-                size="1024x1024",  # DALL-E 3 standard size
-                quality="standard",
-                n=1,
-            )
-            
-            # Get the image URL
-            image_url = response.data[0].url
-            print(f"🔗 Got image URL: {image_url[:50]}...")
+            with STAGE_SECONDS.time(stage="image_call"):
+                response = await openai_pool.generate_image(
+                    model=IMAGE_MODEL,
+                    prompt=prompt,
+                    size=IMAGE_SIZE,  # DALL-E 3 standard size
+                    quality=IMAGE_QUALITY,
+                    n=1,
+                )
             
             # Download the image
-            print("⬇️  Downloading image...")
-            async with httpx.AsyncClient() as client:
-                img_response = await client.get(image_url)
-                img_response.raise_for_status()
-                
-                print(f"📊 Downloaded {len(img_response.content)} bytes")
-                
-                # Save the image
-                async with aiofiles.open(filepath, 'wb') as f:
-                    await f.write(img_response.content)
+            with STAGE_SECONDS.time(stage="image_download"), tracer.span("image.download", CLIENT) as span:
+                checksum, size = await self.download_image(response.data[0].url, filepath)
+                span.set(size=size)
+            await self.record_image(key, filename, checksum, size)
             
-            print(f"✅ Image saved successfully: {filename}")
+            logger.info("✅ Image saved successfully: %s (%d bytes)", filename, size)
             return filename
             
         except Exception as e:
-            print(f"❌ Error generating image for episode {episode_id}: {str(e)}")
-            print(f"🔍 Error type: {type(e).__name__}")
-            
-            # Print more details for debugging
-            if hasattr(e, 'response'):
-                print(f"📡 Response status: {e.response.status_code if hasattr(e.response, 'status_code') else 'N/A'}")
-                print(f"📡 Response text: {e.response.text if hasattr(e.response, 'text') else 'N/A'}")
-            
+            response = getattr(e, "response", None)
+            logger.error(
+                "❌ Error generating image for episode %s: %s: %s", episode_id, type(e).__name__, e,
+                extra={"status_code": getattr(response, "status_code", None)},
+            )
+            if response is not None and hasattr(response, "text"):
+                logger.debug("📡 Response text: %s", response.text)
             return None
     
+    async def download_image(self, url: str, filepath: str) -> tuple[str, int]:
+        """Stream an image to a temp file, fsync it and atomically move it into place.
+        
+        Returns the SHA-256 checksum and size of the saved file. A crash mid-download
+        never leaves a truncated file at `filepath`.
+        """
+        tmp_path = f"{filepath}.{uuid.uuid4().hex}.tmp"
+        hasher = hashlib.sha256()
+        size = 0
+        try:
+            # Reuse the pooled keep-alive connection instead of a fresh client per download
+            async with openai_pool.http_client.stream("GET", url) as response:
+                response.raise_for_status()
+                
+                content_type = response.headers.get("content-type", "")
+                if not content_type.startswith("image/"):
+                    raise ValueError(f"Unexpected content type for image download: {content_type!r}")
+                content_length = response.headers.get("content-length")
+                if content_length and int(content_length) > MAX_IMAGE_BYTES:
+                    raise ValueError(f"Image too large: {content_length} bytes")
+                
+                async with aiofiles.open(tmp_path, 'wb') as f:
+                    async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                        size += len(chunk)
+                        if size > MAX_IMAGE_BYTES:
+                            raise ValueError(f"Image exceeded {MAX_IMAGE_BYTES} bytes while downloading")
+                        hasher.update(chunk)
+                        await f.write(chunk)
+                    await f.flush()
+                    await asyncio.to_thread(os.fsync, f.fileno())
+            
+            if size == 0:
+                raise ValueError("Downloaded image is empty")
+            os.replace(tmp_path, filepath)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        
+        return hasher.hexdigest(), size
+    
+    async def verify_image(self, key: str, filepath: str) -> bool:
+        """Check a stored image against the checksum recorded when it was downloaded"""
+        expected = await self.recorded_checksum(key)
+        actual = await asyncio.to_thread(file_sha256, filepath)
+        if expected is None:
+            # Unknown file (e.g. recorded before checksums existed): accept any non-empty PNG and record it
+            with open(filepath, "rb") as f:
+                if f.read(len(PNG_SIGNATURE)) != PNG_SIGNATURE:
+                    return False
+            await self.record_image(key, os.path.basename(filepath), actual, os.path.getsize(filepath))
+            return True
+        return actual == expected
+    
+    async def recorded_checksum(self, key: str) -> Optional[str]:
+        async with async_session() as session:
+            asset = await session.get(ImageAsset, key)
+            return asset.checksum if asset else None
+    
+    async def record_image(self, key: str, filename: str, checksum: str, size: int):
+        """Store the checksum of a freshly saved image (reference counts are kept by image_store)"""
+        async with async_session() as session:
+            asset = await session.get(ImageAsset, key)
+            if asset is None:
+                asset = ImageAsset(key=key, filename=filename, ref_count=0)
+            asset.checksum = checksum
+            asset.size_bytes = size
+            session.add(asset)
+            await session.commit()
+    
     def get_image_path(self, filename: str) -> str:
         """Get full path to image file"""
         return os.path.join(self.storage_dir, filename)
@@ -121,9 +271,13 @@ class ImageGenerationService:
         return os.path.exists(self.get_image_path(filename))
     
     def delete_image(self, filename: str) -> bool:
-        """Delete image file"""
+        """Delete image file along with any resized derivatives"""
         try:
             filepath = self.get_image_path(filename)
+            key = self.key_for_filename(filename)
+            if key:
+                for derivative in glob.glob(os.path.join(self.storage_dir, f"{key}_*.webp")):
+                    os.remove(derivative)
             if os.path.exists(filepath):
                 os.remove(filepath)
                 return True
@@ -131,6 +285,10 @@ class ImageGenerationService:
         except Exception:
             return False
     
+    def delete_images(self, filenames: list[str]) -> int:
+        """Delete several image files, returning how many were removed"""
+        return sum(1 for filename in filenames if self.delete_image(filename))
+    
     def get_image_url(self, filename: str) -> str:
         """Get URL for serving the image"""
         return f"/static/images/{filename}"
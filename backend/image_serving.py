@@ -0,0 +1,107 @@
+import os
+import re
+import mimetypes
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+from image_service import image_service
+
+router = APIRouter()
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "public, max-age=300, must-revalidate"
+
+# Content-addressed originals/derivatives, plus legacy episode_<id>_<md5>.png files whose name also encodes the content
+HASHED_FILENAME_PATTERN = re.compile(r"([0-9a-f]{32})(_\d+)?\.(png|webp|avif)|episode_\d+_[0-9a-f]{8}\.png")
+
+# Alternative image formats in order of preference when the browser accepts them
+NEGOTIABLE_FORMATS = [("image/avif", "avif"), ("image/webp", "webp")]
+
+# Precompressed siblings (e.g. logo.svg.br) for compressible files
+PRECOMPRESSED_ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+def is_content_hashed(filename: str) -> bool:
+    return HASHED_FILENAME_PATTERN.fullmatch(filename) is not None
+
+def accepts(header: str, value: str) -> bool:
+    """True if an Accept/Accept-Encoding header lists `value` with a non-zero q"""
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        if token.strip().lower() != value:
+            continue
+        match = re.search(r"q=([\d.]+)", params)
+        return not match or float(match.group(1)) > 0
+    return False
+
+def select_representation(filename: str, request: Request) -> tuple[str, str, Optional[str], list[str]]:
+    """Pick the smallest stored file the client can use.
+
+    Returns (path, media type, content encoding, Vary headers).
+    """
+    path = image_service.get_image_path(filename)
+    media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    candidates = [(path, media_type, None)]
+    vary = []
+
+    key = image_service.key_for_filename(filename)
+    if key:
+        # A content-addressed PNG may have a full-size WebP/AVIF derivative
+        vary.append("Accept")
+        accept = request.headers.get("accept", "")
+        for alt_type, extension in NEGOTIABLE_FORMATS:
+            alt_path = image_service.get_image_path(f"{key}_1024.{extension}")
+            if accepts(accept, alt_type) and os.path.exists(alt_path):
+                candidates.append((alt_path, alt_type, None))
+    elif not media_type.startswith("image/") or media_type == "image/svg+xml":
+        vary.append("Accept-Encoding")
+        accept_encoding = request.headers.get("accept-encoding", "")
+        for encoding, suffix in PRECOMPRESSED_ENCODINGS:
+            if accepts(accept_encoding, encoding) and os.path.exists(path + suffix):
+                candidates.append((path + suffix, media_type, encoding))
+
+    existing = [candidate for candidate in candidates if os.path.exists(candidate[0])]
+    if not existing:
+        raise HTTPException(status_code=404, detail="Image not found")
+    chosen = min(existing, key=lambda candidate: os.path.getsize(candidate[0]))
+    return chosen[0], chosen[1], chosen[2], vary
+
+def strong_etag(filename: str, path: str, stat_result: os.stat_result) -> str:
+    """Hashed files are identified by name; anything else by mtime and size"""
+    variant = os.path.basename(path)
+    if is_content_hashed(filename):
+        return f'"{variant}"'
+    return f'"{variant}-{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in candidates
+
+@router.api_route("/static/images/{filename}", methods=["GET", "HEAD"])
+async def serve_image(filename: str, request: Request):
+    """Serve images with long-lived caching, ETags, Range support and format negotiation"""
+    if os.path.basename(filename) != filename or filename.startswith("."):
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    path, media_type, encoding, vary = select_representation(filename, request)
+    stat_result = os.stat(path)
+    etag = strong_etag(filename, path, stat_result)
+
+    headers = {
+        "etag": etag,
+        "cache-control": IMMUTABLE_CACHE_CONTROL if is_content_hashed(filename) else REVALIDATE_CACHE_CONTROL,
+    }
+    if vary:
+        headers["vary"] = ", ".join(vary)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    if encoding:
+        headers["content-encoding"] = encoding
+
+    # FileResponse handles Range/If-Range (using our ETag) and uses zero-copy
+    # pathsend when the ASGI server supports it
+    return FileResponse(path, media_type=media_type, headers=headers, stat_result=stat_result)
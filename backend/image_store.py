@@ -0,0 +1,92 @@
+import os
+import time
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from collections import Counter
+from typing import Optional
+from sqlalchemy import bindparam, delete, update
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from models import ImageAsset
+from image_service import image_service
+from coordination import coordinator
+
+logger = logging.getLogger(__name__)
+
+# Files younger than this may belong to a generation that hasn't been saved yet
+ORPHAN_GRACE_SECONDS = 600
+
+# Keys per IN (...) list, well under SQLite's bound-parameter limit
+KEY_CHUNK_SIZE = 500
+
+async def add_image_reference(session: AsyncSession, key: str, filename: str):
+    """Record one more episode pointing at a stored image (caller commits)"""
+    asset = await session.get(ImageAsset, key)
+    if asset is None:
+        asset = ImageAsset(key=key, filename=filename, ref_count=0)
+    asset.ref_count += 1
+    session.add(asset)
+
+async def release_image_references(session: AsyncSession, key_counts: Counter) -> list[str]:
+    """Drop `count` references from each image key in a few set-based statements (caller commits).
+
+    Returns the filenames that no episode points at any more, to be removed
+    from disk once the transaction has committed.
+    """
+    if not key_counts:
+        return []
+    assets = ImageAsset.__table__
+    await session.exec(
+        update(assets).where(assets.c.key == bindparam("k")).values(ref_count=assets.c.ref_count - bindparam("n")),
+        params=[{"k": key, "n": count} for key, count in key_counts.items()],
+    )
+
+    orphaned = []
+    keys = list(key_counts)
+    # Being generated by another worker process, which will reference it again
+    busy = await coordinator.leased_keys("image:")
+    for start in range(0, len(keys), KEY_CHUNK_SIZE):
+        rows = (await session.exec(
+            delete(assets)
+            .where(assets.c.key.in_(keys[start:start + KEY_CHUNK_SIZE]), assets.c.ref_count <= 0)
+            .returning(assets.c.key, assets.c.filename)
+        )).all()
+        orphaned.extend(filename for key, filename in rows if not image_service.is_in_flight(key) and key not in busy)
+    return orphaned
+
+async def delete_image_files(filenames: list[str]) -> int:
+    """Remove image files off the event loop"""
+    if not filenames:
+        return 0
+    deleted = await asyncio.to_thread(image_service.delete_images, filenames)
+    logger.info("🧹 Removed %d orphaned image file(s)", deleted)
+    return deleted
+
+async def find_orphaned_files(session: AsyncSession, now: Optional[float] = None) -> list[str]:
+    """Content-addressed files that no episode points at (caller commits).
+
+    Covers files with no ImageAsset row and unreferenced rows left by
+    generations whose episode was deleted before the image was saved.
+    """
+    now = now or time.time()
+    orphaned = []
+    busy = await coordinator.leased_keys("image:")
+    cutoff = datetime.utcnow() - timedelta(seconds=ORPHAN_GRACE_SECONDS)
+    unreferenced = (await session.exec(
+        select(ImageAsset).where(ImageAsset.ref_count <= 0, ImageAsset.created_at < cutoff)
+    )).all()
+    for asset in unreferenced:
+        if not image_service.is_in_flight(asset.key) and asset.key not in busy:
+            await session.delete(asset)
+            orphaned.append(asset.filename)
+
+    known = set((await session.exec(select(ImageAsset.filename))).all()) - set(orphaned)
+    for filename in os.listdir(image_service.storage_dir):
+        key = image_service.key_for_filename(filename)
+        if key is None or filename in known or filename in orphaned or image_service.is_in_flight(key) or key in busy:
+            continue
+        if now - os.path.getmtime(image_service.get_image_path(filename)) < ORPHAN_GRACE_SECONDS:
+            continue
+        orphaned.append(filename)
+    return orphaned
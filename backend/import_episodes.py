@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Import a batch of episodes from a JSON array or NDJSON file and follow their generation
+
+Usage: python import_episodes.py issues.ndjson [--url http://localhost:8000]
+       cat issues.json | python import_episodes.py -
+"""
+import sys
+import json
+import argparse
+import httpx
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Bulk-import episodes into Netflux")
+    parser.add_argument("path", help="JSON array or NDJSON file of {description, submitted_by} records, or - for stdin")
+    parser.add_argument("--url", default="http://localhost:8000", help="Backend base URL")
+    args = parser.parse_args()
+
+    if args.path == "-":
+        body = sys.stdin.buffer.read()
+    else:
+        with open(args.path, "rb") as f:
+            body = f.read()
+    content_type = "application/json" if body.lstrip().startswith(b"[") else "application/x-ndjson"
+
+    failed = 0
+    with httpx.stream("POST", f"{args.url.rstrip('/')}/api/episodes/batch", content=body,
+                      headers={"content-type": content_type}, timeout=None) as response:
+        if response.status_code != 202:
+            response.read()
+            print(f"❌ Import failed ({response.status_code}): {response.text}")
+            return 1
+        for line in response.iter_lines():
+            if not line:
+                continue
+            result = json.loads(line)
+            if result.get("done"):
+                print(f"📥 Done: {result['accepted']} accepted, {result['rejected']} rejected")
+            elif "error" in result:
+                failed += 1
+                print(f"❌ #{result['index']}: {result['error']}")
+            elif result.get("status") == "queued":
+                print(f"⏳ #{result['index']} queued as episode {result['id']}")
+            else:
+                print(f"✅ #{result['index']} episode {result['id']} ({result['generation_status']}): {result['title']}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,249 @@
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import hashlib
+import logging
+import threading
+from contextlib import aclosing
+from typing import AsyncIterator, Callable, Optional
+from openai_client import openai_pool
+from metrics import CACHE_REQUESTS, HEDGED_REQUESTS
+from tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+def default_cache_path() -> str:
+    """Keep the cache database next to netflux.db"""
+    database_url = os.getenv("DATABASE_URL", "sqlite:///./netflux.db")
+    if database_url.startswith("sqlite"):
+        db_path = database_url.replace("sqlite:///", "").replace("sqlite://", "")
+        if db_path and db_path != ":memory:":
+            return os.path.join(os.path.dirname(db_path) or ".", "llm_cache.db")
+    return "llm_cache.db"
+
+class LLMResponseCache:
+    """Persistent, content-addressed cache of chat completion text with TTL and LRU eviction"""
+
+    def __init__(self, path: str, ttl_seconds: float = 7 * 24 * 3600, max_entries: int = 5000, enabled: bool = True,
+                 hedge_model: Optional[str] = None, hedge_after: float = 2.0):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.enabled = enabled
+        # Cheaper, faster model asked as well when the requested one hasn't answered within hedge_after seconds
+        self.hedge_model = hedge_model
+        self.hedge_after = hedge_after
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS llm_response (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_accessed REAL NOT NULL
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_response_last_accessed ON llm_response (last_accessed)")
+            self._conn.commit()
+        return self._conn
+
+    @staticmethod
+    def make_key(model: str, system_prompt: str, user_prompt: str, temperature: float, max_tokens: int) -> str:
+        """Hash every input that affects the completion"""
+        payload = json.dumps([model, system_prompt, user_prompt, temperature, max_tokens], ensure_ascii=False)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT response, created_at FROM llm_response WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            response, created_at = row
+            if now - created_at > self.ttl_seconds:
+                conn.execute("DELETE FROM llm_response WHERE key = ?", (key,))
+                conn.commit()
+                return None
+            conn.execute("UPDATE llm_response SET last_accessed = ? WHERE key = ?", (now, key))
+            conn.commit()
+            return response
+
+    def _set(self, key: str, response: str):
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_response (key, response, created_at, last_accessed) VALUES (?, ?, ?, ?)",
+                (key, response, now, now),
+            )
+            # Drop expired rows, then the least recently used ones beyond the size limit
+            conn.execute("DELETE FROM llm_response WHERE created_at < ?", (now - self.ttl_seconds,))
+            conn.execute(
+                """DELETE FROM llm_response WHERE key IN (
+                    SELECT key FROM llm_response ORDER BY last_accessed DESC LIMIT -1 OFFSET ?
+                )""",
+                (self.max_entries,),
+            )
+            conn.commit()
+
+    async def get(self, key: str) -> Optional[str]:
+        response = await asyncio.to_thread(self._get, key)
+        if response is None:
+            self.misses += 1
+            CACHE_REQUESTS.inc(cache="llm", result="miss")
+        else:
+            self.hits += 1
+            CACHE_REQUESTS.inc(cache="llm", result="hit")
+        return response
+
+    async def set(self, key: str, response: str):
+        await asyncio.to_thread(self._set, key, response)
+
+    def clear(self) -> int:
+        """Remove every cached response"""
+        with self._lock:
+            conn = self._connection()
+            deleted = conn.execute("DELETE FROM llm_response").rowcount
+            conn.commit()
+            return deleted
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._connection().execute("SELECT COUNT(*) FROM llm_response").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    async def cached_chat_completion(self, system_prompt: str, user_prompt: str, model: str,
+                                      temperature: float, max_tokens: int, use_cache: bool = True) -> str:
+        """Return the completion text, serving repeats from the cache"""
+        key = self.make_key(model, system_prompt, user_prompt, temperature, max_tokens)
+        use_cache = use_cache and self.enabled
+
+        if use_cache:
+            with tracer.span("llm_cache.lookup", model=model) as span:
+                cached = await self.get(key)
+                span.set(hit=cached is not None)
+            if cached is not None:
+                logger.debug("♻️  LLM cache hit (%s)", model)
+                return cached
+
+        content, answered_by = await self.hedged_completion(system_prompt, user_prompt, model, temperature, max_tokens)
+
+        # Bypassed requests still refresh the cache so the next repeat is served from it.
+        # A hedge model's reply is kept under its own key, never passed off as the requested model's.
+        if self.enabled:
+            if answered_by != model:
+                key = self.make_key(answered_by, system_prompt, user_prompt, temperature, max_tokens)
+            await self.set(key, content)
+        return content
+
+    async def cached_chat_stream(self, system_prompt: str, user_prompt: str, model: str, temperature: float, max_tokens: int,
+                                 use_cache: bool = True, response_format: Optional[dict] = None,
+                                 validate: Optional[Callable[[str], bool]] = None) -> AsyncIterator[str]:
+        """Yield the completion text as it streams in; a cache hit arrives as a single chunk.
+
+        The full text is cached when the stream ends, unless `validate` rejects it.
+        """
+        key = self.make_key(model, system_prompt, user_prompt, temperature, max_tokens)
+        use_cache = use_cache and self.enabled
+
+        if use_cache:
+            with tracer.span("llm_cache.lookup", model=model) as span:
+                cached = await self.get(key)
+                span.set(hit=cached is not None)
+            if cached is not None:
+                logger.debug("♻️  LLM cache hit (%s)", model)
+                yield cached
+                return
+
+        extra = {"response_format": response_format} if response_format else {}
+        chunks = []
+        stream = openai_pool.chat_completion_stream(
+            model=model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            max_tokens=max_tokens,
+            temperature=temperature,
+            **extra,
+        )
+        # Closed promptly if the reader stops early, so the pool's concurrency slot is released
+        async with aclosing(stream):
+            async for chunk in stream:
+                chunks.append(chunk)
+                yield chunk
+
+        content = "".join(chunks).strip()
+        if self.enabled and (validate is None or validate(content)):
+            await self.set(key, content)
+
+    async def completion(self, system_prompt: str, user_prompt: str, model: str, temperature: float, max_tokens: int) -> str:
+        response = await openai_pool.chat_completion(
+            model=model,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            max_tokens=max_tokens,
+            temperature=temperature,
+        )
+        return response.choices[0].message.content.strip()
+
+    async def hedged_completion(self, system_prompt: str, user_prompt: str, model: str, temperature: float, max_tokens: int) -> tuple[str, str]:
+        """Ask `model`; if it is slow, also ask the hedge model and take whichever answers first.
+
+        Returns the text and the model that produced it.
+        """
+        if not self.hedge_model or self.hedge_model == model:
+            return await self.completion(system_prompt, user_prompt, model, temperature, max_tokens), model
+
+        primary = asyncio.create_task(self.completion(system_prompt, user_prompt, model, temperature, max_tokens))
+        tasks = {primary: model}
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=self.hedge_after)
+            if not done:
+                hedge = asyncio.create_task(self.completion(system_prompt, user_prompt, self.hedge_model, temperature, max_tokens))
+                tasks[hedge] = self.hedge_model
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if len(tasks) > 1:
+                            HEDGED_REQUESTS.inc(winner="hedge" if task is not primary else "primary")
+                            logger.debug("🏁 %s answered first (hedged %s)", tasks[task], model)
+                        return task.result(), tasks[task]
+                    error = task.exception()
+            raise error
+        finally:
+            # The loser is cancelled to free its concurrency slot
+            for task in tasks:
+                task.cancel()
+
+# Global instance
+llm_cache = LLMResponseCache(
+    path=os.getenv("LLM_CACHE_PATH", default_cache_path()),
+    ttl_seconds=float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+    max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000")),
+    enabled=os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true",
+    hedge_model=os.getenv("LLM_HEDGE_MODEL") or None,
+    hedge_after=float(os.getenv("LLM_HEDGE_AFTER_SECONDS", "2.0")),
+)
@@ -0,0 +1,176 @@
+import re
+import hashlib
+from collections import Counter
+from dataclasses import dataclass
+
+@dataclass
+class Theme:
+    keywords: tuple[str, ...]
+    titles: tuple[str, ...]
+    adjectives: tuple[str, ...]
+    quests: tuple[str, ...]
+    guests: tuple[str, ...]
+    dooms: tuple[str, ...]
+
+THEMES = {
+    "deploy": Theme(
+        keywords=("deploy", "release", "rollout", "rollback", "ship", "launch", "hotfix", "merge", "revert"),
+        titles=("The Deploy That Went Wrong", "Code Red: The Friday Deploy", "The Merge That Broke Everything",
+                "Rollback at Midnight", "Ship It and Pray", "The Hotfix That Needed a Hotfix"),
+        adjectives=("catastrophic", "ill-timed", "Friday-afternoon"),
+        quests=("shepherd a doomed release through the gates of production", "find the one commit that doomed them all"),
+        guests=("the Rollback Button", "Change Freeze", "the Release Checklist Nobody Read"),
+        dooms=("the deploy pipeline claim yet another weekend", "the release notes become their epitaph"),
+    ),
+    "bug": Theme(
+        keywords=("bug", "error", "exception", "regression", "broken", "glitch", "typo", "null", "undefined", "off-by-one"),
+        titles=("The Bug That Wouldn't Die", "Crisis in the Code", "The Exception Nobody Caught",
+                "Null and Void", "The Regression Strikes Back", "Off By One"),
+        adjectives=("bewildering", "maddening", "unreproducible"),
+        quests=("hunt a bug that only appears when nobody is watching", "decipher a stack trace longer than the codebase"),
+        guests=("Works On My Machine", "the Rubber Duck", "a Suspiciously Quiet Unit Test"),
+        dooms=("the bug be closed as 'cannot reproduce' once again", "the exception outlive them all"),
+    ),
+    "outage": Theme(
+        keywords=("crash", "down", "outage", "meltdown", "timeout", "unavailable", "incident", "pager", "oncall", "on-call", "500"),
+        titles=("The System Meltdown", "Midnight Emergency", "Code Red Situation", "Production Nightmare",
+                "The Night the Servers Went Dark", "Pager at 3 AM"),
+        adjectives=("catastrophic", "sleep-deprived", "apocalyptic"),
+        quests=("restore order before the status page turns fully red", "wake the servers from their eternal slumber"),
+        guests=("the 3 AM Pager", "the Status Page", "an Incident Channel With 400 Lurkers"),
+        dooms=("the outage become a company-wide postmortem", "the pager never stop ringing"),
+    ),
+    "database": Theme(
+        keywords=("database", "db", "sql", "query", "queries", "migration", "index", "postgres", "mysql", "sqlite", "table", "deadlock", "schema"),
+        titles=("Database Disaster", "The Migration of No Return", "Deadlock at Dawn",
+                "The Query That Ate Production", "Drop Table Tuesday"),
+        adjectives=("harrowing", "transactional", "irreversible"),
+        quests=("coax a runaway query back into its index", "migrate a schema older than the company itself"),
+        guests=("the Missing Index", "a Deadlock Named Gary", "the Backup Nobody Tested"),
+        dooms=("the migration roll forward into oblivion", "the query planner have the last laugh"),
+    ),
+    "security": Theme(
+        keywords=("security", "hack", "breach", "vulnerability", "exploit", "password", "token", "credential", "phishing", "cve", "secret"),
+        titles=("Security Breach", "The Leaked Key", "Enemy Inside the Firewall",
+                "The Password Was Password", "Zero Day Zero Chill"),
+        adjectives=("paranoid", "high-stakes", "classified"),
+        quests=("rotate every secret before the intruder notices", "trace a breach through a maze of access logs"),
+        guests=("the Intern With Admin Rights", "a Very Convincing Phishing Email", "the Compliance Auditor"),
+        dooms=("the credentials end up on a public paste site", "the auditors arrive first"),
+    ),
+    "performance": Theme(
+        keywords=("slow", "latency", "performance", "memory", "cpu", "lag", "bottleneck", "throughput", "oom", "leak", "spike"),
+        titles=("The Need for Speed", "Death by a Thousand Milliseconds", "The Memory That Never Let Go",
+                "The Spike Nobody Saw Coming", "Out of Memory, Out of Time"),
+        adjectives=("agonisingly slow", "resource-starved", "high-latency"),
+        quests=("shave milliseconds off a request that takes minutes", "chase a memory leak across a dozen heap dumps"),
+        guests=("the Flame Graph", "the Garbage Collector", "a p99 Latency Chart Shaped Like a Mountain"),
+        dooms=("the servers melt under their own weight", "the spinner keep spinning forever"),
+    ),
+    "network": Theme(
+        keywords=("network", "dns", "ssl", "tls", "certificate", "cdn", "firewall", "proxy", "balancer", "packet", "http"),
+        titles=("It Was DNS All Along", "The Certificate That Expired", "Lost in the Network",
+                "The Packet That Never Arrived"),
+        adjectives=("labyrinthine", "packet-dropping", "mysteriously disconnected"),
+        quests=("follow a packet across three continents and a load balancer", "renew a certificate nobody knew existed"),
+        guests=("the TTL That Would Not Expire", "an Overzealous Firewall Rule", "the Load Balancer"),
+        dooms=("it turn out to be DNS, as it always is", "the handshake never complete"),
+    ),
+    "infrastructure": Theme(
+        keywords=("config", "configuration", "kubernetes", "k8s", "docker", "container", "cluster", "terraform", "yaml", "env", "server", "cloud", "aws"),
+        titles=("The YAML Incident", "The Cluster That Fell Apart", "One Misplaced Indent",
+                "Infrastructure of Doom", "The Pod That Kept Restarting"),
+        adjectives=("infrastructure-shattering", "cloud-native", "misconfigured"),
+        quests=("find the one indentation error holding the cluster hostage", "tame a fleet of pods stuck in CrashLoopBackOff"),
+        guests=("CrashLoopBackOff", "the Terraform State File", "an Environment Variable From 2019"),
+        dooms=("the cluster scale itself to zero", "the cloud bill arrive before the fix"),
+    ),
+    "testing": Theme(
+        keywords=("test", "tests", "ci", "pipeline", "build", "flaky", "lint", "coverage", "compile"),
+        titles=("The Flaky Test Conspiracy", "The Build That Never Ended", "Red Pipeline Rising",
+                "Green on My Machine"),
+        adjectives=("flaky", "never-ending", "suspiciously green"),
+        quests=("turn a blood-red pipeline green before standup", "catch a flaky test in the act"),
+        guests=("the Retry Button", "a Test That Only Fails on Tuesdays", "the Build Cache"),
+        dooms=("the pipeline stay red until the heat death of the universe", "someone simply skip the test"),
+    ),
+    "data": Theme(
+        keywords=("data", "backup", "restore", "deleted", "delete", "lost", "corrupt", "corrupted", "wiped", "truncate"),
+        titles=("The Day the Data Disappeared", "Backup Not Found", "The Accidental Delete",
+                "Corruption Most Foul"),
+        adjectives=("heart-stopping", "data-devouring", "unrecoverable"),
+        quests=("resurrect a dataset from the ashes of last week's backup", "piece together records scattered across logs"),
+        guests=("the Backup That Was Never Run", "the Undo Button That Doesn't Exist", "an Ominously Empty Table"),
+        dooms=("the data be gone forever", "the restore take longer than the heat death of the sun"),
+    ),
+}
+
+DEFAULT_THEME = Theme(
+    keywords=(),
+    titles=("The Incident That Changed Everything", "Crisis in the Code", "Code Red Situation",
+            "Production Nightmare", "The Ticket Nobody Wanted"),
+    adjectives=("catastrophic", "legendary", "unprecedented"),
+    quests=("battle a problem nobody on the team fully understands", "close the oldest ticket in the backlog"),
+    guests=("Imposter Syndrome", "the Legacy Codebase", "a Jira Ticket With 47 Watchers"),
+    dooms=("they be consumed by the ever-growing pile of error messages", "the ticket be reopened yet again"),
+)
+
+SUPPLIES = (
+    "caffeinated beverages and increasingly desperate Stack Overflow searches",
+    "cold pizza, a whiteboard and a deeply questionable Slack thread",
+    "three monitors, one working hypothesis and zero documentation",
+)
+CLOSING_GUESTS = ("the dreaded Monday Morning Standup", "a Product Manager Asking for an ETA", "the Senior Engineer Who Left in 2017")
+
+# Long issues are cut at a word boundary so the description stays readable
+MAX_ISSUE_CHARS = 160
+
+class LocalGenerator:
+    """Keyword/template engine for instant titles and descriptions when the LLM is slow or unavailable.
+
+    Picks a theme by counting keyword hits with one precompiled regex, then varies the
+    template stably per description so repeats produce the same result.
+    """
+
+    def __init__(self, themes: dict[str, Theme], default: Theme):
+        self.themes = themes
+        self.default = default
+        self.keyword_themes = {keyword: name for name, theme in themes.items() for keyword in theme.keywords}
+        # Longest first so "queries" wins over "query"; the suffixes catch deployed, crashing, deployments, etc.
+        alternation = "|".join(sorted(map(re.escape, self.keyword_themes), key=len, reverse=True))
+        self.keyword_pattern = re.compile(rf"\b({alternation})(?:s|es|ed|d|ing|er|ers|ment|ments)?\b", re.IGNORECASE)
+
+    def theme_for(self, text: str) -> Theme:
+        """The theme with the most keyword hits; ties go to the one mentioned first"""
+        hits = Counter(self.keyword_themes[match.lower()] for match in self.keyword_pattern.findall(text))
+        if not hits:
+            return self.default
+        return self.themes[max(hits, key=hits.__getitem__)]
+
+    @staticmethod
+    def pick(options: tuple[str, ...], text: str, salt: str) -> str:
+        digest = hashlib.sha256(f"{salt}:{text}".encode()).digest()
+        return options[int.from_bytes(digest[:4], "big") % len(options)]
+
+    def title(self, description: str) -> str:
+        return self.pick(self.theme_for(description).titles, description, "title")
+
+    def description(self, title: str, issue: str) -> str:
+        theme = self.theme_for(f"{title} {issue}")
+        issue_text = issue.strip().rstrip(".")
+        if len(issue_text) > MAX_ISSUE_CHARS:
+            issue_text = issue_text[:MAX_ISSUE_CHARS].rsplit(" ", 1)[0] + "..."
+        if issue_text[:2].istitle():
+            # Mid-sentence now ("Our deploy..." -> "our deploy..."), but leave acronyms like AWS alone
+            issue_text = issue_text[0].lower() + issue_text[1:]
+        return (
+            f"In this {self.pick(theme.adjectives, issue, 'adjective')} episode, our heroic CaseMark development team "
+            f"faces the dreaded {title}! Armed with nothing but {self.pick(SUPPLIES, issue, 'supplies')}, they must "
+            f"{self.pick(theme.quests, issue, 'quest')} and battle the mysterious forces of {issue_text}. "
+            f"Will they triumph over this technical nightmare, or will {self.pick(theme.dooms, issue, 'doom')}? "
+            f"Guest appearances by {self.pick(theme.guests, issue, 'guest')} and "
+            f"{self.pick(CLOSING_GUESTS, issue, 'closing')} make this an episode you won't want to miss!"
+        )
+
+# Global instance
+local_generator = LocalGenerator(THEMES, DEFAULT_THEME)
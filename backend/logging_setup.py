@@ -0,0 +1,76 @@
+import os
+import sys
+import json
+import queue
+import atexit
+import logging
+import logging.handlers
+from typing import Optional
+from tracing import RequestIdFilter
+
+# Attributes every LogRecord has; anything else was passed through `extra=` and is logged as a field
+STANDARD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+class KeyValueFormatter(logging.Formatter):
+    """`time level logger message key=value ...` lines for humans"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = {key: value for key, value in vars(record).items() if key not in STANDARD_ATTRIBUTES}
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line for log shippers"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in STANDARD_ATTRIBUTES})
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def configure_logging():
+    """Route all logging through a queue so the event loop never blocks on stdout.
+
+    Level comes from LOG_LEVEL, or DEBUG=true for debug output; LOG_FORMAT=json switches to JSON lines.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    level = os.getenv("LOG_LEVEL") or ("DEBUG" if os.getenv("DEBUG", "false").lower() == "true" else "INFO")
+    output = logging.StreamHandler(sys.stderr)
+    if os.getenv("LOG_FORMAT", "text").lower() == "json":
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(KeyValueFormatter("%(asctime)s %(levelname)-7s %(name)s: %(message)s"))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    # Filters run in the caller before the record is queued, while the request's context is still set
+    queue_handler.addFilter(RequestIdFilter())
+    root.handlers[:] = [queue_handler]
+    root.setLevel(level.upper())
+
+    # httpx logs every OpenAI call at INFO; the metrics already count them
+    if level.upper() != "DEBUG":
+        logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    # Uvicorn's loggers propagate here instead of writing to the console themselves
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        logging.getLogger(name).handlers[:] = []
+        logging.getLogger(name).propagate = True
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
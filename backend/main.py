@@ -1,23 +1,80 @@
+import time
+started_at = time.perf_counter()
+
+# Before anything reads the environment (DATABASE_URL, LOG_LEVEL, ...)
+from dotenv import load_dotenv
+load_dotenv()
+
+from logging_setup import configure_logging
+configure_logging()
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from database import create_db_and_tables, init_admin_settings
+from database import create_db_and_tables, init_admin_settings, engine, IS_SQLITE
+from tracing import tracer, TracingMiddleware
+from profiling import ProfilingMiddleware
+from stage_executor import format_timings
+from services import services
 import os
+import asyncio
+import logging
 from contextlib import asynccontextmanager
 
+logger = logging.getLogger("netflux")
+
+async def start_generation():
+    """Load the generation pipeline and start its workers (also resumes unfinished jobs)"""
+    await services.warm("generation_queue", "batch_importer")
+    await services.get("generation_queue").start()
+    logger.info("🎬 Generation ready (%s)", format_timings(services.load_seconds))
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    create_db_and_tables()
-    init_admin_settings()
+    timings = {"import": time.perf_counter() - started_at}
+    stage_started = time.perf_counter()
+    await create_db_and_tables()
+    await init_admin_settings()
+    timings["database"] = time.perf_counter() - stage_started
+    stage_started = time.perf_counter()
+    await settings_cache.start()
+    await coordinator.start()
+    await event_relay.start()
     
     # Create static images directory if it doesn't exist
     os.makedirs("static/images", exist_ok=True)
+    timings["services"] = time.perf_counter() - stage_started
+    
+    # Reads are served right away; generation comes up in the background, and only with a key
+    generation_startup = None
+    if openai_pool.configured:
+        generation_startup = asyncio.create_task(start_generation())
+    else:
+        logger.warning("⚠️  OPENAI_API_KEY is not set: serving reads only, episode generation is disabled")
+    timings["total"] = time.perf_counter() - started_at
+    logger.info("🚀 Ready in %.2fs (%s)", timings["total"], format_timings(timings))
     
     yield
     
-    # Shutdown (cleanup if needed)
-    pass
+    # Shutdown
+    event_hub.close()
+    if generation_startup is not None:
+        generation_startup.cancel()
+        await asyncio.gather(generation_startup, return_exceptions=True)
+    # Only what was actually loaded needs stopping
+    if services.loaded("batch_importer"):
+        await services.get("batch_importer").stop()
+    if services.loaded("generation_queue"):
+        await services.get("generation_queue").stop()
+    await event_relay.stop()
+    await coordinator.stop()
+    await settings_cache.stop()
+    await openai_pool.aclose()
+    if services.loaded("image_derivatives"):
+        services.get("image_derivatives").shutdown()
+    await engine.dispose()
+    tracer.shutdown()
 
 app = FastAPI(title="Netflux Backend", version="0.1.0", lifespan=lifespan)
 
@@ -27,20 +84,48 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID"],
 )
+# Request ids and (opt-in) tracing wrap everything, including the profiler's capture
+app.add_middleware(ProfilingMiddleware)
+app.add_middleware(TracingMiddleware)
+
+# Images get their own route (long-lived caching, ETags, Range, format negotiation);
+# it must be registered before the catch-all static mount
+from image_serving import router as image_router
+app.include_router(image_router)
+
+# Live feed of episode changes (SSE and WebSocket)
+from event_stream import router as event_router
+app.include_router(event_router)
+
+# Admin-armed request profiler
+from profiling import router as profiler_router
+app.include_router(profiler_router)
 
 # Create static directory first, then mount
 os.makedirs("static", exist_ok=True)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-from fastapi import HTTPException, Depends
-from sqlmodel import Session, select
-from models import Episode, EpisodeCreate, EpisodeRead, AdminSettings, AdminSettingsUpdate, AdminSettingsRead, StatusRead
+from fastapi import BackgroundTasks, HTTPException, Depends, Query, Request, Response
+from sqlmodel.ext.asyncio.session import AsyncSession
+from models import Episode, EpisodeCreate, EpisodeRead, AdminSettingsUpdate, AdminSettingsRead, StatusRead, GenerationStatus, PENDING_TITLE, LLMCacheStats, EpisodePage, EpisodeDetail, EpisodeSearchPage, EpisodeCount
 from database import get_session
-from image_service import image_service
-from title_service import title_service
-from episode_description_service import episode_description_service
-from datetime import datetime
+from openai_client import openai_pool
+from settings_cache import settings_cache
+from coordination import coordinator, workers_configured
+from event_hub import event_hub, encode_json
+from event_relay import event_relay
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from metrics import registry
+import json
+from image_store import delete_image_files, find_orphaned_files
+import hashlib
+from datetime import datetime, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Optional
+from episode_search import search_episodes, rebuild_search_index
+from episode_queries import list_episodes_page, parse_fields, InvalidQuery, episode_neighbours, summarize_episode, episode_filters, delete_episodes, archive_episodes, count_episodes
 
 @app.get("/")
 async def root():
@@ -48,126 +133,254 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
+    # Still a 200 without a key: the app is up and serving reads
+    return {"status": "healthy" if openai_pool.configured else "degraded"}
+
+def require_generation():
+    if not openai_pool.configured:
+        raise HTTPException(status_code=503, detail="Episode generation is unavailable: OPENAI_API_KEY is not configured")
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus scrape endpoint"""
+    return PlainTextResponse(registry.exposition(), media_type="text/plain; version=0.0.4")
 
 # Episode endpoints
-@app.post("/api/episodes", response_model=EpisodeRead)
-async def create_episode(episode: EpisodeCreate, session: Session = Depends(get_session)):
+@app.post("/api/episodes", response_model=EpisodeRead, status_code=202)
+async def create_episode(episode: EpisodeCreate, session: AsyncSession = Depends(get_session)):
+    require_generation()
     # Check if submissions are open
-    settings = session.get(AdminSettings, 1)
-    if not settings or not settings.is_submission_open:
+    if not settings_cache.settings or not settings_cache.is_submission_open:
         raise HTTPException(status_code=403, detail="Submissions are closed")
     
-    # Generate title using ChatGPT
-    print(f"🎬 Generating title for episode by {episode.submitted_by}")
-    generated_title = await title_service.generate_episode_title(episode.description)
-    
-    # Generate comedy description using ChatGPT
-    print(f"🎭 Generating comedy description for episode by {episode.submitted_by}")
-    comedy_description = await episode_description_service.generate_episode_description(generated_title, episode.description)
-    
-    # Create episode in database with generated title and comedy description
+    # Persist right away; title, comedy description and image are generated in the background
     db_episode = Episode(
-        title=generated_title,
+        title=PENDING_TITLE,
         description=episode.description,
-        comedy_description=comedy_description,
-        submitted_by=episode.submitted_by
+        submitted_by=episode.submitted_by,
+        generation_status=GenerationStatus.PENDING.value
     )
     session.add(db_episode)
-    session.commit()
-    session.refresh(db_episode)
+    await session.commit()
+    await session.refresh(db_episode)
+    
+    event_hub.publish("episode_created", summarize_episode(db_episode))
+    services.get("generation_queue").enqueue(db_episode.id, bypass_cache=episode.bypass_cache)
+    logger.info("📝 Episode %s queued for generation", db_episode.id)
     
-    # Generate AI image asynchronously
-    print(f"🎨 Attempting to generate image for episode {db_episode.id}: '{db_episode.title}'")
+    return db_episode
+
+@app.post("/api/episodes/batch", status_code=202)
+async def import_episodes(request: Request, session: AsyncSession = Depends(get_session)):
+    """Create many episodes from a JSON array or NDJSON body; streams one NDJSON result line per item"""
+    require_generation()
+    if not settings_cache.settings or not settings_cache.is_submission_open:
+        raise HTTPException(status_code=403, detail="Submissions are closed")
     
+    batch_importer = services.get("batch_importer")
+    from batch_import import BatchTooLarge
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > batch_importer.max_body_bytes:
+        raise HTTPException(status_code=413, detail=f"Imports are limited to {batch_importer.max_body_bytes} bytes")
     try:
-        image_filename = await image_service.generate_episode_image(
-            title=db_episode.title,
-            description=db_episode.description,
-            episode_id=db_episode.id
-        )
-        
-        if image_filename:
-            # Update episode with image URL
-            db_episode.image_url = image_service.get_image_url(image_filename)
-            session.add(db_episode)
-            session.commit()
-            session.refresh(db_episode)
-            print(f"✅ Image generated successfully: {image_filename}")
-        else:
-            print("⚠️  Image generation returned None")
-            
-    except Exception as e:
-        print(f"❌ Failed to generate image for episode {db_episode.id}: {str(e)}")
-        
-        # Check for specific error types
-        if "billing_hard_limit_reached" in str(e):
-            print("💰 OpenAI billing limit reached. Add credits to your account.")
-        elif "invalid_api_key" in str(e):
-            print("🔑 Invalid OpenAI API key. Check your .env file.")
-        elif "rate_limit_exceeded" in str(e):
-            print("⏰ OpenAI rate limit exceeded. Try again later.")
-        else:
-            print(f"🔍 Error details: {type(e).__name__}: {e}")
-        
-        # Continue without image - not critical for episode creation
-    
-    print(f"📝 Episode {db_episode.id} created successfully")
+        records = await batch_importer.read_records(request.stream(), request.headers.get("content-type", ""))
+    except BatchTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    results = await batch_importer.import_records(session, records)
     
-    return db_episode
+    async def lines():
+        async for result in results:
+            yield json.dumps(result, default=encode_json) + "\n"
+    
+    return StreamingResponse(lines(), status_code=202, media_type="application/x-ndjson")
+
+@app.get("/api/episodes", response_model=EpisodePage, response_model_exclude_unset=True)
+async def get_episodes(
+    limit: int = Query(default=50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(default=None, description="Comma-separated columns, or 'summary' / 'full'"),
+    session: AsyncSession = Depends(get_session),
+):
+    try:
+        items, next_cursor = await list_episodes_page(session, limit, cursor, parse_fields(fields))
+    except InvalidQuery as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return EpisodePage(items=items, next_cursor=next_cursor)
+
+# Declared before /api/episodes/{episode_id}, which would otherwise match "search"
+@app.get("/api/episodes/search", response_model=EpisodeSearchPage)
+async def get_search_results(
+    q: str = Query(min_length=1, max_length=200, description="Words to find; the last one also matches as a prefix"),
+    limit: int = Query(default=20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    session: AsyncSession = Depends(get_session),
+):
+    """Ranked full-text search over titles, descriptions and submitters"""
+    try:
+        items, next_cursor = await search_episodes(session, q, limit, cursor)
+    except InvalidQuery as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return EpisodeSearchPage(items=items, next_cursor=next_cursor)
 
-@app.get("/api/episodes", response_model=list[EpisodeRead])
-async def get_episodes(session: Session = Depends(get_session)):
-    episodes = session.exec(select(Episode).order_by(Episode.timestamp.desc())).all()
-    return episodes
+@app.get("/api/episodes/{episode_id}", response_model=EpisodeDetail)
+async def get_episode(episode_id: int, request: Request, response: Response, session: AsyncSession = Depends(get_session)):
+    episode = await session.get(Episode, episode_id)
+    if not episode or episode.archived_at:
+        raise HTTPException(status_code=404, detail="Episode not found")
+    
+    prev_id, next_id = await episode_neighbours(session, episode)
+    
+    # The body only changes when the episode or its neighbours change
+    etag = '"' + hashlib.sha256(f"{episode.id}|{episode.updated_at.isoformat()}|{prev_id}|{next_id}".encode()).hexdigest()[:32] + '"'
+    last_modified = formatdate(episode.updated_at.replace(tzinfo=timezone.utc).timestamp(), usegmt=True)
+    headers = {"ETag": etag, "Last-Modified": last_modified, "Cache-Control": "no-cache"}
+    
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+            return Response(status_code=304, headers=headers)
+    elif request.headers.get("if-modified-since"):
+        try:
+            since = parsedate_to_datetime(request.headers["if-modified-since"])
+            if episode.updated_at.replace(tzinfo=timezone.utc, microsecond=0) <= since:
+                return Response(status_code=304, headers=headers)
+        except (TypeError, ValueError):
+            pass
+    
+    response.headers.update(headers)
+    return EpisodeDetail.model_validate(episode, update={"prev_id": prev_id, "next_id": next_id})
 
 @app.delete("/api/episodes/{episode_id}")
-async def delete_episode(episode_id: int, session: Session = Depends(get_session)):
-    episode = session.get(Episode, episode_id)
-    if not episode:
+async def delete_episode(
+    episode_id: int,
+    background_tasks: BackgroundTasks,
+    archive: bool = Query(default=False, description="Hide the episode instead of deleting it"),
+    session: AsyncSession = Depends(get_session),
+):
+    conditions = [Episode.id == episode_id]
+    if archive:
+        affected = await archive_episodes(session, conditions)
+    else:
+        affected, orphaned = await delete_episodes(session, conditions)
+    if not affected:
         raise HTTPException(status_code=404, detail="Episode not found")
+    await session.commit()
     
-    session.delete(episode)
-    session.commit()
-    return {"message": "Episode deleted"}
+    event_hub.publish("episode_deleted", {"ids": [episode_id]})
+    if not archive:
+        # Files go after the response is sent
+        background_tasks.add_task(delete_image_files, orphaned)
+    return {"message": "Episode archived" if archive else "Episode deleted"}
 
 # Admin endpoints
 @app.get("/api/admin/settings", response_model=AdminSettingsRead)
-async def get_admin_settings(session: Session = Depends(get_session)):
-    settings = session.get(AdminSettings, 1)
-    if not settings:
+async def get_admin_settings():
+    if not settings_cache.settings:
         raise HTTPException(status_code=404, detail="Admin settings not found")
-    return settings
+    return settings_cache.settings
 
 @app.put("/api/admin/settings", response_model=AdminSettingsRead)
-async def update_admin_settings(settings_update: AdminSettingsUpdate, session: Session = Depends(get_session)):
-    settings = session.get(AdminSettings, 1)
+async def update_admin_settings(settings_update: AdminSettingsUpdate):
+    settings = await settings_cache.update(settings_update.is_submission_open)
     if not settings:
         raise HTTPException(status_code=404, detail="Admin settings not found")
-    
-    settings.is_submission_open = settings_update.is_submission_open
-    settings.updated_at = datetime.utcnow()
-    session.add(settings)
-    session.commit()
-    session.refresh(settings)
     return settings
 
+@app.get("/api/admin/episodes/count", response_model=EpisodeCount)
+async def get_episode_count(session: AsyncSession = Depends(get_session)):
+    """Episodes on the board (archived ones excluded)"""
+    return EpisodeCount(count=await count_episodes(session))
+
 @app.delete("/api/admin/episodes")
-async def clear_all_episodes(session: Session = Depends(get_session)):
-    episodes = session.exec(select(Episode)).all()
-    for episode in episodes:
-        session.delete(episode)
-    session.commit()
-    return {"message": f"Deleted {len(episodes)} episodes"}
+async def clear_episodes(
+    background_tasks: BackgroundTasks,
+    since: Optional[datetime] = Query(default=None, description="Only episodes submitted at or after this time"),
+    until: Optional[datetime] = Query(default=None, description="Only episodes submitted before this time"),
+    submitted_by: Optional[str] = None,
+    archive: bool = Query(default=False, description="Hide the episodes instead of deleting them"),
+    session: AsyncSession = Depends(get_session),
+):
+    """Delete (or archive) every episode matching the filters; no filters clears the board"""
+    conditions = episode_filters(since, until, submitted_by)
+    # Viewers get the filter rather than every id and refetch what they show
+    cleared = {"since": since, "until": until, "submitted_by": submitted_by, "archived": archive}
+    if archive:
+        affected = await archive_episodes(session, conditions)
+        await session.commit()
+        event_hub.publish("episodes_cleared", {**cleared, "count": affected})
+        return {"message": f"Archived {affected} episodes", "count": affected}
+    
+    affected, orphaned = await delete_episodes(session, conditions)
+    if not conditions:
+        # Also sweep files left behind by generations whose episode was deleted mid-flight
+        orphaned += await find_orphaned_files(session)
+    await session.commit()
+    event_hub.publish("episodes_cleared", {**cleared, "count": affected})
+    background_tasks.add_task(delete_image_files, orphaned)
+    return {"message": f"Deleted {affected} episodes", "count": affected}
+
+@app.get("/api/admin/llm-cache", response_model=LLMCacheStats)
+async def get_llm_cache_stats():
+    # Loading the cache and its sqlite3 queries both block, so they run off the event loop
+    return await asyncio.to_thread(lambda: services.get("llm_cache").stats())
+
+@app.delete("/api/admin/llm-cache")
+async def clear_llm_cache():
+    deleted = await asyncio.to_thread(lambda: services.get("llm_cache").clear())
+    return {"message": f"Deleted {deleted} cached responses"}
 
 # Status endpoint
 @app.get("/api/status", response_model=StatusRead)
-async def get_status(session: Session = Depends(get_session)):
-    settings = session.get(AdminSettings, 1)
-    if not settings:
-        return StatusRead(is_submission_open=True)
-    return StatusRead(is_submission_open=settings.is_submission_open)
+async def get_status():
+    # Served from memory; the frontend calls this on every page view
+    return StatusRead(is_submission_open=settings_cache.is_submission_open and openai_pool.configured)
 
-if __name__ == "__main__":
+async def prepare_database():
+    """Migrate and seed once in the parent, so worker processes don't race on it at startup"""
+    await create_db_and_tables()
+    await init_admin_settings()
+    await engine.dispose()
+
+async def rebuild_search():
+    await create_db_and_tables()
+    if IS_SQLITE:
+        async with engine.begin() as connection:
+            count = await connection.run_sync(rebuild_search_index)
+        logger.info("🔎 Search index rebuilt: %d episodes", count)
+    else:
+        logger.info("🔎 Search runs without an index on this database; nothing to rebuild")
+    await engine.dispose()
+
+def serve(argv: Optional[list[str]] = None):
+    import argparse
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    parser = argparse.ArgumentParser(description="Run the Netflux backend")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=workers_configured(),
+                        help="Worker processes; more than one coordinates generation through the database (default: $WEB_CONCURRENCY or 1)")
+    parser.add_argument("--rebuild-search", action="store_true",
+                        help="Backfill or repair the episode search index and its triggers, then exit")
+    args = parser.parse_args(argv)
+
+    if args.rebuild_search:
+        asyncio.run(rebuild_search())
+        return
+
+    # Open event streams never finish on their own, so don't wait on them forever at shutdown
+    if args.workers <= 1:
+        uvicorn.run(app, host=args.host, port=args.port, timeout_graceful_shutdown=5)
+        return
+    asyncio.run(prepare_database())
+    # Inherited by the workers, which turns on coordination there
+    os.environ["WEB_CONCURRENCY"] = str(args.workers)
+    logger.info("🚀 Starting %d workers", args.workers)
+    uvicorn.run(
+        "main:app", host=args.host, port=args.port, workers=args.workers,
+        app_dir=os.path.dirname(os.path.abspath(__file__)), timeout_graceful_shutdown=5,
+    )
+
+if __name__ == "__main__":
+    serve()
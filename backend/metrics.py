@@ -0,0 +1,125 @@
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+
+# Stage latencies run from a few ms (cache hits, commits) to a minute (DALL-E)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 60.0)
+
+def format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def collect(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{format_labels(self.labelnames, key)} {format_value(value)}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [bucket counts..., +Inf count], sum
+        self.values: dict[tuple[str, ...], tuple[list[int], float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self.values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[index] += 1
+            self.values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe how long the with-block takes"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def collect(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total) in sorted(self.values.items()):
+                cumulative = 0
+                for bound, count in zip((*self.buckets, float("inf")), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else format_value(bound)
+                    labels = format_labels(self.labelnames, key, 'le="' + le + '"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                lines.append(f"{self.name}_sum{format_labels(self.labelnames, key)} {format_value(total)}")
+                lines.append(f"{self.name}_count{format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self.metrics: list = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def exposition(self) -> str:
+        """Prometheus text format (version 0.0.4)"""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+# Global instance
+registry = Registry()
+
+STAGE_SECONDS = registry.register(Histogram(
+    "netflux_stage_duration_seconds",
+    "Time spent in each generation step (title, description, image, image_call, image_download, db_commit)",
+    ("stage",),
+))
+FALLBACKS = registry.register(Counter(
+    "netflux_fallbacks_total", "Generation stages that gave up and used canned output", ("stage",)
+))
+RETRIES = registry.register(Counter(
+    "netflux_retries_total", "Retried attempts, by where the retry happened", ("source",)
+))
+CACHE_REQUESTS = registry.register(Counter(
+    "netflux_cache_requests_total", "LLM response and image store lookups", ("cache", "result")
+))
+OPENAI_REQUESTS = registry.register(Counter(
+    "netflux_openai_requests_total", "OpenAI API calls by endpoint and outcome", ("endpoint", "outcome")
+))
+HEDGED_REQUESTS = registry.register(Counter(
+    "netflux_hedged_requests_total", "Completions that also asked the hedge model, by which one answered first", ("winner",)
+))
+LATE_RESULTS = registry.register(Counter(
+    "netflux_late_results_total", "LLM results that replaced a local result after the stage budget ran out", ("stage",)
+))
+OPENAI_TOKENS = registry.register(Counter(
+    "netflux_openai_tokens_total", "Token usage reported by OpenAI responses", ("model", "kind")
+))
@@ -0,0 +1,56 @@
+import asyncio
+from logging.config import fileConfig
+from alembic import context
+from sqlmodel import SQLModel
+import models  # noqa: F401 - registers the tables on SQLModel.metadata
+from database import engine
+
+config = context.config
+
+if config.config_file_name is not None and config.attributes.get("connection") is None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = SQLModel.metadata
+
+def include_object(object, name, type_, reflected, compare_to):
+    # The FTS5 search index and its shadow tables are managed by hand (episode_search.py)
+    return not (type_ == "table" and name.startswith("episode_search"))
+
+def run_migrations_offline():
+    context.configure(
+        url=config.get_main_option("sqlalchemy.url"),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=True,
+        include_object=include_object,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online():
+    # The app passes its own connection in; the alembic CLI falls back to the app engine
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        do_run_migrations(connection)
+        return
+    asyncio.run(run_async_migrations())
+
+async def run_async_migrations():
+    async with engine.begin() as connection:
+        await connection.run_sync(do_run_migrations)
+    await engine.dispose()
+
+def do_run_migrations(connection):
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        render_as_batch=connection.dialect.name == "sqlite",
+        include_object=include_object,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,50 @@
+"""Baseline schema: episode and adminsettings as created before Alembic
+
+Databases created by the old create_all + ALTER TABLE startup code are
+adopted in place: tables and columns that already exist are left alone.
+
+Revision ID: 0001
+Revises:
+Create Date: 2025-07-20
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = inspector.get_table_names()
+
+    if "episode" not in tables:
+        op.create_table(
+            "episode",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("title", sa.String(length=200), nullable=False),
+            sa.Column("description", sa.String(), nullable=False),
+            sa.Column("comedy_description", sa.String(), nullable=True),
+            sa.Column("submitted_by", sa.String(length=100), nullable=False),
+            sa.Column("timestamp", sa.DateTime(), nullable=False),
+            sa.Column("image_url", sa.String(), nullable=True),
+        )
+    else:
+        columns = {column["name"] for column in inspector.get_columns("episode")}
+        if "image_url" not in columns:
+            op.add_column("episode", sa.Column("image_url", sa.String(), nullable=True))
+        if "comedy_description" not in columns:
+            op.add_column("episode", sa.Column("comedy_description", sa.String(), nullable=True))
+
+    if "adminsettings" not in tables:
+        op.create_table(
+            "adminsettings",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("is_submission_open", sa.Boolean(), nullable=False),
+            sa.Column("updated_at", sa.DateTime(), nullable=False),
+        )
+
+def downgrade():
+    op.drop_table("adminsettings")
+    op.drop_table("episode")
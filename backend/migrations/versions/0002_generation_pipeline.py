@@ -0,0 +1,70 @@
+"""Background generation status, content-addressed image store and pagination index
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    # Columns may already exist on databases touched by the pre-Alembic startup migration
+    columns = {column["name"] for column in inspector.get_columns("episode")}
+    indexes = {index["name"] for index in inspector.get_indexes("episode")}
+
+    with op.batch_alter_table("episode") as batch_op:
+        if "generation_status" not in columns:
+            # Rows that predate the job queue were generated inline and are complete
+            batch_op.add_column(sa.Column("generation_status", sa.String(), nullable=False, server_default="image_done"))
+        if "image_key" not in columns:
+            batch_op.add_column(sa.Column("image_key", sa.String(), nullable=True))
+        if "image_variants" not in columns:
+            batch_op.add_column(sa.Column("image_variants", sa.JSON(), nullable=True))
+        if "updated_at" not in columns:
+            batch_op.add_column(sa.Column("updated_at", sa.DateTime(), nullable=True))
+
+    op.execute("UPDATE episode SET updated_at = timestamp WHERE updated_at IS NULL")
+    with op.batch_alter_table("episode") as batch_op:
+        batch_op.alter_column("updated_at", existing_type=sa.DateTime(), nullable=False)
+
+    if "ix_episode_image_key" not in indexes:
+        op.create_index("ix_episode_image_key", "episode", ["image_key"])
+    if "ix_episode_timestamp_id" not in indexes:
+        op.create_index("ix_episode_timestamp_id", "episode", ["timestamp", "id"])
+
+    if "imageasset" not in inspector.get_table_names():
+        op.create_table(
+            "imageasset",
+            sa.Column("key", sa.String(length=64), primary_key=True),
+            sa.Column("filename", sa.String(), nullable=False),
+            sa.Column("ref_count", sa.Integer(), nullable=False),
+            sa.Column("checksum", sa.String(length=64), nullable=True),
+            sa.Column("size_bytes", sa.Integer(), nullable=True),
+            sa.Column("variants", sa.JSON(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=False),
+        )
+    else:
+        asset_columns = {column["name"] for column in inspector.get_columns("imageasset")}
+        with op.batch_alter_table("imageasset") as batch_op:
+            if "checksum" not in asset_columns:
+                batch_op.add_column(sa.Column("checksum", sa.String(length=64), nullable=True))
+            if "size_bytes" not in asset_columns:
+                batch_op.add_column(sa.Column("size_bytes", sa.Integer(), nullable=True))
+            if "variants" not in asset_columns:
+                batch_op.add_column(sa.Column("variants", sa.JSON(), nullable=True))
+
+def downgrade():
+    op.drop_table("imageasset")
+    op.drop_index("ix_episode_timestamp_id", table_name="episode")
+    op.drop_index("ix_episode_image_key", table_name="episode")
+    with op.batch_alter_table("episode") as batch_op:
+        batch_op.drop_column("updated_at")
+        batch_op.drop_column("image_variants")
+        batch_op.drop_column("image_key")
+        batch_op.drop_column("generation_status")
@@ -0,0 +1,21 @@
+"""Index episode.submitted_by
+
+episode.timestamp is already covered by the leading column of
+ix_episode_timestamp_id.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_index("ix_episode_submitted_by", "episode", ["submitted_by"])
+
+def downgrade():
+    op.drop_index("ix_episode_submitted_by", table_name="episode")
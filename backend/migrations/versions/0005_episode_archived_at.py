@@ -0,0 +1,21 @@
+"""Soft-delete (archive) support for episodes
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    with op.batch_alter_table("episode") as batch_op:
+        batch_op.add_column(sa.Column("archived_at", sa.DateTime(), nullable=True))
+
+def downgrade():
+    with op.batch_alter_table("episode") as batch_op:
+        batch_op.drop_column("archived_at")
@@ -0,0 +1,33 @@
+"""Lease and shared rate budget tables for coordinating worker processes
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "lease",
+        sa.Column("name", sa.String(length=100), primary_key=True),
+        sa.Column("owner", sa.String(length=100), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_lease_expires_at", "lease", ["expires_at"])
+    op.create_table(
+        "ratebudget",
+        sa.Column("name", sa.String(length=50), primary_key=True),
+        sa.Column("tokens", sa.Float(), nullable=False),
+        sa.Column("updated_at", sa.Float(), nullable=False),
+    )
+
+def downgrade():
+    op.drop_table("ratebudget")
+    op.drop_index("ix_lease_expires_at", table_name="lease")
+    op.drop_table("lease")
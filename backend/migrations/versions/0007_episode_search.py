@@ -0,0 +1,53 @@
+"""Full-text search index over episodes (SQLite FTS5), kept in sync by triggers
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+# Written out as of this revision rather than imported from episode_search.py, which may change later
+SEARCH_SCHEMA = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS episode_search USING fts5(
+        title, description, comedy_description, submitted_by,
+        content='episode', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS episode_search_insert AFTER INSERT ON episode BEGIN
+        INSERT INTO episode_search(rowid, title, description, comedy_description, submitted_by)
+        VALUES (new.id, new.title, new.description, new.comedy_description, new.submitted_by);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS episode_search_delete AFTER DELETE ON episode BEGIN
+        INSERT INTO episode_search(episode_search, rowid, title, description, comedy_description, submitted_by)
+        VALUES ('delete', old.id, old.title, old.description, old.comedy_description, old.submitted_by);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS episode_search_update AFTER UPDATE OF title, description, comedy_description, submitted_by ON episode BEGIN
+        INSERT INTO episode_search(episode_search, rowid, title, description, comedy_description, submitted_by)
+        VALUES ('delete', old.id, old.title, old.description, old.comedy_description, old.submitted_by);
+        INSERT INTO episode_search(rowid, title, description, comedy_description, submitted_by)
+        VALUES (new.id, new.title, new.description, new.comedy_description, new.submitted_by);
+    END""",
+    "INSERT INTO episode_search(episode_search, rank) VALUES ('rank', 'bm25(8.0, 4.0, 1.0, 2.0)')",
+    # Backfill the episodes that already exist
+    "INSERT INTO episode_search(episode_search) VALUES ('rebuild')",
+    "INSERT INTO episode_search(episode_search) VALUES ('optimize')",
+]
+
+def upgrade():
+    # Other databases search without an index
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for statement in SEARCH_SCHEMA:
+        op.execute(statement)
+
+def downgrade():
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for trigger in ("episode_search_insert", "episode_search_delete", "episode_search_update"):
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS episode_search")
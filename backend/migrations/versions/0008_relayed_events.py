@@ -0,0 +1,28 @@
+"""Table through which worker processes pass live-update events to each other
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "relayedevent",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("origin", sa.String(length=100), nullable=False),
+        sa.Column("type", sa.String(length=50), nullable=False),
+        sa.Column("data", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_relayedevent_created_at", "relayedevent", ["created_at"])
+
+def downgrade():
+    op.drop_index("ix_relayedevent_created_at", table_name="relayedevent")
+    op.drop_table("relayedevent")
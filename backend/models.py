@@ -1,19 +1,50 @@
-from sqlmodel import SQLModel, Field
+from sqlmodel import SQLModel, Field, Column, JSON, Index
 from typing import Optional
 from datetime import datetime
+from enum import Enum
+
+class GenerationStatus(str, Enum):
+    PENDING = "pending"
+    TITLE_DONE = "title_done"
+    DESCRIPTION_DONE = "description_done"
+    IMAGE_DONE = "image_done"
+    FAILED = "failed"
+
+# Placeholder title stored until the title stage finishes
+PENDING_TITLE = "Coming Soon..."
+TITLE_MAX_LENGTH = 200
 
 class Episode(SQLModel, table=True):
+    # Keyset pagination walks (timestamp, id) newest first
+    __table_args__ = (Index("ix_episode_timestamp_id", "timestamp", "id"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
-    title: str = Field(max_length=200, description="Clickbait episode title")
+    title: str = Field(max_length=TITLE_MAX_LENGTH, description="Clickbait episode title")
     description: str = Field(description="Real engineering issue description")
     comedy_description: Optional[str] = Field(default=None, description="Netflix-style comedy episode description")
-    submitted_by: str = Field(max_length=100, description="Name of person who submitted")
+    submitted_by: str = Field(max_length=100, index=True, description="Name of person who submitted")
     timestamp: datetime = Field(default_factory=datetime.utcnow)
     image_url: Optional[str] = Field(default=None, description="URL to AI-generated episode image")
+    generation_status: str = Field(default=GenerationStatus.PENDING.value, description="Progress of the background generation job")
+    image_key: Optional[str] = Field(default=None, index=True, description="Content hash of the shared image in the image store")
+    image_variants: Optional[dict] = Field(default=None, sa_column=Column(JSON), description="Resized WebP copies and placeholder")
+    updated_at: datetime = Field(default_factory=datetime.utcnow, description="Last time any generated field changed")
+    archived_at: Optional[datetime] = Field(default=None, description="Set when an admin archives the episode; archived episodes are hidden")
 
 class EpisodeCreate(SQLModel):
     description: str
     submitted_by: str
+    bypass_cache: bool = False
+
+class ImageSource(SQLModel):
+    url: str
+    width: int
+    type: str
+
+class ImageVariants(SQLModel):
+    placeholder: Optional[str] = None
+    sources: list[ImageSource] = []
+    srcset: str = ""
 
 class EpisodeRead(SQLModel):
     id: int
@@ -23,11 +54,96 @@ class EpisodeRead(SQLModel):
     submitted_by: str
     timestamp: datetime
     image_url: Optional[str] = None
+    image_variants: Optional[ImageVariants] = None
+    generation_status: str
+
+class EpisodeDetail(EpisodeRead):
+    updated_at: datetime
+    prev_id: Optional[int] = Field(default=None, description="Newer neighbour in list order")
+    next_id: Optional[int] = Field(default=None, description="Older neighbour in list order")
+
+class EpisodeSummary(SQLModel):
+    """List-view projection: everything a card needs, without the long text columns"""
+    id: int
+    title: str
+    submitted_by: str
+    timestamp: datetime
+    image_url: Optional[str] = None
+    image_variants: Optional[ImageVariants] = None
+    generation_status: str
+    teaser: Optional[str] = None
+
+class EpisodeSearchHit(EpisodeSummary):
+    # HTML-escaped, with matched words wrapped in <mark>
+    title_highlight: str
+    snippet: Optional[str] = Field(default=None, description="Best-matching excerpt of any indexed column")
+
+class EpisodeSearchPage(SQLModel):
+    items: list[EpisodeSearchHit]
+    next_cursor: Optional[str] = None
+
+class EpisodeFields(SQLModel):
+    """Any projection of an episode chosen with ?fields=; columns that weren't asked for are left out"""
+    id: Optional[int] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    comedy_description: Optional[str] = None
+    submitted_by: Optional[str] = None
+    timestamp: Optional[datetime] = None
+    image_url: Optional[str] = None
+    image_variants: Optional[ImageVariants] = None
+    generation_status: Optional[str] = None
+    teaser: Optional[str] = Field(default=None, description="Start of the comedy description (or the description)")
+
+class EpisodePage(SQLModel):
+    # Served with response_model_exclude_unset, so each item has exactly the requested fields
+    items: list[EpisodeFields]
+    next_cursor: Optional[str] = None
+
+class EpisodeCount(SQLModel):
+    count: int
+
+class GeneratedEpisodeText(SQLModel):
+    """Title and comedy description written by one combined completion"""
+    title: str = Field(min_length=1, max_length=TITLE_MAX_LENGTH)
+    comedy_description: str = Field(min_length=1)
+
+class ImageAsset(SQLModel, table=True):
+    key: str = Field(primary_key=True, max_length=64, description="Hash of the image prompt and generation settings")
+    filename: str = Field(description="File name under static/images")
+    ref_count: int = Field(default=0, description="Number of episodes pointing at this image")
+    checksum: Optional[str] = Field(default=None, max_length=64, description="SHA-256 of the file as downloaded")
+    size_bytes: Optional[int] = Field(default=None)
+    variants: Optional[dict] = Field(default=None, sa_column=Column(JSON), description="Derivative widths and placeholder")
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+class Lease(SQLModel, table=True):
+    """Exclusive claim on a piece of work (an episode's generation, an image) shared by all worker processes"""
+    name: str = Field(primary_key=True, max_length=100, description="e.g. episode:42 or image:<key>")
+    owner: str = Field(max_length=100, description="Worker process holding the lease")
+    expires_at: datetime = Field(index=True, description="Renewed while held; free to take once passed")
+
+class RateBudget(SQLModel, table=True):
+    """Token bucket shared by all worker processes, so together they stay within the API rate limits"""
+    name: str = Field(primary_key=True, max_length=50)
+    tokens: float
+    # Epoch seconds rather than a datetime so the refill can be computed in SQL on any backend
+    updated_at: float
+
+class RelayedEvent(SQLModel, table=True):
+    """A live-update event published by one worker process, for the others to pass on to their viewers"""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    origin: str = Field(max_length=100, description="Worker process that published it")
+    type: str = Field(max_length=50)
+    data: str = Field(description="JSON-encoded event data")
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
 
 class AdminSettings(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     is_submission_open: bool = Field(default=True)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
+    # Bumped on every write so other workers can tell their cached copy is stale
+    version: int = Field(default=1)
 
 class AdminSettingsUpdate(SQLModel):
     is_submission_open: bool
@@ -36,6 +152,27 @@ class AdminSettingsRead(SQLModel):
     id: int
     is_submission_open: bool
     updated_at: datetime
+    version: int
 
 class StatusRead(SQLModel):
-    is_submission_open: bool
\ No newline at end of file
+    is_submission_open: bool
+
+class ProfilerUpdate(SQLModel):
+    enabled: bool
+    requests: int = Field(default=1, ge=1, le=100)
+    path_prefix: str = "/api/"
+    interval: float = Field(default=0.001, gt=0, le=1)
+
+class ProfilerStatus(SQLModel):
+    available: bool
+    remaining: int
+    path_prefix: str
+    interval: float
+    profiles: list[str]
+
+class LLMCacheStats(SQLModel):
+    enabled: bool
+    entries: int
+    hits: int
+    misses: int
+    hit_rate: float
\ No newline at end of file
@@ -0,0 +1,257 @@
+import os
+import re
+import time
+import random
+import asyncio
+import logging
+import contextlib
+from typing import AsyncIterator, Optional
+import httpx
+from metrics import OPENAI_REQUESTS, OPENAI_TOKENS, RETRIES
+from tracing import tracer, CLIENT
+from coordination import coordinator
+
+# The OpenAI SDK is imported where first used: it was a third of the app's import time
+
+logger = logging.getLogger(__name__)
+
+# Status codes worth retrying: rate limited, or the API had a transient failure
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+# Error codes that come back as 429 but will not clear up by waiting
+NON_RETRYABLE_ERROR_CODES = {"insufficient_quota", "billing_hard_limit_reached"}
+
+def parse_reset_duration(value: Optional[str]) -> Optional[float]:
+    """Parse OpenAI reset headers such as '1s', '6m0s' or '20ms' into seconds"""
+    if not value:
+        return None
+    total = 0.0
+    matched = False
+    for amount, unit in re.findall(r"([\d.]+)(ms|h|m|s)", value):
+        matched = True
+        total += float(amount) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[unit]
+    return total if matched else None
+
+class TokenBucket:
+    """Request-rate limiter that follows OpenAI's x-ratelimit-* response headers"""
+
+    def __init__(self, requests_per_minute: float):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = max(1.0, requests_per_minute / 60.0 * 10)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self):
+        """Wait until a request may be sent"""
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def block_for(self, seconds: float):
+        """Stop handing out tokens for a while, e.g. after a 429 with Retry-After"""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def update_from_headers(self, headers: httpx.Headers):
+        """Adjust rate and remaining budget from the limits the API reports"""
+        limit = headers.get("x-ratelimit-limit-requests")
+        remaining = headers.get("x-ratelimit-remaining-requests")
+        reset = parse_reset_duration(headers.get("x-ratelimit-reset-requests"))
+
+        if limit and limit.isdigit() and int(limit) > 0:
+            self.rate = int(limit) / 60.0
+            self.capacity = max(1.0, self.rate * 10)
+
+        if remaining and remaining.isdigit():
+            self._refill()
+            self.tokens = min(self.tokens, float(remaining))
+            if int(remaining) == 0 and reset:
+                self.block_for(reset)
+
+class OpenAIClientPool:
+    """Shared OpenAI client with pooled keep-alive connections, per-endpoint
+    concurrency caps, header-driven rate limiting and jittered retries"""
+
+    def __init__(self):
+        # Without a key the app still boots and serves reads; API calls raise instead
+        self.api_key = os.getenv("OPENAI_API_KEY")
+        self.max_retries = int(os.getenv("OPENAI_MAX_RETRIES", "4"))
+        self.base_delay = float(os.getenv("OPENAI_RETRY_BASE_DELAY", "1.0"))
+        self.max_delay = float(os.getenv("OPENAI_RETRY_MAX_DELAY", "30.0"))
+        self.limits = httpx.Limits(
+            max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "20")),
+            max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "10")),
+            keepalive_expiry=30.0,
+        )
+        self.semaphores = {
+            "chat": asyncio.Semaphore(int(os.getenv("OPENAI_CHAT_CONCURRENCY", "4"))),
+            "images": asyncio.Semaphore(int(os.getenv("OPENAI_IMAGE_CONCURRENCY", "2"))),
+        }
+        self.buckets = {
+            "chat": TokenBucket(float(os.getenv("OPENAI_CHAT_RPM", "500"))),
+            "images": TokenBucket(float(os.getenv("OPENAI_IMAGE_RPM", "50"))),
+        }
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._client = None
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        """Keep-alive HTTP client shared by the OpenAI SDK and image downloads"""
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = httpx.AsyncClient(
+                limits=self.limits,
+                timeout=httpx.Timeout(60.0, connect=10.0),
+                follow_redirects=True,
+            )
+            self._client = None
+        return self._http_client
+
+    @property
+    def client(self):
+        """The AsyncOpenAI client, built on first use"""
+        if not self.api_key:
+            raise ValueError("OPENAI_API_KEY environment variable is required")
+        if self._client is None or self._http_client is None or self._http_client.is_closed:
+            from openai import AsyncOpenAI
+            http_client = self.http_client
+            # Retries are handled here so they respect the shared limiter
+            self._client = AsyncOpenAI(api_key=self.api_key, http_client=http_client, max_retries=0)
+        return self._client
+
+    async def chat_completion(self, **kwargs):
+        """Create a chat completion through the shared pool"""
+        return await self._request("chat", self.client.chat.completions.with_raw_response.create, **kwargs)
+
+    async def chat_completion_stream(self, **kwargs) -> AsyncIterator[str]:
+        """Stream a chat completion's text through the shared pool.
+
+        Only opening the stream is retried; the concurrency slot is held until the stream ends.
+        """
+        model = kwargs.get("model", "unknown")
+        async with self.semaphores["chat"]:
+            stream = await self._request(
+                "chat", self.client.chat.completions.with_raw_response.create, hold_slot=False,
+                stream=True, stream_options={"include_usage": True}, **kwargs,
+            )
+            try:
+                async for chunk in stream:
+                    # The final chunk carries usage and no choices
+                    record_usage(model, chunk)
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                await stream.close()
+
+    async def generate_image(self, **kwargs):
+        """Generate an image through the shared pool"""
+        return await self._request("images", self.client.images.with_raw_response.generate, **kwargs)
+
+    async def _request(self, kind: str, create, hold_slot: bool = True, **kwargs):
+        with tracer.span(f"openai.{kind}", CLIENT, model=kwargs.get("model")) as span:
+            return await self._send(kind, create, span, hold_slot, **kwargs)
+
+    async def _send(self, kind: str, create, span, hold_slot: bool, **kwargs):
+        import openai
+        bucket = self.buckets[kind]
+        # Streams take the concurrency slot themselves for as long as they are read
+        slot = self.semaphores[kind] if hold_slot else contextlib.nullcontext()
+        for attempt in range(self.max_retries + 1):
+            span.set(attempts=attempt + 1)
+            await bucket.acquire()
+            # With several worker processes they also share one budget (a no-op for a single process)
+            await coordinator.take_rate_budget(f"openai_{kind}", bucket.rate * 60)
+            try:
+                async with slot:
+                    raw_response = await create(**kwargs)
+                bucket.update_from_headers(raw_response.headers)
+                response = raw_response.parse()
+                OPENAI_REQUESTS.inc(endpoint=kind, outcome="ok")
+                record_usage(kwargs.get("model", "unknown"), response)
+                return response
+            except (openai.APIStatusError, openai.APIConnectionError) as e:
+                OPENAI_REQUESTS.inc(endpoint=kind, outcome=str(getattr(e, "status_code", "connection_error")))
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                delay = self.retry_delay(attempt, e)
+                if isinstance(e, openai.APIStatusError):
+                    bucket.update_from_headers(e.response.headers)
+                    if e.status_code == 429:
+                        bucket.block_for(delay)
+                RETRIES.inc(source=f"openai_{kind}")
+                logger.warning("⏰ OpenAI %s request failed (%s), retrying in %.1fs", kind, describe_openai_error(e), delay)
+                await asyncio.sleep(delay)
+
+    def retry_delay(self, attempt: int, e: Exception) -> float:
+        """Honour Retry-After when given, otherwise exponential backoff with full jitter"""
+        response = getattr(e, "response", None)
+        if response is not None:
+            retry_after = response.headers.get("retry-after")
+            if retry_after:
+                try:
+                    return float(retry_after) + random.uniform(0, self.base_delay)
+                except ValueError:
+                    pass
+            reset = parse_reset_duration(response.headers.get("x-ratelimit-reset-requests"))
+            if reset:
+                return reset + random.uniform(0, self.base_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def aclose(self):
+        """Close pooled connections (called on app shutdown)"""
+        if self._http_client is not None and not self._http_client.is_closed:
+            await self._http_client.aclose()
+        self._http_client = None
+        self._client = None
+
+def record_usage(model: str, response):
+    """Count the tokens a chat completion reports using"""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    OPENAI_TOKENS.inc(usage.prompt_tokens or 0, model=model, kind="prompt")
+    OPENAI_TOKENS.inc(usage.completion_tokens or 0, model=model, kind="completion")
+
+def is_retryable(e: Exception) -> bool:
+    """Transient errors (connection problems, 429 rate limits, 5xx) are worth retrying"""
+    import openai
+    if isinstance(e, openai.APIConnectionError):
+        return True
+    if isinstance(e, openai.APIStatusError):
+        if getattr(e, "code", None) in NON_RETRYABLE_ERROR_CODES:
+            return False
+        return e.status_code in RETRYABLE_STATUS_CODES
+    return False
+
+def describe_openai_error(e: Exception) -> str:
+    """Turn an OpenAI error into a short, actionable message"""
+    import openai
+    if isinstance(e, openai.AuthenticationError):
+        return "🔑 Invalid OpenAI API key. Check your .env file."
+    if isinstance(e, openai.APIStatusError) and getattr(e, "code", None) in NON_RETRYABLE_ERROR_CODES:
+        return "💰 OpenAI billing limit reached. Add credits to your account."
+    if isinstance(e, openai.RateLimitError):
+        return "⏰ OpenAI rate limit exceeded."
+    if isinstance(e, openai.APIStatusError):
+        return f"🔍 OpenAI returned {e.status_code}: {e.message}"
+    return f"🔍 {type(e).__name__}: {e}"
+
+# Global instance
+openai_pool = OpenAIClientPool()
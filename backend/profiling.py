@@ -0,0 +1,141 @@
+import os
+import re
+import asyncio
+import logging
+import secrets
+import importlib.util
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import FileResponse
+from models import ProfilerUpdate, ProfilerStatus
+from tracing import request_id_var
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/admin/profiler")
+
+PROFILE_NAME_PATTERN = re.compile(r"^[\w.-]+\.(html|speedscope\.json)$")
+
+class RequestProfiler:
+    """Admin-armed sampling profiler: captures the next N matching requests with pyinstrument.
+
+    Each capture is saved as an HTML report and a speedscope flame graph. pyinstrument is
+    an optional dependency (`pip install .[profiling]`); without it the toggle reports unavailable.
+    """
+
+    def __init__(self, output_dir: str = "profiles", max_profiles: int = 50):
+        self.output_dir = output_dir
+        # Oldest captures are deleted past this many
+        self.max_profiles = max_profiles
+        self.remaining = 0
+        self.path_prefix = "/api/"
+        self.interval = 0.001
+        self.available = importlib.util.find_spec("pyinstrument") is not None
+
+    def arm(self, requests: int, path_prefix: str, interval: float):
+        self.remaining = requests
+        self.path_prefix = path_prefix
+        self.interval = interval
+        logger.info("🔬 Profiling the next %d request(s) under %s", requests, path_prefix)
+
+    def disarm(self):
+        self.remaining = 0
+
+    def claim(self, path: str) -> bool:
+        """Whether to profile this request; each claim uses up one armed capture"""
+        if self.remaining <= 0 or not path.startswith(self.path_prefix) or path.startswith(router.prefix):
+            return False
+        self.remaining -= 1
+        return True
+
+    def list_profiles(self) -> list[str]:
+        if not os.path.isdir(self.output_dir):
+            return []
+        return sorted((name for name in os.listdir(self.output_dir) if PROFILE_NAME_PATTERN.match(name)), reverse=True)
+
+    def save(self, session, name: str):
+        """Render and write one capture (runs in a thread; rendering is CPU-bound)"""
+        from pyinstrument.renderers import HTMLRenderer, SpeedscopeRenderer
+        os.makedirs(self.output_dir, exist_ok=True)
+        for suffix, renderer in ((".html", HTMLRenderer()), (".speedscope.json", SpeedscopeRenderer())):
+            with open(os.path.join(self.output_dir, name + suffix), "w", encoding="utf-8") as f:
+                f.write(renderer.render(session))
+
+        captures = sorted({filename.removesuffix(".html").removesuffix(".speedscope.json") for filename in self.list_profiles()})
+        for stale in captures[:-self.max_profiles]:
+            for suffix in (".html", ".speedscope.json"):
+                try:
+                    os.remove(os.path.join(self.output_dir, stale + suffix))
+                except FileNotFoundError:
+                    pass
+
+    def status(self) -> ProfilerStatus:
+        return ProfilerStatus(
+            available=self.available,
+            remaining=self.remaining,
+            path_prefix=self.path_prefix,
+            interval=self.interval,
+            profiles=self.list_profiles(),
+        )
+
+class ProfilingMiddleware:
+    """Wraps armed requests in a pyinstrument profiler that follows the request's own task"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not request_profiler.claim(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        from pyinstrument import Profiler
+        profiler = Profiler(interval=request_profiler.interval, async_mode="enabled")
+        profiler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            session = profiler.stop()
+            slug = re.sub(r"[^\w]+", "-", f"{scope['method']} {scope['path']}").strip("-")[:60]
+            name = f"{datetime.utcnow():%Y%m%dT%H%M%S%f}-{slug}-{request_id_var.get() or 'request'}"
+            try:
+                await asyncio.to_thread(request_profiler.save, session, name)
+                logger.info("🔬 Saved profile %s", name)
+            except Exception:
+                logger.exception("❌ Could not save profile %s", name)
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None)):
+    """Profiles expose code paths and timings, so guard them with ADMIN_TOKEN when it's set"""
+    expected = os.getenv("ADMIN_TOKEN")
+    if expected and not secrets.compare_digest(x_admin_token or "", expected):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+@router.get("", response_model=ProfilerStatus, dependencies=[Depends(require_admin)])
+async def get_profiler():
+    return request_profiler.status()
+
+@router.put("", response_model=ProfilerStatus, dependencies=[Depends(require_admin)])
+async def update_profiler(update: ProfilerUpdate):
+    """Arm the profiler for the next `requests` matching requests, or switch it off"""
+    if not update.enabled:
+        request_profiler.disarm()
+        return request_profiler.status()
+    if not request_profiler.available:
+        raise HTTPException(status_code=501, detail="pyinstrument is not installed (pip install .[profiling])")
+    request_profiler.arm(update.requests, update.path_prefix, update.interval)
+    return request_profiler.status()
+
+@router.get("/profiles/{name}", dependencies=[Depends(require_admin)])
+async def get_profile(name: str):
+    """Download a capture: .html opens in a browser, .speedscope.json in https://speedscope.app"""
+    path = os.path.join(request_profiler.output_dir, name)
+    if not PROFILE_NAME_PATTERN.match(name) or not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path)
+
+# Global instance
+request_profiler = RequestProfiler(
+    output_dir=os.getenv("PROFILE_DIR", "profiles"),
+    max_profiles=int(os.getenv("PROFILE_MAX_FILES", "50")),
+)
@@ -0,0 +1,50 @@
+import sys
+import time
+import asyncio
+import logging
+import importlib
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+class ServiceProvider:
+    """Builds the generation services on first use instead of at import time.
+
+    Each service is registered as "module:attribute"; the module (and with it the
+    service's global instance and everything it imports) is loaded the first time
+    the service is asked for, so reads never pay for the generation pipeline.
+    """
+
+    def __init__(self, registry: dict[str, str]):
+        self.registry = registry
+        self.instances: dict[str, Any] = {}
+        # Seconds each service took to import and construct, for the startup report
+        self.load_seconds: dict[str, float] = {}
+
+    def get(self, name: str) -> Any:
+        if name not in self.instances:
+            module_name, _, attribute = self.registry[name].partition(":")
+            started = time.perf_counter()
+            instance = getattr(importlib.import_module(module_name), attribute)
+            self.load_seconds[name] = time.perf_counter() - started
+            self.instances[name] = instance
+            logger.debug("🔌 Loaded %s in %.2fs", name, self.load_seconds[name])
+        return self.instances[name]
+
+    def loaded(self, name: str) -> bool:
+        """Whether the service exists yet, through get() or because another module imported it"""
+        return name in self.instances or self.registry[name].partition(":")[0] in sys.modules
+
+    async def warm(self, *names: str):
+        """Load services off the event loop, so requests keep being served meanwhile"""
+        for name in names or self.registry:
+            if name not in self.instances:
+                await asyncio.to_thread(self.get, name)
+
+# Global instance
+services = ServiceProvider({
+    "generation_queue": "generation_queue:generation_queue",
+    "batch_importer": "batch_import:batch_importer",
+    "llm_cache": "llm_cache:llm_cache",
+    "image_derivatives": "image_derivatives:image_derivative_service",
+})
@@ -0,0 +1,85 @@
+import os
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional
+from sqlmodel import select
+from database import async_session
+from models import AdminSettings, AdminSettingsRead
+from event_hub import event_hub
+
+logger = logging.getLogger(__name__)
+
+class SettingsCache:
+    """In-memory copy of the AdminSettings row.
+
+    Writes go through `update`, which bumps the row's version and refreshes this
+    process immediately. Other uvicorn workers notice the change by polling the
+    version column every `refresh_interval` seconds, so reads never hit the database.
+    """
+
+    def __init__(self, refresh_interval: float = 2.0):
+        self.refresh_interval = refresh_interval
+        self.settings: Optional[AdminSettingsRead] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @property
+    def version(self) -> int:
+        return self.settings.version if self.settings else 0
+
+    @property
+    def is_submission_open(self) -> bool:
+        # Missing row behaves like the defaults
+        return self.settings.is_submission_open if self.settings else True
+
+    def store(self, settings: Optional[AdminSettings], relay: bool = True):
+        was_open = self.is_submission_open if self.settings else None
+        self.settings = AdminSettingsRead.model_validate(settings) if settings else None
+        if was_open is not None and self.is_submission_open != was_open:
+            event_hub.publish("submissions_toggled", {"is_submission_open": self.is_submission_open}, relay=relay)
+
+    async def load(self, relay: bool = True):
+        async with async_session() as session:
+            self.store(await session.get(AdminSettings, 1), relay)
+
+    async def start(self):
+        await self.load()
+        if self.refresh_interval > 0:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            await asyncio.gather(self._refresh_task, return_exceptions=True)
+            self._refresh_task = None
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                async with async_session() as session:
+                    version = (await session.exec(select(AdminSettings.version).where(AdminSettings.id == 1))).first()
+                if version is not None and version != self.version:
+                    # The worker that made the change relays its own event to everyone else
+                    await self.load(relay=False)
+                    logger.info("🔄 Admin settings changed in another worker (version %d)", self.version)
+            except Exception as e:
+                logger.warning("⚠️  Could not refresh admin settings: %s: %s", type(e).__name__, e)
+
+    async def update(self, is_submission_open: bool) -> Optional[AdminSettingsRead]:
+        """Write-through update of the settings row"""
+        async with async_session() as session:
+            settings = await session.get(AdminSettings, 1)
+            if not settings:
+                return None
+            settings.is_submission_open = is_submission_open
+            settings.updated_at = datetime.utcnow()
+            settings.version = AdminSettings.version + 1
+            session.add(settings)
+            await session.commit()
+            await session.refresh(settings)
+            self.store(settings)
+            return self.settings
+
+# Global instance
+settings_cache = SettingsCache(refresh_interval=float(os.getenv("SETTINGS_REFRESH_SECONDS", "2")))
@@ -0,0 +1,61 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Iterable
+
+StageFunc = Callable[[dict], Awaitable]
+
+class Stage:
+    def __init__(self, name: str, func: StageFunc, depends_on: Iterable[str] = ()):
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+
+class StageGraphExecutor:
+    """Runs a small DAG of async stages, starting each one as soon as its dependencies finish"""
+
+    def __init__(self, stages: list[Stage]):
+        self.stages = {stage.name: stage for stage in stages}
+        for stage in stages:
+            for dependency in stage.depends_on:
+                if dependency not in self.stages:
+                    raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dependency}'")
+
+    async def run(self, results: dict) -> dict[str, float]:
+        """Execute every stage not already present in `results`.
+
+        Each stage receives the shared `results` dict and its return value is
+        stored under the stage name. Returns wall-clock seconds per stage plus
+        a `total` entry for the whole graph.
+        """
+        timings: dict[str, float] = {}
+        tasks: dict[str, asyncio.Task] = {}
+        started = time.perf_counter()
+
+        async def run_stage(stage: Stage):
+            pending = [tasks[name] for name in stage.depends_on if name in tasks]
+            if pending:
+                await asyncio.gather(*pending)
+            stage_started = time.perf_counter()
+            try:
+                results[stage.name] = await stage.func(results)
+            finally:
+                timings[stage.name] = time.perf_counter() - stage_started
+
+        for stage in self.stages.values():
+            if stage.name not in results:
+                tasks[stage.name] = asyncio.create_task(run_stage(stage), name=f"stage:{stage.name}")
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+
+        timings["total"] = time.perf_counter() - started
+        return timings
+
+def format_timings(timings: dict[str, float]) -> str:
+    """Render stage timings as `name=1.23s` pairs for log lines"""
+    return " ".join(f"{name}={seconds:.2f}s" for name, seconds in timings.items())
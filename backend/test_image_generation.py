@@ -4,7 +4,12 @@ Test script to verify DALL-E image generation works
 """
 import asyncio
 import os
+from dotenv import load_dotenv
+load_dotenv()
+
+from database import create_db_and_tables, engine
 from image_service import image_service
+from openai_client import openai_pool
 
 async def test_image_generation():
     """Test generating an image with DALL-E"""
@@ -16,6 +21,9 @@ async def test_image_generation():
     episode_id = 999
     
     try:
+        # Image assets are recorded in the database, so it needs to be migrated first
+        await create_db_and_tables()
+        
         # Generate image
         print(f"Generating image for episode: {title}")
         filename = await image_service.generate_episode_image(title, description, episode_id)
@@ -45,6 +53,10 @@ async def test_image_generation():
     except Exception as e:
         print(f"❌ Error during image generation: {e}")
         return False
+    finally:
+        # The aiosqlite worker thread would otherwise keep the interpreter from exiting
+        await openai_pool.aclose()
+        await engine.dispose()
 
 if __name__ == "__main__":
     success = asyncio.run(test_image_generation())
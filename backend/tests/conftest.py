@@ -0,0 +1,184 @@
+"""
+Shared fixtures: the app on a throwaway database and working directory, with the
+OpenAI API replaced by a stubbed HTTP transport
+"""
+import io
+import os
+import json
+import time
+import shutil
+import asyncio
+import tempfile
+from typing import Optional
+
+# Set before any app module reads the environment
+WORKDIR = tempfile.mkdtemp(prefix="netflux-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{WORKDIR}/netflux.db",
+    "OPENAI_API_KEY": "sk-test",
+    "TITLE_BUDGET_SECONDS": "0",
+    "DESCRIPTION_BUDGET_SECONDS": "0",
+    "GENERATION_MAX_ATTEMPTS": "1",
+    "OPENAI_MAX_RETRIES": "0",
+    "LLM_CACHE_ENABLED": "false",
+    "IMAGE_PROCESS_WORKERS": "1",
+})
+
+import httpx
+import pytest
+from PIL import Image
+from fastapi.testclient import TestClient
+from sqlalchemy import delete
+import main
+from database import async_session
+from models import Episode, ImageAsset, Lease, RelayedEvent
+from openai_client import openai_pool
+from image_service import image_service
+
+TERMINAL_STATUSES = ("image_done", "failed")
+
+class OpenAIStub:
+    """Answers chat completions (streamed or not), image generations and image downloads like the OpenAI API"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.title = "The Merge That Broke Everything"
+        self.comedy_description = "In this harrowing episode, our heroic development team faces the merge."
+        self.requests: list[httpx.Request] = []
+        # Seconds each chat model takes to answer
+        self.delays: dict[str, float] = {}
+        # Returned, in order, for the next chat completions instead of a reply
+        self.chat_errors: list[httpx.Response] = []
+        # Returned for image downloads instead of a PNG
+        self.image_download: Optional[httpx.Response] = None
+
+    def reply(self, prompt: str) -> str:
+        if '"comedy_description"' in prompt:
+            return json.dumps({"title": self.title, "comedy_description": self.comedy_description})
+        if "JSON array of" in prompt:
+            count = int(prompt.rsplit("JSON array of ", 1)[1].split()[0])
+            return json.dumps([f"{self.title} {n}" for n in range(count)])
+        if "episode descriptions" in prompt:
+            return self.comedy_description
+        return self.title
+
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        if request.url.path.endswith("/chat/completions"):
+            body = json.loads(request.content)
+            await asyncio.sleep(self.delays.get(body["model"], 0))
+            if self.chat_errors:
+                return self.chat_errors.pop(0)
+            content = self.reply(body["messages"][-1]["content"])
+            usage = {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}
+            if body.get("stream"):
+                return httpx.Response(200, content=stream_events(body["model"], content, usage), headers={"content-type": "text/event-stream"})
+            return httpx.Response(200, json={
+                "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": body["model"],
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+        if request.url.path.endswith("/images/generations"):
+            return httpx.Response(200, json={"created": 0, "data": [{"url": "https://images.test/episode.png"}]})
+        if request.url.host == "images.test":
+            if self.image_download is not None:
+                return self.image_download
+            buffer = io.BytesIO()
+            Image.new("RGB", (64, 36), (90, 0, 160)).save(buffer, "PNG")
+            return httpx.Response(200, content=buffer.getvalue(), headers={"content-type": "image/png"})
+        return httpx.Response(404)
+
+    def count(self, path_suffix: str) -> int:
+        return sum(request.url.path.endswith(path_suffix) for request in self.requests)
+
+    def chat_bodies(self) -> list[dict]:
+        return [json.loads(request.content) for request in self.requests if request.url.path.endswith("/chat/completions")]
+
+def stream_events(model: str, content: str, usage: dict) -> bytes:
+    """A chat completion as server-sent events, a few characters per chunk, ending with usage"""
+    chunk = {"id": "chatcmpl-test", "object": "chat.completion.chunk", "created": 0, "model": model}
+    events = [
+        {**chunk, "choices": [{"index": 0, "delta": {"content": content[start:start + 7]}, "finish_reason": None}]}
+        for start in range(0, len(content), 7)
+    ]
+    events.append({**chunk, "choices": [], "usage": usage})
+    return "".join(f"data: {json.dumps(event)}\n\n" for event in events).encode() + b"data: [DONE]\n\n"
+
+@pytest.fixture(scope="session", autouse=True)
+def workdir():
+    """Images and the static mount are relative to the working directory"""
+    previous = os.getcwd()
+    os.chdir(WORKDIR)
+    yield WORKDIR
+    os.chdir(previous)
+    shutil.rmtree(WORKDIR, ignore_errors=True)
+
+@pytest.fixture(scope="session")
+def openai_stub() -> OpenAIStub:
+    stub = OpenAIStub()
+    # The pool builds its SDK client on this HTTP client on first use
+    openai_pool._http_client = httpx.AsyncClient(transport=httpx.MockTransport(stub.handler), follow_redirects=True)
+    openai_pool._client = None
+    return stub
+
+@pytest.fixture(scope="session")
+def app_client(workdir, openai_stub):
+    # One client, and so one event loop, for the whole run: the app's queues and locks live as long as the process
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+@pytest.fixture
+def client(app_client, openai_stub):
+    """The app with an empty database and image store"""
+    app_client.portal.call(clear_database)
+    shutil.rmtree(image_service.storage_dir, ignore_errors=True)
+    os.makedirs(image_service.storage_dir, exist_ok=True)
+    openai_stub.reset()
+    return app_client
+
+async def clear_database():
+    async with async_session() as session:
+        for model in (Episode, ImageAsset, Lease, RelayedEvent):
+            await session.exec(delete(model))
+        await session.commit()
+
+@pytest.fixture
+def add_episodes(client):
+    """Insert episodes straight into the database (no generation); returns their ids in order"""
+    def add(*episodes: dict) -> list[int]:
+        async def insert() -> list[int]:
+            async with async_session() as session:
+                rows = [Episode(**{"title": "Untitled", "description": "An incident", "submitted_by": "tester", "generation_status": "image_done", **fields}) for fields in episodes]
+                session.add_all(rows)
+                await session.commit()
+                return [row.id for row in rows]
+        return client.portal.call(insert)
+    return add
+
+def wait_for_generation(client: TestClient, episode_id: int, timeout: float = 20.0) -> dict:
+    """Poll an episode until its generation reaches a terminal status"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        episode = client.get(f"/api/episodes/{episode_id}").json()
+        if episode.get("generation_status") in TERMINAL_STATUSES:
+            return episode
+        time.sleep(0.05)
+    raise AssertionError(f"Episode {episode_id} did not finish generating within {timeout}s")
+
+def submit(client: TestClient, description: str) -> dict:
+    """Create an episode through the API and wait for its generation"""
+    response = client.post("/api/episodes", json={"description": description, "submitted_by": "tester"})
+    assert response.status_code == 202
+    return wait_for_generation(client, response.json()["id"])
+
+def image_asset(client: TestClient, filename: str):
+    async def load():
+        async with async_session() as session:
+            return await session.get(ImageAsset, image_service.key_for_filename(filename))
+    return client.portal.call(load)
+
+def stored_filename(episode: dict) -> str:
+    """The image store filename behind an episode's image_url"""
+    return episode["image_url"].rsplit("/", 1)[-1]
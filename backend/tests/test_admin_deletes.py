@@ -0,0 +1,38 @@
+import os
+from datetime import datetime
+from conftest import submit, image_asset, stored_filename
+from image_service import image_service
+
+def test_bulk_delete_releases_references(client):
+    episode = submit(client, "The cache never expired")
+    filename = stored_filename(episode)
+
+    assert client.delete("/api/admin/episodes").json()["count"] == 1
+    assert image_asset(client, filename) is None
+    assert not os.path.exists(image_service.get_image_path(filename))
+
+def test_archiving_keeps_the_image(client):
+    episode = submit(client, "Someone force-pushed to main")
+    filename = stored_filename(episode)
+
+    assert client.delete(f"/api/episodes/{episode['id']}", params={"archive": "true"}).status_code == 200
+    assert client.get(f"/api/episodes/{episode['id']}").status_code == 404
+    assert image_asset(client, filename).ref_count == 1
+    assert os.path.exists(image_service.get_image_path(filename))
+
+def test_bulk_delete_only_touches_matching_episodes(client, add_episodes):
+    ops, dev, old = add_episodes(
+        {"submitted_by": "ops", "timestamp": datetime(2026, 3, 1)},
+        {"submitted_by": "dev", "timestamp": datetime(2026, 3, 1)},
+        {"submitted_by": "ops", "timestamp": datetime(2026, 1, 1)},
+    )
+    response = client.delete("/api/admin/episodes", params={"submitted_by": "ops", "since": "2026-02-01T00:00:00"})
+    assert response.json()["count"] == 1
+    assert client.get(f"/api/episodes/{ops}").status_code == 404
+    assert client.get(f"/api/episodes/{dev}").status_code == 200
+    assert client.get(f"/api/episodes/{old}").status_code == 200
+
+def test_bulk_archive_hides_episodes_from_the_count(client, add_episodes):
+    add_episodes({"submitted_by": "ops"}, {"submitted_by": "dev"})
+    assert client.delete("/api/admin/episodes", params={"archive": "true", "submitted_by": "ops"}).json()["count"] == 1
+    assert client.get("/api/admin/episodes/count").json()["count"] == 1
@@ -0,0 +1,84 @@
+import json
+import asyncio
+from contextlib import asynccontextmanager
+from sqlalchemy import update
+from conftest import wait_for_generation
+from database import async_session
+from models import Episode
+from coordination import coordinator
+from batch_import import batch_importer
+
+def import_lines(client, lines: list[str]) -> list[dict]:
+    body = "\n".join(lines) + "\n"
+    with client.stream("POST", "/api/episodes/batch", content=body, headers={"content-type": "application/x-ndjson"}) as response:
+        assert response.status_code == 202
+        return [json.loads(line) for line in response.iter_lines() if line]
+
+def test_ndjson_import_reports_each_record(client):
+    results = import_lines(client, [
+        json.dumps({"description": "The VPN certificate expired", "submitted_by": "ops"}),
+        "{not json",
+        json.dumps({"description": "No submitter"}),
+        "",
+        json.dumps({"description": "The queue backed up", "submitted_by": "ops"}),
+    ])
+
+    errors = {result["index"]: result["error"] for result in results if "error" in result}
+    assert errors.keys() == {1, 2}
+    assert errors[1].startswith("Invalid JSON")
+    assert "submitted_by" in errors[2]
+
+    queued = {result["index"]: result["id"] for result in results if result.get("status") == "queued"}
+    assert queued.keys() == {0, 3}
+
+    finished = {result["index"]: result for result in results if "generation_status" in result}
+    assert finished.keys() == {0, 3}
+    assert results[-1] == {"done": True, "accepted": 2, "rejected": 2}
+    for episode_id in queued.values():
+        assert wait_for_generation(client, episode_id)["generation_status"] == "image_done"
+
+def test_json_array_import(client):
+    body = json.dumps([{"description": "DNS, again", "submitted_by": "ops"}])
+    with client.stream("POST", "/api/episodes/batch", content=body, headers={"content-type": "application/json"}) as response:
+        results = [json.loads(line) for line in response.iter_lines() if line]
+    assert results[-1] == {"done": True, "accepted": 1, "rejected": 0}
+    assert wait_for_generation(client, results[0]["id"])["generation_status"] == "image_done"
+
+def test_malformed_json_array_is_rejected(client):
+    response = client.post("/api/episodes/batch", content=b'[{"description": ', headers={"content-type": "application/json"})
+    assert response.status_code == 400
+
+def test_too_many_records_are_refused(client, monkeypatch):
+    monkeypatch.setattr(batch_importer, "max_items", 2)
+    lines = [json.dumps({"description": f"Incident {n}", "submitted_by": "ops"}) for n in range(3)]
+    response = client.post("/api/episodes/batch", content="\n".join(lines), headers={"content-type": "application/x-ndjson"})
+    assert response.status_code == 413
+    assert client.get("/api/admin/episodes/count").json()["count"] == 0
+
+def test_oversized_body_is_refused(client, monkeypatch):
+    monkeypatch.setattr(batch_importer, "max_body_bytes", 100)
+    line = json.dumps({"description": "x" * 200, "submitted_by": "ops"}).encode()
+    assert client.post("/api/episodes/batch", content=line, headers={"content-type": "application/x-ndjson"}).status_code == 413
+    # Without a Content-Length the body is cut off while it streams in
+    chunks = (line[start:start + 50] for start in range(0, len(line), 50))
+    assert client.post("/api/episodes/batch", content=chunks, headers={"content-type": "application/x-ndjson"}).status_code == 413
+
+def test_episodes_generated_by_another_worker_are_waited_for(client, monkeypatch):
+    async def finish_elsewhere():
+        await asyncio.sleep(0.3)
+        async with async_session() as session:
+            await session.exec(update(Episode).values(title="Done elsewhere", comedy_description="Elsewhere", generation_status="failed"))
+            await session.commit()
+
+    @asynccontextmanager
+    async def held_elsewhere(name: str):
+        # The other worker finishes a little after this one has given the episode up
+        tasks.append(asyncio.create_task(finish_elsewhere()))
+        yield False
+    tasks = []
+    monkeypatch.setattr(coordinator, "claim", held_elsewhere)
+    monkeypatch.setattr(coordinator, "poll_interval", 0.05)
+
+    results = import_lines(client, [json.dumps({"description": "Two workers, one episode", "submitted_by": "ops"})])
+    finished = [result for result in results if "generation_status" in result]
+    assert [(result["title"], result["generation_status"]) for result in finished] == [("Done elsewhere", "failed")]
@@ -0,0 +1,81 @@
+import httpx
+import pytest
+from conftest import wait_for_generation
+from event_hub import event_hub
+from generation_queue import generation_queue
+from combined_generation_service import (
+    CombinedGenerationService, combined_generation_service, parse_episode_text, streamed_title,
+)
+
+@pytest.mark.parametrize("text, title", [
+    ('{"title": "The Mer', None),
+    ('{"title": "The Merge", "comedy', "The Merge"),
+    ('{\n  "title" : "The \\"Big\\" Deploy",', 'The "Big" Deploy'),
+    ('{"title": "", "comedy_description": "x"}', None),
+    ('{"title": "' + "x" * 300 + '",', None),
+])
+def test_title_is_read_from_a_partial_reply(text, title):
+    assert streamed_title(text) == title
+
+def test_replies_are_parsed_around_stray_text():
+    parsed = parse_episode_text('```json\n{"title": " \\"Code Red\\" ", "comedy_description": " In this episode... "}\n```')
+    assert (parsed.title, parsed.comedy_description) == ("Code Red", "In this episode...")
+
+@pytest.mark.parametrize("text", ["Sorry, I can't", '{"title": "Only a title"}', '{"title": 1'])
+def test_unusable_replies_are_rejected(text):
+    with pytest.raises(ValueError):
+        parse_episode_text(text)
+
+@pytest.mark.parametrize("model, response_format", [
+    ("gpt-4o-mini", "json_schema"), ("gpt-4-turbo", "json_object"), ("gpt-4", None),
+])
+def test_response_format_follows_the_model(model, response_format):
+    chosen = CombinedGenerationService(model).format_for_model()
+    assert (chosen or {}).get("type") == response_format
+
+async def combined() -> tuple:
+    generation = combined_generation_service.start("The pager went off at 3am", use_cache=False)
+    return await generation.title(), await generation.comedy_description()
+
+def test_one_streamed_call_writes_title_and_description(client, openai_stub):
+    assert client.portal.call(combined) == (openai_stub.title, openai_stub.comedy_description)
+    (body,) = openai_stub.chat_bodies()
+    assert body["stream"] is True and body["stream_options"] == {"include_usage": True}
+
+def test_a_failed_call_resolves_to_none(client, openai_stub):
+    openai_stub.chat_errors = [httpx.Response(500, json={"error": {"message": "Oops"}})]
+    assert client.portal.call(combined) == (None, None)
+
+def test_combined_mode_saves_the_title_before_the_description(client, openai_stub, monkeypatch):
+    monkeypatch.setattr(generation_queue, "combined_text", True)
+    subscriber = event_hub.subscribe()
+    try:
+        episode_id = client.post("/api/episodes", json={"description": "Prod config in the repo", "submitted_by": "ops"}).json()["id"]
+        episode = wait_for_generation(client, episode_id)
+    finally:
+        event_hub.unsubscribe(subscriber)
+    events = []
+    while not subscriber.queue.empty():
+        events.append(subscriber.queue.get_nowait().type)
+
+    assert (episode["title"], episode["comedy_description"]) == (openai_stub.title, openai_stub.comedy_description)
+    assert events.index("title_ready") < events.index("description_ready")
+    # Title and description came from the one combined completion
+    assert len(openai_stub.chat_bodies()) == 1
+
+def test_combined_mode_falls_back_to_separate_calls(client, openai_stub, monkeypatch):
+    monkeypatch.setattr(generation_queue, "combined_text", True)
+    openai_stub.chat_errors = [httpx.Response(500, json={"error": {"message": "Oops"}})]
+    episode_id = client.post("/api/episodes", json={"description": "Prod config in the repo", "submitted_by": "ops"}).json()["id"]
+
+    episode = wait_for_generation(client, episode_id)
+    assert (episode["title"], episode["comedy_description"]) == (openai_stub.title, openai_stub.comedy_description)
+    assert [body.get("stream", False) for body in openai_stub.chat_bodies()] == [True, False, False]
+
+def test_separate_mode_makes_a_call_per_stage(client, openai_stub, monkeypatch):
+    monkeypatch.setattr(generation_queue, "combined_text", False)
+    episode_id = client.post("/api/episodes", json={"description": "Prod config in the repo", "submitted_by": "ops"}).json()["id"]
+
+    episode = wait_for_generation(client, episode_id)
+    assert (episode["title"], episode["comedy_description"]) == (openai_stub.title, openai_stub.comedy_description)
+    assert len(openai_stub.chat_bodies()) == 2
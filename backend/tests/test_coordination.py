@@ -0,0 +1,89 @@
+import time
+import asyncio
+import pytest
+from conftest import wait_for_generation
+from models import PENDING_TITLE
+from coordination import Coordinator, coordinator
+from generation_queue import generation_queue
+
+@pytest.fixture
+def workers(client):
+    """Two coordinators sharing the database, standing in for two worker processes"""
+    first, second = Coordinator(enabled=True, poll_interval=0.02), Coordinator(enabled=True, poll_interval=0.02)
+    yield first, second
+    for worker in (first, second):
+        client.portal.call(worker.stop)
+
+def test_a_lease_has_one_holder_at_a_time(client, workers):
+    first, second = workers
+    call = client.portal.call
+    assert call(first.acquire, "episode:1") is True
+    assert call(second.acquire, "episode:1") is False
+    # Taking it again renews it
+    assert call(first.acquire, "episode:1") is True
+    call(first.release, "episode:1")
+    assert call(second.acquire, "episode:1") is True
+
+def test_expired_leases_can_be_taken_over(client, workers):
+    first, second = workers
+    first.lease_seconds = 0.05
+    assert client.portal.call(first.acquire, "image:abc") is True
+    time.sleep(0.1)
+    assert client.portal.call(second.acquire, "image:abc") is True
+    assert client.portal.call(first.acquire, "image:abc") is False
+
+def test_claims_and_leases(client, workers):
+    first, second = workers
+
+    async def scenario():
+        async with first.claim("episode:2") as claimed_first, second.claim("episode:2") as claimed_second:
+            assert (claimed_first, claimed_second) == (True, False)
+            assert await second.leased_keys("episode:") == {"2"}
+
+        order = []
+        async def hold():
+            async with first.lease("image:k"):
+                order.append("first")
+                await asyncio.sleep(0.1)
+        async def wait():
+            await asyncio.sleep(0.01)
+            async with second.lease("image:k"):
+                order.append("second")
+        await asyncio.gather(hold(), wait())
+        return order
+    assert client.portal.call(scenario) == ["first", "second"]
+
+def test_stopping_hands_back_every_lease(client, workers):
+    first, second = workers
+    for name in ("episode:3", "image:k"):
+        client.portal.call(first.acquire, name)
+    client.portal.call(first.stop)
+    assert client.portal.call(second.leased_keys, "") == set()
+
+def test_workers_share_one_rate_budget(client, workers):
+    first, second = workers
+
+    async def scenario():
+        # 60 a minute: a bucket of 10, refilled at one a second
+        waits = [await worker._take("openai_test_shared", 60) for worker in (first, second) * 5]
+        return waits, await first._take("openai_test_shared", 60)
+    waits, next_wait = client.portal.call(scenario)
+    assert waits == [0.0] * 10
+    assert 0.9 < next_wait <= 1.0
+
+def test_disabled_coordination_grants_everything(client):
+    local = Coordinator(enabled=False)
+    assert client.portal.call(local.acquire, "episode:4") is True
+    assert client.portal.call(Coordinator(enabled=False).acquire, "episode:4") is True
+    assert client.portal.call(local.leased_keys, "") == set()
+
+def test_episodes_leased_by_another_worker_are_not_resumed(client, workers, add_episodes, monkeypatch):
+    first, _ = workers
+    monkeypatch.setattr(coordinator, "enabled", True)
+    leased, free = add_episodes(*({"title": PENDING_TITLE, "generation_status": "pending"} for _ in range(2)))
+    client.portal.call(first.acquire, f"episode:{leased}")
+
+    client.portal.call(generation_queue.resume_unfinished)
+    assert leased not in generation_queue.queued_ids
+    assert client.get(f"/api/episodes/{leased}").json()["generation_status"] == "pending"
+    assert wait_for_generation(client, free)["generation_status"] == "image_done"
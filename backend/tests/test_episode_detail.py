@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+
+def test_episode_detail_revalidates_with_etag(client, add_episodes):
+    (episode_id,) = add_episodes({"title": "Cached"})
+
+    first = client.get(f"/api/episodes/{episode_id}")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "no-cache"
+
+    revalidated = client.get(f"/api/episodes/{episode_id}", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == etag
+    assert revalidated.content == b""
+
+    weak = client.get(f"/api/episodes/{episode_id}", headers={"If-None-Match": f'"other", W/{etag}'})
+    assert weak.status_code == 304
+
+def test_episode_detail_etag_changes_with_neighbours(client, add_episodes):
+    (episode_id,) = add_episodes({"title": "Older"})
+    etag = client.get(f"/api/episodes/{episode_id}").headers["etag"]
+
+    # A newer episode becomes this one's neighbour, so the body (and its ETag) changes
+    add_episodes({"title": "Newer"})
+    response = client.get(f"/api/episodes/{episode_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+def test_episode_detail_honours_if_modified_since(client, add_episodes):
+    (episode_id,) = add_episodes({"title": "Dated"})
+    last_modified = client.get(f"/api/episodes/{episode_id}").headers["last-modified"]
+    response = client.get(f"/api/episodes/{episode_id}", headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 304
+
+def test_neighbours_follow_list_order(client, add_episodes):
+    start = datetime(2026, 1, 1)
+    oldest, middle, newest = add_episodes(*({"title": f"Episode {n}", "timestamp": start + timedelta(hours=n)} for n in range(3)))
+
+    episode = client.get(f"/api/episodes/{middle}").json()
+    assert (episode["prev_id"], episode["next_id"]) == (newest, oldest)
+    assert client.get(f"/api/episodes/{newest}").json()["prev_id"] is None
+    assert client.get(f"/api/episodes/{oldest}").json()["next_id"] is None
+
+def test_archived_episodes_are_not_found(client, add_episodes):
+    (episode_id,) = add_episodes({"title": "Hidden", "archived_at": datetime.utcnow()})
+    assert client.get(f"/api/episodes/{episode_id}").status_code == 404
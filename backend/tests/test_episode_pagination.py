@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+
+def test_pages_cover_every_episode_newest_first(client, add_episodes):
+    start = datetime(2026, 1, 1)
+    # Pairs share a timestamp, so page boundaries have to fall back on the id
+    ids = add_episodes(*({"title": f"Episode {n}", "timestamp": start + timedelta(minutes=n // 2)} for n in range(25)))
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        params = {"limit": 10, "fields": "id,timestamp"}
+        if cursor:
+            params["cursor"] = cursor
+        page = client.get("/api/episodes", params=params).json()
+        seen.extend(item["id"] for item in page["items"])
+        pages += 1
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    assert pages == 3
+    assert seen == sorted(ids, key=lambda episode_id: ((episode_id - ids[0]) // 2, episode_id), reverse=True)
+
+def test_archived_episodes_are_not_listed(client, add_episodes):
+    visible, archived = add_episodes({"title": "Visible"}, {"title": "Archived", "archived_at": datetime.utcnow()})
+    items = client.get("/api/episodes", params={"fields": "id"}).json()["items"]
+    assert [item["id"] for item in items] == [visible]
+
+def test_fields_select_the_returned_columns(client, add_episodes):
+    add_episodes({"title": "Projected", "comedy_description": "x" * 500})
+
+    item = client.get("/api/episodes", params={"fields": "id,title"}).json()["items"][0]
+    assert item.keys() == {"id", "title"}
+
+    summary = client.get("/api/episodes", params={"fields": "summary"}).json()["items"][0]
+    assert "comedy_description" not in summary
+    assert len(summary["teaser"]) < 500
+
+def test_unknown_field_is_rejected(client):
+    response = client.get("/api/episodes", params={"fields": "id,password"})
+    assert response.status_code == 400
+
+def test_malformed_cursor_is_rejected(client, add_episodes):
+    add_episodes({"title": "Only"})
+    for cursor in ("not-a-cursor", "bm90LWEtdGltZXN0YW1wfDE"):
+        response = client.get("/api/episodes", params={"cursor": cursor})
+        assert response.status_code == 400
+
+def test_limit_is_bounded(client):
+    assert client.get("/api/episodes", params={"limit": 0}).status_code == 422
+    assert client.get("/api/episodes", params={"limit": 201}).status_code == 422
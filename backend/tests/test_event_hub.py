@@ -0,0 +1,57 @@
+import json
+from event_hub import EventHub, event_hub
+
+def drain(subscriber) -> list:
+    events = []
+    while not subscriber.queue.empty():
+        events.append(subscriber.queue.get_nowait())
+    return events
+
+def test_events_are_encoded_once_for_every_subscriber():
+    hub = EventHub()
+    first, second = hub.subscribe(), hub.subscribe()
+    event = hub.publish("title_ready", {"id": 1, "title": "Outage"})
+
+    assert drain(first) == drain(second) == [event]
+    assert json.loads(event.json) == {"id": 1, "type": "title_ready", "data": {"id": 1, "title": "Outage"}}
+    assert event.sse.startswith(b"id: 1\nevent: title_ready\ndata: ")
+
+def test_reconnecting_subscribers_get_missed_events_replayed():
+    hub = EventHub(history_size=10)
+    for n in range(5):
+        hub.publish("episode_updated", {"id": n})
+    assert [event.data["id"] for event in drain(hub.subscribe(last_event_id=3))] == [3, 4]
+    # Already up to date
+    assert drain(hub.subscribe(last_event_id=5)) == []
+
+def test_subscribers_too_far_behind_are_told_to_resync():
+    hub = EventHub(max_queue=100, history_size=3)
+    for n in range(5):
+        hub.publish("episode_updated", {"id": n})
+    # Events 2 and 3 have left the history
+    assert [event.type for event in drain(hub.subscribe(last_event_id=1))] == ["resync"]
+    # An id from before a restart
+    assert [event.type for event in drain(hub.subscribe(last_event_id=99))] == ["resync"]
+
+def test_slow_subscribers_are_dropped_without_holding_up_the_rest():
+    hub = EventHub(max_queue=2)
+    slow, fast = hub.subscribe(), hub.subscribe()
+    for n in range(2):
+        hub.publish("episode_updated", {"id": n})
+        drain(fast)
+    hub.publish("episode_updated", {"id": 2})
+
+    assert slow.lagged and slow not in hub.subscribers
+    # The reader wakes up to the end-of-stream sentinel
+    assert drain(slow) == [None]
+    assert [event.data["id"] for event in drain(fast)] == [2]
+
+def test_websocket_feed_replays_from_last_event_id(client):
+    async def publish():
+        return [event_hub.publish("episode_deleted", {"ids": [n]}).id for n in range(3)]
+    ids = client.portal.call(publish)
+
+    with client.websocket_connect(f"/api/events/ws?last_event_id={ids[0]}") as websocket:
+        received = [json.loads(websocket.receive_text()) for _ in range(2)]
+        websocket.close()
+    assert [(message["id"], message["data"]) for message in received] == [(ids[1], {"ids": [1]}), (ids[2], {"ids": [2]})]
@@ -0,0 +1,84 @@
+import json
+import time
+import pytest
+from sqlmodel import select
+from database import async_session
+from models import RelayedEvent
+from event_hub import event_hub
+from event_relay import EventRelay
+from coordination import coordinator
+
+@pytest.fixture
+def relay(client, monkeypatch):
+    relay = EventRelay(poll_interval=0.05)
+    monkeypatch.setattr(event_hub, "relay", relay.send)
+    return relay
+
+def relayed_rows(client) -> list[RelayedEvent]:
+    async def load():
+        async with async_session() as session:
+            return (await session.exec(select(RelayedEvent).order_by(RelayedEvent.id))).all()
+    return client.portal.call(load)
+
+def add_foreign_event(client, event_type: str, data: dict, origin: str = "other-host:1:abcd"):
+    async def insert():
+        async with async_session() as session:
+            session.add(RelayedEvent(origin=origin, type=event_type, data=json.dumps(data)))
+            await session.commit()
+    client.portal.call(insert)
+
+async def publish(event_type: str, data: dict):
+    # On the app's event loop, like the routes that publish
+    event_hub.publish(event_type, data)
+
+def test_local_events_are_written_for_other_processes(client, relay):
+    event_hub.publish("episode_deleted", {"ids": [7]})
+    event_hub.publish("submissions_toggled", {"is_submission_open": False}, relay=False)
+    client.portal.call(relay.flush)
+
+    rows = relayed_rows(client)
+    assert [(row.origin, row.type, json.loads(row.data)) for row in rows] == [(coordinator.owner, "episode_deleted", {"ids": [7]})]
+    assert relay.outbox == []
+
+def test_events_from_other_processes_reach_local_viewers_once(client, relay):
+    subscriber = event_hub.subscribe()
+    try:
+        add_foreign_event(client, "title_ready", {"id": 3, "title": "Relayed"})
+        add_foreign_event(client, "episode_deleted", {"ids": [9]}, origin=coordinator.owner)
+
+        assert client.portal.call(relay.receive) == 1
+        event = subscriber.queue.get_nowait()
+        assert (event.type, event.data) == ("title_ready", {"id": 3, "title": "Relayed"})
+        assert subscriber.queue.empty()
+        # Not written back for the other processes, and not read twice
+        assert relay.outbox == []
+        assert client.portal.call(relay.receive) == 0
+    finally:
+        event_hub.unsubscribe(subscriber)
+
+def test_running_relay_carries_events_both_ways(client, monkeypatch):
+    monkeypatch.setattr(coordinator, "enabled", True)
+    relay = EventRelay(poll_interval=0.05)
+    client.portal.call(relay.start)
+    subscriber = event_hub.subscribe()
+    try:
+        add_foreign_event(client, "image_ready", {"id": 5})
+        deadline = time.monotonic() + 5
+        while subscriber.queue.empty() and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert subscriber.queue.get_nowait().type == "image_ready"
+
+        client.portal.call(publish, "episode_created", {"id": 6})
+        while len(relayed_rows(client)) < 2 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert relayed_rows(client)[-1].type == "episode_created"
+    finally:
+        event_hub.unsubscribe(subscriber)
+        client.portal.call(relay.stop)
+    assert event_hub.relay is None
+
+def test_old_events_are_pruned(client, relay):
+    add_foreign_event(client, "episode_deleted", {"ids": [1]})
+    relay.retention_seconds = -1
+    client.portal.call(relay.prune)
+    assert relayed_rows(client) == []
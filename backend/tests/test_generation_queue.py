@@ -0,0 +1,40 @@
+from datetime import datetime
+from conftest import wait_for_generation
+from database import async_session
+from models import Episode, PENDING_TITLE
+from generation_queue import generation_queue
+
+def test_submission_returns_before_generation(client, openai_stub):
+    response = client.post("/api/episodes", json={"description": "The build cache poisoned itself", "submitted_by": "ci"})
+    assert response.status_code == 202
+    assert response.json()["generation_status"] == "pending"
+    assert response.json()["title"] == PENDING_TITLE
+
+    episode = wait_for_generation(client, response.json()["id"])
+    assert episode["generation_status"] == "image_done"
+    assert episode["title"] == openai_stub.title
+    assert episode["comedy_description"] == openai_stub.comedy_description
+    assert episode["image_url"].startswith("/static/images/")
+
+def test_unfinished_episodes_are_resumed(client, add_episodes):
+    (episode_id,) = add_episodes({"title": PENDING_TITLE, "generation_status": "pending"})
+    client.portal.call(generation_queue.resume_unfinished)
+    assert wait_for_generation(client, episode_id)["generation_status"] == "image_done"
+
+def test_archived_episodes_are_not_resumed(client, add_episodes):
+    (episode_id,) = add_episodes({"title": PENDING_TITLE, "generation_status": "pending", "archived_at": datetime.utcnow()})
+    client.portal.call(generation_queue.resume_unfinished)
+    assert episode_id not in generation_queue.queued_ids
+
+def test_saves_after_an_episode_is_forgotten_are_dropped(client):
+    response = client.post("/api/episodes", json={"description": "Late results everywhere", "submitted_by": "ops"})
+    episode = wait_for_generation(client, response.json()["id"])
+
+    # A late LLM result arriving after the worker has finished with the episode
+    assert client.portal.call(lambda: generation_queue.save_stage(episode["id"], title="Too late")) is None
+    assert episode["id"] not in generation_queue.save_locks
+
+    async def load():
+        async with async_session() as session:
+            return await session.get(Episode, episode["id"])
+    assert client.portal.call(load).title == episode["title"]
@@ -0,0 +1,67 @@
+import os
+from PIL import Image
+from database import async_session
+from models import ImageAsset
+from conftest import image_asset, submit
+from image_service import image_service
+from image_derivatives import image_derivative_service, render_derivatives, derivative_filename
+
+KEY = "3" * 32
+
+def write_png(path: str, width: int, height: int):
+    Image.new("RGB", (width, height), (120, 20, 200)).save(path, "PNG")
+
+def add_asset(client, key: str, filename: str):
+    async def insert():
+        async with async_session() as session:
+            session.add(ImageAsset(key=key, filename=filename, ref_count=1))
+            await session.commit()
+    client.portal.call(insert)
+
+def test_resized_webp_copies_and_a_placeholder_are_rendered(tmp_path):
+    source = tmp_path / "source.png"
+    write_png(str(source), 1024, 576)
+
+    rendered = render_derivatives(str(source), str(tmp_path), KEY)
+    assert rendered["widths"] == [256, 512, 1024]
+    for width in rendered["widths"]:
+        with Image.open(tmp_path / derivative_filename(KEY, width)) as derivative:
+            assert derivative.format == "WEBP"
+            assert derivative.size == (width, round(576 * width / 1024))
+    assert rendered["placeholder"].startswith("data:image/webp;base64,")
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+def test_images_are_never_scaled_up(tmp_path):
+    source = tmp_path / "source.png"
+    write_png(str(source), 300, 200)
+    assert render_derivatives(str(source), str(tmp_path), KEY)["widths"] == [256]
+
+def test_derivatives_are_rendered_once_and_recorded(client):
+    filename = image_service.filename_for_key(KEY)
+    write_png(image_service.get_image_path(filename), 600, 338)
+    add_asset(client, KEY, filename)
+
+    variants = client.portal.call(image_derivative_service.ensure_derivatives, KEY, filename)
+    assert [source["width"] for source in variants["sources"]] == [256, 512]
+    assert variants["srcset"] == f"/static/images/{KEY}_256.webp 256w, /static/images/{KEY}_512.webp 512w"
+    assert image_asset(client, filename).variants["widths"] == [256, 512]
+
+    rendered_at = os.path.getmtime(image_service.get_image_path(derivative_filename(KEY, 256)))
+    assert client.portal.call(image_derivative_service.ensure_derivatives, KEY, filename) == variants
+    assert os.path.getmtime(image_service.get_image_path(derivative_filename(KEY, 256))) == rendered_at
+
+    # A missing copy is rendered again
+    os.remove(image_service.get_image_path(derivative_filename(KEY, 512)))
+    assert client.portal.call(image_derivative_service.ensure_derivatives, KEY, filename) == variants
+    assert image_service.image_exists(derivative_filename(KEY, 512))
+
+def test_unreadable_images_get_no_derivatives(client):
+    filename = image_service.filename_for_key(KEY)
+    with open(image_service.get_image_path(filename), "wb") as f:
+        f.write(b"not an image")
+    add_asset(client, KEY, filename)
+    assert client.portal.call(image_derivative_service.ensure_derivatives, KEY, filename) is None
+
+def test_generated_episodes_carry_their_variants(client, openai_stub):
+    episode = submit(client, "The CDN cached the error page")
+    assert episode["image_variants"]["placeholder"].startswith("data:image/webp;base64,")
@@ -0,0 +1,62 @@
+import os
+import hashlib
+import httpx
+import pytest
+import image_service as image_module
+from conftest import image_asset
+from image_service import image_service
+
+def stored_files() -> list[str]:
+    return sorted(os.listdir(image_service.storage_dir))
+
+def generate(client, description: str = "The disk filled up with logs") -> str:
+    return client.portal.call(image_service.generate_episode_image, None, description, 1)
+
+def download(client, filepath: str):
+    return client.portal.call(image_service.download_image, "https://images.test/episode.png", filepath)
+
+def test_downloads_are_checksummed_and_recorded(client, openai_stub):
+    filename = generate(client)
+    with open(image_service.get_image_path(filename), "rb") as f:
+        content = f.read()
+
+    asset = image_asset(client, filename)
+    assert asset.checksum == hashlib.sha256(content).hexdigest()
+    assert asset.size_bytes == len(content)
+    assert stored_files() == [filename]
+
+def test_failed_downloads_leave_no_partial_file(client, openai_stub, monkeypatch):
+    filepath = image_service.get_image_path("existing.png")
+    with open(filepath, "wb") as f:
+        f.write(b"previous image")
+
+    openai_stub.image_download = httpx.Response(200, content=b"<html>", headers={"content-type": "text/html"})
+    with pytest.raises(ValueError, match="content type"):
+        download(client, filepath)
+
+    # Without a Content-Length the size limit cuts the download off part way through
+    async def chunks():
+        for _ in range(10):
+            yield b"\x00" * 16
+    monkeypatch.setattr(image_module, "MAX_IMAGE_BYTES", 40)
+    openai_stub.image_download = httpx.Response(200, content=chunks(), headers={"content-type": "image/png"})
+    with pytest.raises(ValueError, match="exceeded"):
+        download(client, filepath)
+
+    assert stored_files() == ["existing.png"]
+    with open(filepath, "rb") as f:
+        assert f.read() == b"previous image"
+
+def test_intact_images_are_reused(client, openai_stub):
+    assert generate(client) == generate(client)
+    assert openai_stub.count("/images/generations") == 1
+
+def test_corrupt_images_are_generated_again(client, openai_stub):
+    filename = generate(client)
+    with open(image_service.get_image_path(filename), "r+b") as f:
+        f.write(b"garbage!")
+
+    assert generate(client) == filename
+    assert openai_stub.count("/images/generations") == 2
+    with open(image_service.get_image_path(filename), "rb") as f:
+        assert hashlib.sha256(f.read()).hexdigest() == image_asset(client, filename).checksum
@@ -0,0 +1,56 @@
+import os
+import time
+import asyncio
+import threading
+from conftest import submit, image_asset, stored_filename, wait_for_generation
+from image_derivatives import image_derivative_service
+from image_service import image_service
+
+def test_episodes_with_the_same_prompt_share_one_image(client, openai_stub):
+    first = submit(client, "The database fell over on launch day")
+    second = submit(client, "The database fell over on launch day")
+
+    assert first["generation_status"] == second["generation_status"] == "image_done"
+    assert first["image_url"] == second["image_url"]
+    assert image_asset(client, stored_filename(first)).ref_count == 2
+    assert openai_stub.count("/images/generations") == 1
+
+def test_deleting_releases_references_and_removes_the_last_copy(client):
+    first = submit(client, "A cron job deleted production")
+    second = submit(client, "A cron job deleted production")
+    filename = stored_filename(first)
+    path = image_service.get_image_path(filename)
+
+    assert client.delete(f"/api/episodes/{first['id']}").status_code == 200
+    assert image_asset(client, filename).ref_count == 1
+    assert os.path.exists(path)
+
+    assert client.delete(f"/api/episodes/{second['id']}").status_code == 200
+    assert image_asset(client, filename) is None
+    assert not os.path.exists(path)
+
+def test_deleting_a_sharing_episode_while_another_saves_keeps_the_file(client, monkeypatch):
+    first = submit(client, "The load balancer forgot its health checks")
+    filename = stored_filename(first)
+    entered, proceed = threading.Event(), threading.Event()
+    ensure_derivatives = image_derivative_service.ensure_derivatives
+
+    async def paused(key: str, filename: str):
+        # The second episode has its image but hasn't saved a reference to it yet
+        entered.set()
+        while not proceed.is_set():
+            await asyncio.sleep(0.01)
+        return await ensure_derivatives(key, filename)
+    monkeypatch.setattr(image_derivative_service, "ensure_derivatives", paused)
+
+    second_id = client.post("/api/episodes", json={"description": "The load balancer forgot its health checks", "submitted_by": "tester"}).json()["id"]
+    assert entered.wait(10)
+    assert client.delete(f"/api/episodes/{first['id']}").status_code == 200
+    time.sleep(0.1)  # the file removal runs as a background task
+    assert os.path.exists(image_service.get_image_path(filename))
+    proceed.set()
+
+    second = wait_for_generation(client, second_id)
+    assert stored_filename(second) == filename
+    assert image_asset(client, filename).ref_count == 1
+    assert os.path.exists(image_service.get_image_path(filename))
@@ -0,0 +1,47 @@
+from image_service import image_service
+
+def write_image(key: str, content: bytes, name: str = None) -> str:
+    filename = name or image_service.filename_for_key(key)
+    with open(image_service.get_image_path(filename), "wb") as f:
+        f.write(content)
+    return filename
+
+def test_image_revalidates_with_etag(client):
+    filename = write_image("0" * 32, b"\x89PNG\r\n\x1a\n" + b"\x00" * 64)
+
+    first = client.get(f"/static/images/{filename}")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    # Content-addressed files never change, so they may be cached for good
+    assert "immutable" in first.headers["cache-control"]
+
+    revalidated = client.get(f"/static/images/{filename}", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.headers["etag"] == etag
+    assert revalidated.content == b""
+
+    assert client.get(f"/static/images/{filename}", headers={"If-None-Match": '"stale"'}).status_code == 200
+
+def test_missing_image_is_not_found(client):
+    assert client.get(f"/static/images/{'f' * 32}.png").status_code == 404
+
+def test_range_requests_return_part_of_the_image(client):
+    filename = write_image("1" * 32, bytes(range(256)))
+    response = client.get(f"/static/images/{filename}", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == bytes(range(10, 20))
+
+def test_webp_derivative_is_served_to_browsers_that_accept_it(client):
+    key = "2" * 32
+    filename = write_image(key, b"\x89PNG" + b"\x00" * 512)
+    write_image(key, b"RIFF" + b"\x00" * 64, name=f"{key}_1024.webp")
+
+    webp = client.get(f"/static/images/{filename}", headers={"Accept": "image/avif,image/webp,*/*"})
+    assert webp.headers["content-type"] == "image/webp"
+    assert webp.headers["vary"] == "Accept"
+    png = client.get(f"/static/images/{filename}", headers={"Accept": "image/png"})
+    assert png.headers["content-type"] == "image/png"
+    assert png.headers["etag"] != webp.headers["etag"]
+
+def test_paths_outside_the_image_store_are_refused(client):
+    assert client.get("/static/images/..%2Fnetflux.db").status_code == 404
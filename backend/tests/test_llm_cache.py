@@ -0,0 +1,53 @@
+import time
+import asyncio
+from llm_cache import LLMResponseCache, llm_cache
+
+def make_cache(tmp_path, **options) -> LLMResponseCache:
+    return LLMResponseCache(path=str(tmp_path / "llm_cache.db"), **options)
+
+def test_repeats_are_served_from_the_cache(tmp_path, client, openai_stub):
+    cache = make_cache(tmp_path)
+    # On the app's event loop, which the OpenAI pool's limits belong to
+    ask = lambda **options: client.portal.call(lambda: cache.cached_chat_completion("system", "Title this outage", "gpt-test", 0.7, 50, **options))
+
+    assert ask() == ask() == openai_stub.title
+    assert openai_stub.count("/chat/completions") == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+    # A bypass goes to the API but still refreshes the entry
+    openai_stub.title = "A Fresher Title"
+    assert ask(use_cache=False) == "A Fresher Title"
+    assert ask() == "A Fresher Title"
+    assert openai_stub.count("/chat/completions") == 2
+
+def test_key_covers_every_input():
+    base = ("gpt-test", "system", "user", 0.7, 50)
+    keys = {LLMResponseCache.make_key(*base)}
+    for position, value in enumerate(("gpt-other", "other system", "other user", 0.2, 60)):
+        keys.add(LLMResponseCache.make_key(*base[:position], value, *base[position + 1:]))
+    assert len(keys) == 6
+
+def test_expired_entries_are_dropped(tmp_path, monkeypatch):
+    cache = make_cache(tmp_path, ttl_seconds=60)
+    asyncio.run(cache.set("key", "old answer"))
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert asyncio.run(cache.get("key")) is None
+    assert cache.stats()["entries"] == 0
+
+def test_least_recently_used_entries_are_evicted(tmp_path, monkeypatch):
+    cache = make_cache(tmp_path, max_entries=2)
+    clock = iter(range(1000, 2000))
+    monkeypatch.setattr(time, "time", lambda: next(clock))
+    for key in ("a", "b"):
+        asyncio.run(cache.set(key, key.upper()))
+    # Reading "a" makes "b" the least recently used
+    assert asyncio.run(cache.get("a")) == "A"
+    asyncio.run(cache.set("c", "C"))
+    assert [asyncio.run(cache.get(key)) for key in ("a", "b", "c")] == ["A", None, "C"]
+
+def test_admin_endpoints_report_and_clear(client, monkeypatch):
+    monkeypatch.setattr(llm_cache, "enabled", True)
+    client.portal.call(llm_cache.set, "key", "answer")
+    assert client.get("/api/admin/llm-cache").json()["entries"] >= 1
+    assert client.delete("/api/admin/llm-cache").status_code == 200
+    assert client.get("/api/admin/llm-cache").json()["entries"] == 0
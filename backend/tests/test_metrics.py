@@ -0,0 +1,46 @@
+from conftest import wait_for_generation
+from metrics import Counter, Histogram, Registry
+
+def test_counters_are_exposed_per_label_set():
+    counter = Counter("jobs_total", "Jobs by outcome", ("outcome",))
+    counter.inc(outcome="ok")
+    counter.inc(2, outcome="ok")
+    counter.inc(outcome='say "hi"\n')
+    assert counter.collect() == [
+        "# HELP jobs_total Jobs by outcome",
+        "# TYPE jobs_total counter",
+        'jobs_total{outcome="ok"} 3',
+        'jobs_total{outcome="say \\"hi\\"\\n"} 1',
+    ]
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("stage_seconds", "Stage time", ("stage",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 3.0):
+        histogram.observe(value, stage="title")
+    assert histogram.collect()[2:] == [
+        'stage_seconds_bucket{stage="title",le="0.1"} 1',
+        'stage_seconds_bucket{stage="title",le="1"} 3',
+        'stage_seconds_bucket{stage="title",le="+Inf"} 4',
+        'stage_seconds_sum{stage="title"} 4.05',
+        'stage_seconds_count{stage="title"} 4',
+    ]
+
+def test_histogram_times_a_block():
+    histogram = Histogram("block_seconds", "Block time", buckets=(10.0,))
+    with histogram.time():
+        pass
+    assert histogram.collect()[2] == 'block_seconds_bucket{le="10"} 1'
+
+def test_registry_joins_every_metric():
+    registry = Registry()
+    registry.register(Counter("a_total", "A")).inc()
+    registry.register(Counter("b_total", "B"))
+    assert registry.exposition() == "# HELP a_total A\n# TYPE a_total counter\na_total 1\n# HELP b_total B\n# TYPE b_total counter\n"
+
+def test_metrics_endpoint_reports_generation(client):
+    episode_id = client.post("/api/episodes", json={"description": "Metrics went dark", "submitted_by": "ops"}).json()["id"]
+    wait_for_generation(client, episode_id)
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'netflux_openai_requests_total{endpoint="chat",outcome="ok"}' in response.text
+    assert 'netflux_stage_duration_seconds_bucket{stage="db_commit",le="+Inf"}' in response.text
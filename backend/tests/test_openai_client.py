@@ -0,0 +1,77 @@
+import time
+import asyncio
+import httpx
+import pytest
+import openai
+from openai_client import TokenBucket, parse_reset_duration, openai_pool, is_retryable
+from metrics import RETRIES
+
+def rate_limited(retry_after: str = None, code: str = "rate_limit_exceeded") -> httpx.Response:
+    headers = {"retry-after": retry_after} if retry_after else {}
+    return httpx.Response(429, headers=headers, json={"error": {"message": "Slow down", "type": "requests", "code": code}})
+
+def chat(client) -> str:
+    async def complete():
+        response = await openai_pool.chat_completion(model="gpt-test", messages=[{"role": "user", "content": "Title this"}], max_tokens=10)
+        return response.choices[0].message.content
+    return client.portal.call(complete)
+
+@pytest.fixture
+def retrying(monkeypatch):
+    monkeypatch.setattr(openai_pool, "max_retries", 3)
+    monkeypatch.setattr(openai_pool, "base_delay", 0.01)
+
+@pytest.mark.parametrize("value, seconds", [("1s", 1), ("6m0s", 360), ("20ms", 0.02), ("1h2m", 3720), ("", None), ("soon", None)])
+def test_reset_durations_are_parsed(value, seconds):
+    assert parse_reset_duration(value) == (pytest.approx(seconds) if seconds is not None else None)
+
+def test_bucket_hands_out_its_capacity_then_waits():
+    bucket = TokenBucket(requests_per_minute=600)
+    assert bucket.capacity == 100
+
+    async def take(count: int) -> float:
+        started = time.monotonic()
+        for _ in range(count):
+            await bucket.acquire()
+        return time.monotonic() - started
+    assert asyncio.run(take(100)) < 0.05
+    # Refilled at 10 per second
+    assert asyncio.run(take(1)) >= 0.08
+
+def test_bucket_follows_the_rate_limit_headers():
+    bucket = TokenBucket(requests_per_minute=600)
+    bucket.update_from_headers(httpx.Headers({
+        "x-ratelimit-limit-requests": "60", "x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "250ms",
+    }))
+    assert bucket.rate == 1
+    assert bucket.tokens == 0
+    assert bucket.blocked_until - time.monotonic() == pytest.approx(0.25, abs=0.05)
+
+def test_transient_errors_are_retried(client, openai_stub, retrying):
+    retries = RETRIES.values.get(("openai_chat",), 0)
+    openai_stub.chat_errors = [httpx.Response(503, json={"error": {"message": "Overloaded"}}), rate_limited(retry_after="0")]
+    assert chat(client) == openai_stub.title
+    assert openai_stub.count("/chat/completions") == 3
+    assert RETRIES.values.get(("openai_chat",), 0) == retries + 2
+
+def test_retry_after_is_honoured(client, openai_stub, retrying):
+    openai_stub.chat_errors = [rate_limited(retry_after="0.3")]
+    started = time.monotonic()
+    assert chat(client) == openai_stub.title
+    assert time.monotonic() - started >= 0.3
+
+def test_exhausted_quota_and_bad_requests_are_not_retried(client, openai_stub, retrying):
+    openai_stub.chat_errors = [rate_limited(code="insufficient_quota")]
+    with pytest.raises(openai.RateLimitError):
+        chat(client)
+    openai_stub.chat_errors = [httpx.Response(400, json={"error": {"message": "Bad request"}})]
+    with pytest.raises(openai.BadRequestError):
+        chat(client)
+    assert openai_stub.count("/chat/completions") == 2
+
+def test_retries_stop_after_max_retries(client, openai_stub, retrying):
+    openai_stub.chat_errors = [httpx.Response(500, json={"error": {"message": "Oops"}})] * 4
+    with pytest.raises(openai.InternalServerError) as error:
+        chat(client)
+    assert is_retryable(error.value)
+    assert openai_stub.count("/chat/completions") == 4
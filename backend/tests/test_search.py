@@ -0,0 +1,84 @@
+from datetime import datetime
+import episode_search
+from database import engine
+
+def search(client, query: str, **params) -> dict:
+    response = client.get("/api/episodes/search", params={"q": query, **params})
+    assert response.status_code == 200
+    return response.json()
+
+def test_title_matches_rank_above_description_matches(client, add_episodes):
+    in_comedy, in_description, in_title = add_episodes(
+        {"title": "Friday deploy", "description": "Nothing to see", "comedy_description": "The kernel panicked"},
+        {"title": "Friday deploy", "description": "The kernel panicked", "comedy_description": "Nothing to see"},
+        {"title": "The kernel panicked", "description": "Nothing to see", "comedy_description": "Friday deploy"},
+    )
+    unrelated = add_episodes({"title": "Quiet night", "description": "All green"})
+
+    ids = [item["id"] for item in search(client, "kernel")["items"]]
+    assert ids == [in_title, in_description, in_comedy]
+    assert unrelated[0] not in ids
+
+def test_every_word_must_match_and_the_last_is_a_prefix(client, add_episodes):
+    both, only_one = add_episodes(
+        {"title": "Certificate rotation outage"},
+        {"title": "Certificate renewal"},
+    )
+    assert [item["id"] for item in search(client, "certificate rot")["items"]] == [both]
+    assert {item["id"] for item in search(client, "certif")["items"]} == {both, only_one}
+
+def test_hits_are_highlighted_and_escaped(client, add_episodes):
+    add_episodes({"title": "<b>Kernel</b> panic", "description": "Nothing else"})
+    item = search(client, "kernel")["items"][0]
+    assert item["title_highlight"] == "&lt;b&gt;<mark>Kernel</mark>&lt;/b&gt; panic"
+    # From whichever column matched best
+    assert "<mark>Kernel</mark>" in item["snippet"] and "<b>" not in item["snippet"]
+
+def test_operators_are_taken_literally(client, add_episodes):
+    add_episodes({"title": "Kernel panic"})
+    assert search(client, 'kernel OR "NEAR(')["items"] == []
+    assert search(client, "***")["items"] == []
+
+def test_archived_and_deleted_episodes_are_not_found(client, add_episodes):
+    kept, archived, deleted = add_episodes(
+        {"title": "Runaway cron"},
+        {"title": "Runaway cron", "archived_at": datetime.utcnow()},
+        {"title": "Runaway cron"},
+    )
+    client.delete(f"/api/episodes/{deleted}")
+    assert [item["id"] for item in search(client, "cron")["items"]] == [kept]
+
+def test_ranking_cap_skips_archived_matches(client, add_episodes, monkeypatch):
+    monkeypatch.setattr(episode_search, "MAX_RANKED_MATCHES", 3)
+    ids = add_episodes(*({"title": f"Disk full {n}", "archived_at": datetime.utcnow() if n >= 3 else None} for n in range(6)))
+
+    first = search(client, "disk", limit=2)
+    second = search(client, "disk", limit=2, cursor=first["next_cursor"])
+    assert {item["id"] for item in first["items"] + second["items"]} == set(ids[:3])
+    assert second["next_cursor"] is None
+
+def test_pages_do_not_overlap(client, add_episodes):
+    add_episodes(*({"title": f"Flaky test {n}"} for n in range(5)))
+    first = search(client, "flaky", limit=3)
+    second = search(client, "flaky", limit=3, cursor=first["next_cursor"])
+    assert len(first["items"]) == 3 and len(second["items"]) == 2
+    assert not {item["id"] for item in first["items"]} & {item["id"] for item in second["items"]}
+
+def test_malformed_cursor_is_rejected(client):
+    assert client.get("/api/episodes/search", params={"q": "x", "cursor": "nope"}).status_code == 400
+
+def test_other_databases_fall_back_to_substring_search(client, add_episodes, monkeypatch):
+    older, newer, _ = add_episodes(
+        {"title": "Load balancer drained", "timestamp": datetime(2026, 1, 1)},
+        {"title": "Drained the load balancer", "timestamp": datetime(2026, 1, 2)},
+        {"title": "Unrelated"},
+    )
+    # The branch is chosen by dialect name; SQLite runs the fallback's plain SQL just as well
+    monkeypatch.setattr(engine.dialect, "name", "postgresql")
+
+    items = search(client, "load DRAIN")["items"]
+    # Unranked, newest first, without highlighting
+    assert [item["id"] for item in items] == [newer, older]
+    assert items[0]["title_highlight"] == "Drained the load balancer"
+    # "_" is a LIKE wildcard, but here it only matches itself
+    assert search(client, "dr_ined")["items"] == []
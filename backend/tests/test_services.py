@@ -0,0 +1,53 @@
+import os
+import sys
+import asyncio
+import subprocess
+import pytest
+from services import ServiceProvider
+from openai_client import openai_pool
+
+def write_module(directory, name: str) -> str:
+    (directory / f"{name}.py").write_text("class Service:\n    pass\n\nservice = Service()\n")
+    return f"{name}:service"
+
+def test_services_are_imported_on_first_use(tmp_path, monkeypatch):
+    monkeypatch.syspath_prepend(str(tmp_path))
+    provider = ServiceProvider({"lazy": write_module(tmp_path, "lazy_service_module")})
+    assert not provider.loaded("lazy")
+    assert "lazy_service_module" not in sys.modules
+
+    service = provider.get("lazy")
+    assert provider.get("lazy") is service is sys.modules["lazy_service_module"].service
+    assert provider.loaded("lazy")
+    assert provider.load_seconds["lazy"] >= 0
+
+def test_warm_loads_services_off_the_event_loop(tmp_path, monkeypatch):
+    monkeypatch.syspath_prepend(str(tmp_path))
+    provider = ServiceProvider({"a": write_module(tmp_path, "warm_module_a"), "b": write_module(tmp_path, "warm_module_b")})
+    asyncio.run(provider.warm("a"))
+    assert provider.instances.keys() == {"a"}
+    asyncio.run(provider.warm())
+    assert provider.instances.keys() == {"a", "b"}
+
+def test_importing_the_app_leaves_generation_unloaded(workdir):
+    # A fresh interpreter: this one has loaded everything already
+    code = "import sys, main; print(','.join(m for m in ('generation_queue', 'batch_import', 'llm_cache', 'image_derivatives', 'openai', 'PIL') if m in sys.modules))"
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=backend, capture_output=True, text=True, timeout=60,
+        env={**os.environ, "DATABASE_URL": f"sqlite:///{workdir}/import-check.db"},
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ""
+
+@pytest.fixture
+def without_api_key(monkeypatch):
+    monkeypatch.setattr(openai_pool, "api_key", None)
+
+def test_without_an_api_key_reads_are_served_and_writes_refused(client, add_episodes, without_api_key):
+    (episode_id,) = add_episodes({"title": "Still here"})
+    assert client.get("/health").json() == {"status": "degraded"}
+    assert client.get("/api/status").json()["is_submission_open"] is False
+    assert client.get(f"/api/episodes/{episode_id}").json()["title"] == "Still here"
+    assert client.post("/api/episodes", json={"description": "x", "submitted_by": "y"}).status_code == 503
+    assert client.post("/api/episodes/batch", content="[]", headers={"content-type": "application/json"}).status_code == 503
@@ -0,0 +1,65 @@
+import time
+import pytest
+from sqlalchemy import update
+from database import async_session
+from models import AdminSettings
+from event_hub import event_hub
+from settings_cache import settings_cache, SettingsCache
+
+@pytest.fixture
+def settings(client):
+    yield settings_cache
+    client.portal.call(settings_cache.update, True)
+
+def change_in_another_worker(client, is_submission_open: bool):
+    async def write():
+        async with async_session() as session:
+            await session.exec(update(AdminSettings).where(AdminSettings.id == 1).values(
+                is_submission_open=is_submission_open, version=AdminSettings.version + 1,
+            ))
+            await session.commit()
+    client.portal.call(write)
+
+def test_updates_write_through_and_bump_the_version(client, settings):
+    version = client.get("/api/admin/settings").json()["version"]
+    subscriber = event_hub.subscribe()
+    try:
+        response = client.put("/api/admin/settings", json={"is_submission_open": False})
+        assert response.json()["is_submission_open"] is False
+        assert response.json()["version"] == version + 1
+        assert client.get("/api/admin/settings").json() == response.json()
+        assert subscriber.queue.get_nowait().type == "submissions_toggled"
+    finally:
+        event_hub.unsubscribe(subscriber)
+
+    assert client.post("/api/episodes", json={"description": "Closed", "submitted_by": "ops"}).status_code == 403
+    assert client.get("/api/status").json()["is_submission_open"] is False
+
+def test_reads_are_served_from_memory(client, settings, monkeypatch):
+    async def not_polled_yet(relay: bool = True):
+        pass
+    monkeypatch.setattr(settings_cache, "load", not_polled_yet)
+    change_in_another_worker(client, False)
+    # Until the next poll the cached copy answers
+    assert client.get("/api/admin/settings").json()["is_submission_open"] is True
+
+def test_changes_from_other_workers_are_picked_up_by_polling(client, settings, monkeypatch):
+    cache = SettingsCache(refresh_interval=0.05)
+    client.portal.call(cache.start)
+    relayed = []
+    monkeypatch.setattr(event_hub, "relay", relayed.append)
+    subscriber = event_hub.subscribe()
+    try:
+        change_in_another_worker(client, False)
+        deadline = time.monotonic() + 5
+        while cache.is_submission_open and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert cache.is_submission_open is False
+        assert cache.version == settings.version + 1
+        # Viewers here are told; the worker that made the change relays it to everyone else
+        assert subscriber.queue.get_nowait().data == {"is_submission_open": False}
+        assert relayed == []
+    finally:
+        event_hub.unsubscribe(subscriber)
+        client.portal.call(cache.stop)
+        client.portal.call(settings_cache.load)
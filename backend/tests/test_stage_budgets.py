@@ -0,0 +1,77 @@
+import time
+import pytest
+import title_service as title_module
+from conftest import wait_for_generation
+from models import PENDING_TITLE
+from llm_cache import LLMResponseCache
+from title_service import title_service
+from generation_queue import generation_queue
+from metrics import LATE_RESULTS, HEDGED_REQUESTS
+
+DESCRIPTION = "The staging database was actually production"
+
+@pytest.fixture
+def slow_title(client, openai_stub, monkeypatch):
+    """Separate title and description calls, with the title model on its own (slow) name and a 0.2s title budget"""
+    monkeypatch.setattr(generation_queue, "combined_text", False)
+    monkeypatch.setitem(generation_queue.stage_budgets, "title", 0.2)
+    monkeypatch.setattr(title_module, "TITLE_MODEL", "gpt-title")
+    return openai_stub.delays
+
+def first_title(client, episode_id: int, timeout: float = 5.0) -> str:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        title = client.get(f"/api/episodes/{episode_id}").json()["title"]
+        if title != PENDING_TITLE:
+            return title
+        time.sleep(0.02)
+    raise AssertionError("No title was saved")
+
+def test_missed_budget_saves_the_local_title_and_the_llm_title_replaces_it(client, slow_title, openai_stub):
+    slow_title.update({"gpt-title": 1.0, "gpt-4": 2.5})
+    late_before = LATE_RESULTS.values.get(("title",), 0)
+    episode_id = client.post("/api/episodes", json={"description": DESCRIPTION, "submitted_by": "ops"}).json()["id"]
+
+    assert first_title(client, episode_id) == title_service.fallback_title(DESCRIPTION)
+    episode = wait_for_generation(client, episode_id)
+    assert episode["title"] == openai_stub.title
+    assert LATE_RESULTS.values.get(("title",), 0) == late_before + 1
+
+def test_a_result_later_than_the_whole_generation_is_dropped(client, slow_title):
+    slow_title.update({"gpt-title": 1.5})
+    episode_id = client.post("/api/episodes", json={"description": DESCRIPTION, "submitted_by": "ops"}).json()["id"]
+
+    episode = wait_for_generation(client, episode_id)
+    assert episode["title"] == title_service.fallback_title(DESCRIPTION)
+    time.sleep(1.6)
+    assert client.get(f"/api/episodes/{episode_id}").json()["title"] == episode["title"]
+
+def test_answers_within_budget_are_used_directly(client, slow_title, openai_stub):
+    episode_id = client.post("/api/episodes", json={"description": DESCRIPTION, "submitted_by": "ops"}).json()["id"]
+    assert first_title(client, episode_id) == openai_stub.title
+
+def hedging_cache(tmp_path) -> LLMResponseCache:
+    return LLMResponseCache(path=str(tmp_path / "llm_cache.db"), hedge_model="gpt-hedge", hedge_after=0.1)
+
+def ask(client, cache: LLMResponseCache, model: str = "gpt-slow", use_cache: bool = True) -> str:
+    return client.portal.call(lambda: cache.cached_chat_completion("system", "Title this outage", model, 0.8, 50, use_cache=use_cache))
+
+def test_slow_completions_are_hedged_and_the_hedge_reply_is_cached_under_its_own_model(client, openai_stub, tmp_path):
+    openai_stub.delays["gpt-slow"] = 1.0
+    cache = hedging_cache(tmp_path)
+    hedge_wins = HEDGED_REQUESTS.values.get(("hedge",), 0)
+
+    assert ask(client, cache) == openai_stub.title
+    assert [body["model"] for body in openai_stub.chat_bodies()] == ["gpt-slow", "gpt-hedge"]
+    assert HEDGED_REQUESTS.values.get(("hedge",), 0) == hedge_wins + 1
+
+    primary_key = cache.make_key("gpt-slow", "system", "Title this outage", 0.8, 50)
+    hedge_key = cache.make_key("gpt-hedge", "system", "Title this outage", 0.8, 50)
+    assert client.portal.call(cache.get, primary_key) is None
+    assert client.portal.call(cache.get, hedge_key) == openai_stub.title
+
+def test_fast_completions_are_not_hedged(client, openai_stub, tmp_path):
+    cache = hedging_cache(tmp_path)
+    ask(client, cache)
+    assert [body["model"] for body in openai_stub.chat_bodies()] == ["gpt-slow"]
+    assert client.portal.call(cache.get, cache.make_key("gpt-slow", "system", "Title this outage", 0.8, 50)) == openai_stub.title
@@ -0,0 +1,77 @@
+import asyncio
+import pytest
+from stage_executor import Stage, StageGraphExecutor, format_timings
+
+def run(stages: list[Stage], results: dict = None) -> tuple[dict, dict]:
+    results = {} if results is None else results
+    timings = asyncio.run(StageGraphExecutor(stages).run(results))
+    return results, timings
+
+def test_independent_stages_run_side_by_side():
+    order = []
+
+    async def stage(name: str, delay: float):
+        order.append(f"{name} started")
+        await asyncio.sleep(delay)
+        order.append(f"{name} finished")
+        return name.upper()
+
+    results, timings = run([
+        Stage("title", lambda results: stage("title", 0.05)),
+        Stage("description", lambda results: stage("description", 0.1), depends_on=["title"]),
+        Stage("image", lambda results: stage("image", 0.1), depends_on=["title"]),
+    ])
+    assert results == {"title": "TITLE", "description": "DESCRIPTION", "image": "IMAGE"}
+    assert order[:2] == ["title started", "title finished"]
+    assert set(order[2:4]) == {"description started", "image started"}
+    # Description and image overlap, so the graph takes about title + the longer of the two
+    assert timings["total"] < 0.05 + 0.1 + 0.1
+    assert set(timings) == {"title", "description", "image", "total"}
+
+def test_stages_see_their_dependencies_results():
+    async def description(results: dict) -> str:
+        return f"About {results['title']}"
+
+    async def title(results: dict) -> str:
+        return "Outage"
+
+    results, _ = run([Stage("description", description, depends_on=["title"]), Stage("title", title)])
+    assert results["description"] == "About Outage"
+
+def test_stages_already_in_results_are_skipped():
+    calls = []
+
+    async def stage(results: dict) -> str:
+        calls.append("ran")
+        return "new"
+
+    results, timings = run([Stage("title", stage), Stage("image", stage, depends_on=["title"])], {"title": "saved"})
+    assert results == {"title": "saved", "image": "new"}
+    assert calls == ["ran"]
+    assert "title" not in timings
+
+def test_a_failing_stage_cancels_the_rest():
+    cancelled = []
+
+    async def fails(results: dict):
+        raise RuntimeError("boom")
+
+    async def slow(results: dict):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append("slow")
+            raise
+
+    with pytest.raises(RuntimeError, match="boom"):
+        run([Stage("slow", slow), Stage("fails", fails)])
+    assert cancelled == ["slow"]
+
+def test_unknown_dependencies_are_rejected():
+    async def stage(results: dict):
+        return None
+    with pytest.raises(ValueError, match="unknown stage 'title'"):
+        StageGraphExecutor([Stage("image", stage, depends_on=["title"])])
+
+def test_format_timings():
+    assert format_timings({"title": 1.234, "total": 2.0}) == "title=1.23s total=2.00s"
@@ -0,0 +1,91 @@
+import json
+import pytest
+from conftest import wait_for_generation
+from sqlalchemy import create_engine, text
+import tracing
+from tracing import Tracer, NOOP_SPAN, CLIENT, tracer, instrument_engine
+
+def read_spans(path) -> list[dict]:
+    with open(path) as f:
+        return [
+            span
+            for line in f
+            for resource in json.loads(line)["resourceSpans"]
+            for scope in resource["scopeSpans"]
+            for span in scope["spans"]
+        ]
+
+def test_traces_are_written_as_otlp_json(tmp_path):
+    local = Tracer(enabled=True, path=str(tmp_path / "traces.jsonl"))
+    with local.start_trace("generate_episode", episode_id=7) as root:
+        with local.span("openai.chat", CLIENT, model="gpt-test", cached=False):
+            pass
+        with pytest.raises(ValueError):
+            with local.span("image.download"):
+                raise ValueError("truncated")
+    local.shutdown()
+
+    spans = {span["name"]: span for span in read_spans(tmp_path / "traces.jsonl")}
+    assert spans.keys() == {"generate_episode", "openai.chat", "image.download"}
+    assert {span["traceId"] for span in spans.values()} == {root.trace_id}
+    assert "parentSpanId" not in spans["generate_episode"]
+    assert spans["openai.chat"]["parentSpanId"] == root.span_id
+    assert spans["openai.chat"]["kind"] == CLIENT
+    assert {"key": "cached", "value": {"boolValue": False}} in spans["openai.chat"]["attributes"]
+    assert spans["image.download"]["status"] == {"code": 2, "message": "ValueError: truncated"}
+
+def test_unsampled_and_disabled_traces_record_nothing(tmp_path):
+    for local in (Tracer(enabled=False), Tracer(enabled=True, sample_rate=0.0)):
+        with local.start_trace("request") as root, local.span("child") as child:
+            assert root is NOOP_SPAN and child is NOOP_SPAN
+        assert local._writer is None
+
+def test_spans_stop_being_recorded_past_the_limit(tmp_path):
+    local = Tracer(enabled=True, path=str(tmp_path / "traces.jsonl"), max_spans=3)
+    with local.start_trace("events stream"):
+        for _ in range(10):
+            with local.span("db.query"):
+                pass
+    local.shutdown()
+    # The root is recorded on top of the limit
+    assert len(read_spans(tmp_path / "traces.jsonl")) == 4
+
+def test_sql_statements_get_spans(tmp_path, monkeypatch):
+    local = Tracer(enabled=True, path=str(tmp_path / "traces.jsonl"))
+    # The listeners record through the global tracer
+    monkeypatch.setattr(tracing, "tracer", local)
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    with local.start_trace("request"), engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        with pytest.raises(Exception):
+            connection.execute(text("SELECT * FROM missing"))
+    local.shutdown()
+
+    queries = [span for span in read_spans(tmp_path / "traces.jsonl") if span["name"] == "db.query"]
+    statements = [{item["key"]: item["value"] for item in query["attributes"]}["db.statement"]["stringValue"] for query in queries]
+    assert statements == ["SELECT 1", "SELECT * FROM missing"]
+    assert queries[0]["status"] == {} and queries[1]["status"]["code"] == 2
+
+def test_request_ids_are_echoed_or_assigned(client):
+    assert client.get("/health", headers={"X-Request-ID": "deploy-42"}).headers["x-request-id"] == "deploy-42"
+    assigned = client.get("/health", headers={"X-Request-ID": "bad id\r\n"}).headers["x-request-id"]
+    assert len(assigned) == 32 and assigned != "bad id"
+
+def test_generation_continues_the_submitting_requests_trace(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(tracer, "enabled", True)
+    monkeypatch.setattr(tracer, "path", str(tmp_path / "traces.jsonl"))
+    try:
+        episode_id = client.post("/api/episodes", json={"description": "Traces went missing", "submitted_by": "ops"}).json()["id"]
+        wait_for_generation(client, episode_id)
+    finally:
+        tracer.enabled = False
+        tracer.shutdown()
+
+    spans = read_spans(tmp_path / "traces.jsonl")
+    request = next(span for span in spans if span["name"] == "POST /api/episodes")
+    generation = next(span for span in spans if span["name"] == "generate_episode")
+    assert generation["traceId"] == request["traceId"]
+    assert generation["parentSpanId"] == request["spanId"]
+    names = {span["name"] for span in spans if span["traceId"] == request["traceId"]}
+    assert {"stage.title", "stage.image", "openai.chat", "db.commit"} <= names
@@ -1,23 +1,17 @@
 import os
-from openai import AsyncOpenAI
-from typing import Optional
-from dotenv import load_dotenv
+import json
+import logging
+from llm_cache import llm_cache
+from local_generators import local_generator
 
-# Load environment variables
-load_dotenv()
+logger = logging.getLogger(__name__)
+
+TITLE_MODEL = os.getenv("TITLE_MODEL", "gpt-4")
 
 class TitleGenerationService:
-    def __init__(self):
-        # Initialize OpenAI client with API key from environment
-        api_key = os.getenv('OPENAI_API_KEY')
-        if not api_key:
-            raise ValueError("OPENAI_API_KEY environment variable is required")
-        
-        self.client = AsyncOpenAI(api_key=api_key)
-    
-    async def generate_episode_title(self, description: str) -> str:
+    async def generate_episode_title(self, description: str, fallback: bool = True, use_cache: bool = True) -> str:
         """Generate a Netflix-style clickbait episode title using ChatGPT"""
-        print(f"🎬 Generating title for: {description[:100]}...")
+        logger.debug("🎬 Generating title for: %.100s...", description)
         
         try:
             # Create a prompt for generating clickbait episode titles
@@ -42,55 +36,65 @@ Examples of good titles:
 
 Return ONLY the title, no quotes or additional text."""
 
-            # Call ChatGPT API
-            response = await self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a Netflix content creator who specializes in dramatic, clickbait episode titles for engineering stories."},
-                    {"role": "user", "content": prompt}
-                ],
+            # Call ChatGPT API (repeat descriptions are served from the response cache)
+            title = await llm_cache.cached_chat_completion(
+                system_prompt="You are a Netflix content creator who specializes in dramatic, clickbait episode titles for engineering stories.",
+                user_prompt=prompt,
+                model=TITLE_MODEL,
                 max_tokens=50,
                 temperature=0.8,  # Some creativity but not too random
+                use_cache=use_cache,
             )
             
-            # Extract the title
-            title = response.choices[0].message.content.strip()
-            
             # Clean up the title (remove quotes if present)
             title = title.strip('"').strip("'")
             
-            print(f"✅ Generated title: {title}")
+            logger.info("✅ Generated title: %s", title)
             return title
             
         except Exception as e:
-            print(f"❌ Error generating title: {str(e)}")
-            
-            # Fallback titles based on common patterns
-            fallback_titles = [
-                "The Incident That Changed Everything",
-                "Crisis in the Code",
-                "The Bug That Wouldn't Die",
-                "Midnight Emergency",
-                "The Deploy That Went Wrong",
-                "Code Red Situation",
-                "The System Meltdown",
-                "Production Nightmare"
-            ]
-            
-            # Simple fallback based on description keywords
-            description_lower = description.lower()
-            if "deploy" in description_lower or "release" in description_lower:
-                return "The Deploy That Went Wrong"
-            elif "bug" in description_lower or "error" in description_lower:
-                return "The Bug That Wouldn't Die"
-            elif "crash" in description_lower or "down" in description_lower:
-                return "The System Meltdown"
-            elif "database" in description_lower or "db" in description_lower:
-                return "Database Disaster"
-            elif "security" in description_lower or "hack" in description_lower:
-                return "Security Breach"
-            else:
-                return "The Incident That Changed Everything"
+            logger.error("❌ Error generating title: %s", e)
+            if not fallback:
+                raise
+            return self.fallback_title(description)
+
+    async def generate_episode_titles(self, descriptions: list[str], use_cache: bool = True) -> list[str]:
+        """Generate titles for several descriptions with a single chat completion.
+
+        Raises ValueError if the reply isn't a JSON array with one title per description.
+        """
+        logger.info("🎬 Generating %d titles in one request", len(descriptions))
+        issues = "\n".join(f'{n}. "{description}"' for n, description in enumerate(descriptions, 1))
+        prompt = f"""You are a Netflix content creator specializing in dramatic, clickbait episode titles for a tech show called "CaseMark Blitz Chronicles."
+
+For each numbered engineering story/issue below, write one dramatic, clickbait-style, Netflix-style episode title of 3-8 words that relates to the issue and is intriguing without spoiling the story.
+
+{issues}
+
+Examples of good titles: "The Merge That Broke Everything", "Code Red: The Friday Deploy", "The Intern's Fatal Click".
+
+Return ONLY a JSON array of {len(descriptions)} strings, one title per issue, in the same order."""
+
+        reply = await llm_cache.cached_chat_completion(
+            system_prompt="You are a Netflix content creator who specializes in dramatic, clickbait episode titles for engineering stories.",
+            user_prompt=prompt,
+            model=TITLE_MODEL,
+            max_tokens=30 * len(descriptions) + 20,
+            temperature=0.8,
+            use_cache=use_cache,
+        )
+
+        try:
+            titles = json.loads(reply[reply.index("["):reply.rindex("]") + 1])
+        except ValueError:
+            raise ValueError("Batched title reply is not a JSON array")
+        if len(titles) != len(descriptions) or not all(isinstance(title, str) and title.strip() for title in titles):
+            raise ValueError(f"Expected {len(descriptions)} titles, got {len(titles)}")
+        return [title.strip().strip('"').strip("'") for title in titles]
+
+    def fallback_title(self, description: str) -> str:
+        """Pick a title from the local keyword/template engine"""
+        return local_generator.title(description)
 
 # Global instance
 title_service = TitleGenerationService()
\ No newline at end of file
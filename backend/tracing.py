@@ -0,0 +1,272 @@
+import os
+import re
+import json
+import time
+import queue
+import random
+import atexit
+import logging
+import secrets
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# OTLP span kinds
+INTERNAL, SERVER, CLIENT = 1, 2, 3
+
+# Incoming X-Request-ID values are echoed back, so only accept short, header-safe ones
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._:-]{1,64}$")
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+class Span:
+    __slots__ = ("name", "kind", "trace_id", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error", "spans")
+
+    def __init__(self, name: str, kind: int, trace_id: str, parent_id: Optional[str], spans: list, attributes: dict):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes
+        self.error: Optional[str] = None
+        # Shared by every span of the same local trace; exported together when the root ends
+        self.spans = spans
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def finish(self, error: Optional[BaseException] = None):
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        self.spans.append(self)
+
+class NoopSpan:
+    """Stands in for a span when tracing is off or the request wasn't sampled"""
+
+    def set(self, **attributes):
+        pass
+
+NOOP_SPAN = NoopSpan()
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+def encode_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def encode_span(span: Span) -> dict:
+    """One span in OTLP/JSON form"""
+    encoded = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": span.kind,
+        "startTimeUnixNano": str(span.start_ns),
+        "endTimeUnixNano": str(span.end_ns),
+        "attributes": [{"key": key, "value": encode_value(value)} for key, value in span.attributes.items() if value is not None],
+        "status": {"code": 2, "message": span.error} if span.error else {},
+    }
+    if span.parent_id:
+        encoded["parentSpanId"] = span.parent_id
+    return encoded
+
+class Tracer:
+    """Opt-in span recorder that writes finished traces to an OTLP/JSON lines file.
+
+    Each line is an ExportTraceServiceRequest, the format of the OpenTelemetry collector's
+    file exporter, so the file can be replayed into any OTLP backend or read with jq.
+    """
+
+    def __init__(self, enabled: bool = False, path: str = "traces.jsonl", sample_rate: float = 1.0,
+                 max_spans: int = 1000, service_name: str = "netflux-backend"):
+        self.enabled = enabled
+        self.path = path
+        self.sample_rate = sample_rate
+        # Long-lived requests (event streams) stop recording spans past this many
+        self.max_spans = max_spans
+        self.service_name = service_name
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._writer: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def current_context(self) -> Optional[tuple[str, str]]:
+        """(trace id, span id) of the active span, for continuing the trace in another task"""
+        span = _current_span.get()
+        return (span.trace_id, span.span_id) if span else None
+
+    @contextmanager
+    def start_trace(self, name: str, parent: Optional[tuple[str, str]] = None, kind: int = INTERNAL, **attributes):
+        """Record a local root span whose children are exported together when it ends.
+
+        Continues `parent` (or the active span) when given, otherwise starts a sampled new trace.
+        """
+        parent = parent or self.current_context()
+        if not self.enabled or (parent is None and random.random() >= self.sample_rate):
+            yield NOOP_SPAN
+            return
+
+        trace_id, parent_id = parent or (secrets.token_hex(16), None)
+        spans: list[Span] = []
+        root = Span(name, kind, trace_id, parent_id, spans, attributes)
+        token = _current_span.set(root)
+        error = None
+        try:
+            yield root
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            _current_span.reset(token)
+            root.finish(error)
+            self.export(spans)
+
+    @contextmanager
+    def span(self, name: str, kind: int = INTERNAL, **attributes):
+        """Record a child of the active span; does nothing outside a trace"""
+        span = self.start_span(name, kind, **attributes)
+        if span is None:
+            yield NOOP_SPAN
+            return
+
+        token = _current_span.set(span)
+        error = None
+        try:
+            yield span
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            _current_span.reset(token)
+            span.finish(error)
+
+    def start_span(self, name: str, kind: int = INTERNAL, **attributes) -> Optional[Span]:
+        """Open a leaf span the caller finishes itself (for callback-style hooks)"""
+        parent = _current_span.get()
+        if parent is None or len(parent.spans) >= self.max_spans:
+            return None
+        return Span(name, kind, parent.trace_id, parent.span_id, parent.spans, attributes)
+
+    def export(self, spans: list[Span]):
+        """Hand a finished trace to the writer thread; the event loop never touches the file"""
+        if self._writer is None:
+            with self._lock:
+                if self._writer is None:
+                    self._writer = threading.Thread(target=self._write_loop, name="trace-writer", daemon=True)
+                    self._writer.start()
+                    atexit.register(self.shutdown)
+        self._queue.put(list(spans))
+
+    def _write_loop(self):
+        resource = {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]}
+        with open(self.path, "a", encoding="utf-8") as f:
+            while (spans := self._queue.get()) is not None:
+                try:
+                    line = json.dumps({"resourceSpans": [{
+                        "resource": resource,
+                        "scopeSpans": [{"scope": {"name": "netflux"}, "spans": [encode_span(span) for span in spans]}],
+                    }]}, default=str)
+                    f.write(line + "\n")
+                    f.flush()
+                except Exception:
+                    logger.exception("❌ Could not write trace")
+
+    def shutdown(self):
+        """Flush queued traces and stop the writer thread"""
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join(timeout=5)
+            self._writer = None
+
+def instrument_engine(sync_engine):
+    """Record a span for every SQL statement run through the engine"""
+    from sqlalchemy import event
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def start_query_span(conn, cursor, statement, parameters, context, executemany):
+        span = tracer.start_span(
+            "db.query", CLIENT,
+            **{"db.system": conn.dialect.name, "db.statement": statement[:500], "db.executemany": executemany},
+        )
+        if span is not None and context is not None:
+            context._trace_span = span
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def finish_query_span(conn, cursor, statement, parameters, context, executemany):
+        span = getattr(context, "_trace_span", None)
+        if span is not None:
+            if cursor.rowcount is not None and cursor.rowcount >= 0:
+                span.set(**{"db.rows": cursor.rowcount})
+            span.finish()
+            context._trace_span = None
+
+    @event.listens_for(sync_engine, "handle_error")
+    def fail_query_span(exception_context):
+        context = exception_context.execution_context
+        span = getattr(context, "_trace_span", None)
+        if span is not None:
+            span.finish(exception_context.original_exception)
+            context._trace_span = None
+
+class RequestIdFilter(logging.Filter):
+    """Tag log records made while handling a request with its id"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        request_id = request_id_var.get()
+        if request_id is not None and not hasattr(record, "request_id"):
+            record.request_id = request_id
+        return True
+
+class TracingMiddleware:
+    """Assigns every request an id (echoed as X-Request-ID) and, when tracing is on, a root span"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")
+        request_id = incoming if REQUEST_ID_PATTERN.match(incoming) else secrets.token_hex(16)
+        token = request_id_var.set(request_id)
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (b"x-request-id", request_id.encode())]
+                root.set(**{"http.status_code": message["status"]})
+            await send(message)
+
+        try:
+            with tracer.start_trace(
+                f"{scope['method']} {scope['path']}", kind=SERVER,
+                **{"http.method": scope["method"], "http.target": scope["path"], "http.request_id": request_id},
+            ) as root:
+                await self.app(scope, receive, send_with_request_id)
+                # Name by route template so traces group, e.g. GET /api/episodes/{episode_id}
+                route = scope.get("route")
+                if isinstance(root, Span) and getattr(route, "path", None):
+                    root.name = f"{scope['method']} {route.path}"
+                    root.set(**{"http.route": route.path})
+        finally:
+            request_id_var.reset(token)
+
+# Global instance
+tracer = Tracer(
+    enabled=os.getenv("TRACING_ENABLED", "false").lower() == "true",
+    path=os.getenv("TRACE_FILE", "traces.jsonl"),
+    sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", "1.0")),
+    max_spans=int(os.getenv("TRACE_MAX_SPANS", "1000")),
+)
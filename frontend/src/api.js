@@ -36,16 +36,21 @@ class ApiService {
     });
   }
 
-  async getEpisodes() {
-    return this.request('/api/episodes');
+  async getEpisodes({ limit, cursor, fields } = {}) {
+    const params = new URLSearchParams();
+    if (limit) params.set('limit', limit);
+    if (cursor) params.set('cursor', cursor);
+    if (fields) params.set('fields', fields);
+    const query = params.toString();
+    return this.request(`/api/episodes${query ? `?${query}` : ''}`);
   }
 
   async getEpisode(episodeId) {
     return this.request(`/api/episodes/${episodeId}`);
   }
 
-  async deleteEpisode(episodeId) {
-    return this.request(`/api/episodes/${episodeId}`, {
+  async deleteEpisode(episodeId, { archive = false } = {}) {
+    return this.request(`/api/episodes/${episodeId}${archive ? '?archive=true' : ''}`, {
       method: 'DELETE',
     });
   }
@@ -62,16 +67,85 @@ class ApiService {
     });
   }
 
-  async clearAllEpisodes() {
-    return this.request('/api/admin/episodes', {
+  async getEpisodeCount() {
+    return this.request('/api/admin/episodes/count');
+  }
+
+  async clearAllEpisodes({ archive = false } = {}) {
+    return this.request(`/api/admin/episodes${archive ? '?archive=true' : ''}`, {
       method: 'DELETE',
     });
   }
 
+  // Images
+  imageUrl(path) {
+    return `${API_BASE_URL}${path}`;
+  }
+
+  imageSrcSet(variants) {
+    if (!variants || !variants.sources || variants.sources.length === 0) {
+      return undefined;
+    }
+    return variants.sources
+      .map((source) => `${this.imageUrl(source.url)} ${source.width}w`)
+      .join(', ');
+  }
+
   // Status endpoint
   async getStatus() {
     return this.request('/api/status');
   }
+
+  // Live updates: calls onEvent(type, data) for every pushed event and
+  // returns a function that closes the stream. EventSource reconnects by
+  // itself and resumes from the last event id it saw; since events can still
+  // be missed while disconnected (a restart, another worker), every reconnect
+  // is also reported as a 'resync' so views refetch what they show.
+  subscribeToEvents(onEvent) {
+    const types = [
+      'episode_created',
+      'title_ready',
+      'description_ready',
+      'image_ready',
+      'episode_updated',
+      'episode_deleted',
+      'episodes_cleared',
+      'submissions_toggled',
+      'resync',
+    ];
+    let source = null;
+    let retryTimer = null;
+    let connectedBefore = false;
+    let closed = false;
+
+    const connect = () => {
+      source = new EventSource(`${API_BASE_URL}/api/events`);
+      types.forEach((type) => {
+        source.addEventListener(type, (message) => {
+          onEvent(type, JSON.parse(message.data).data);
+        });
+      });
+      source.onopen = () => {
+        if (connectedBefore) {
+          onEvent('resync', {});
+        }
+        connectedBefore = true;
+      };
+      source.onerror = () => {
+        // A failed response (rather than a dropped connection) is not retried by the browser
+        if (source.readyState === EventSource.CLOSED && !closed) {
+          retryTimer = setTimeout(connect, 5000);
+        }
+      };
+    };
+
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      source.close();
+    };
+  }
 }
 
 const apiService = new ApiService();
@@ -2,9 +2,15 @@ import React, { useState, useEffect } from 'react';
 import { Settings, Eye, EyeOff, Trash2, RefreshCw } from 'lucide-react';
 import ApiService from '../api';
 
+const PAGE_SIZE = 100;
+const ADMIN_FIELDS = 'id,title,description,submitted_by,timestamp';
+
 const Admin = () => {
   const [settings, setSettings] = useState({ is_submission_open: true });
   const [episodes, setEpisodes] = useState([]);
+  const [episodeCount, setEpisodeCount] = useState(0);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
 
@@ -15,12 +21,15 @@ const Admin = () => {
   const loadData = async () => {
     try {
       setLoading(true);
-      const [settingsData, episodesData] = await Promise.all([
+      const [settingsData, episodesData, countData] = await Promise.all([
         ApiService.getAdminSettings(),
-        ApiService.getEpisodes()
+        ApiService.getEpisodes({ limit: PAGE_SIZE, fields: ADMIN_FIELDS }),
+        ApiService.getEpisodeCount()
       ]);
       setSettings(settingsData);
-      setEpisodes(episodesData);
+      setEpisodes(episodesData.items);
+      setNextCursor(episodesData.next_cursor);
+      setEpisodeCount(countData.count);
       setError('');
     } catch (err) {
       setError(`Error loading data: ${err.message}`);
@@ -29,6 +38,19 @@ const Admin = () => {
     }
   };
 
+  const loadMoreEpisodes = async () => {
+    try {
+      setLoadingMore(true);
+      const page = await ApiService.getEpisodes({ limit: PAGE_SIZE, cursor: nextCursor, fields: ADMIN_FIELDS });
+      setEpisodes((current) => [...current, ...page.items]);
+      setNextCursor(page.next_cursor);
+    } catch (err) {
+      setError(`Error loading more episodes: ${err.message}`);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const toggleSubmissions = async () => {
     try {
       const newSettings = await ApiService.updateAdminSettings({
@@ -45,6 +67,8 @@ const Admin = () => {
       try {
         await ApiService.clearAllEpisodes();
         setEpisodes([]);
+        setNextCursor(null);
+        setEpisodeCount(0);
       } catch (err) {
         setError(`Error clearing episodes: ${err.message}`);
       }
@@ -55,6 +79,7 @@ const Admin = () => {
     try {
       await ApiService.deleteEpisode(episodeId);
       setEpisodes(episodes.filter(ep => ep.id !== episodeId));
+      setEpisodeCount((count) => Math.max(count - 1, 0));
     } catch (err) {
       setError(`Error deleting episode: ${err.message}`);
     }
@@ -132,7 +157,7 @@ const Admin = () => {
         </div>
 
         <div className="text-sm text-gray-400 mb-4">
-          Total Episodes: {episodes.length}
+          Total Episodes: {episodeCount}
         </div>
 
         {episodes.length === 0 ? (
@@ -166,6 +191,18 @@ const Admin = () => {
             ))}
           </div>
         )}
+
+        {nextCursor && (
+          <div className="mt-4 text-center">
+            <button
+              onClick={loadMoreEpisodes}
+              disabled={loadingMore}
+              className="bg-gray-800 hover:bg-gray-700 disabled:opacity-50 px-6 py-2 rounded"
+            >
+              {loadingMore ? 'Loading...' : `Load More (${episodes.length} of ${episodeCount} shown)`}
+            </button>
+          </div>
+        )}
       </div>
     </div>
   );
@@ -1,6 +1,6 @@
 import React, { useState, useEffect, useCallback } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
-import { ArrowLeft, Star, Clock, Calendar, User } from 'lucide-react';
+import { ArrowLeft, ChevronLeft, ChevronRight, Star, Clock, Calendar, User } from 'lucide-react';
 import ApiService from '../api';
 
 const EpisodeDetails = () => {
@@ -13,23 +13,9 @@ const EpisodeDetails = () => {
   const loadEpisode = useCallback(async () => {
     try {
       setLoading(true);
-      try {
-        // Try to get the specific episode first
-        const episode = await ApiService.getEpisode(id);
-        setEpisode(episode);
-        setError('');
-      } catch (specificError) {
-        // If the specific endpoint doesn't exist, fall back to getting all episodes
-        const episodes = await ApiService.getEpisodes();
-        const foundEpisode = episodes.find(ep => ep.id === parseInt(id));
-        
-        if (foundEpisode) {
-          setEpisode(foundEpisode);
-          setError('');
-        } else {
-          setError('Episode not found');
-        }
-      }
+      const episode = await ApiService.getEpisode(id);
+      setEpisode(episode);
+      setError('');
     } catch (err) {
       setError(`Error loading episode: ${err.message}`);
     } finally {
@@ -41,14 +27,31 @@ const EpisodeDetails = () => {
     loadEpisode();
   }, [loadEpisode]);
 
+  // Pick up the title, description and image as generation finishes them, and
+  // refetch after a reconnect or bulk change in case this episode's events were missed
+  useEffect(() => {
+    return ApiService.subscribeToEvents((type, data) => {
+      const missedEvents = type === 'resync' || type === 'episodes_cleared';
+      if (missedEvents || (data.id === Number(id) && type !== 'episode_created')) {
+        ApiService.getEpisode(id).then(setEpisode).catch(() => {});
+      }
+    });
+  }, [id]);
+
   const generatePreviewImage = (episode) => {
     // If episode has an image_url, use it
     if (episode.image_url) {
       return (
         <img 
-          src={`${process.env.REACT_APP_API_BASE_URL || 'https://netflux-production.up.railway.app'}${episode.image_url}`} 
+          src={ApiService.imageUrl(episode.image_url)}
+          srcSet={ApiService.imageSrcSet(episode.image_variants)}
+          sizes="(min-width: 1024px) 50vw, 100vw"
           alt={episode.title}
           className="w-full h-full object-cover"
+          style={episode.image_variants?.placeholder ? {
+            backgroundImage: `url(${episode.image_variants.placeholder})`,
+            backgroundSize: 'cover',
+          } : undefined}
           onError={(e) => {
             // Fallback to gradient if image fails to load
             e.target.style.display = 'none';
@@ -146,8 +149,8 @@ const EpisodeDetails = () => {
 
   return (
     <div className="max-w-6xl mx-auto p-6">
-      {/* Back Button */}
-      <div className="mb-6">
+      {/* Back Button and episode navigation */}
+      <div className="mb-6 flex items-center justify-between">
         <button
           onClick={() => navigate('/')}
           className="flex items-center space-x-2 text-gray-400 hover:text-white transition-colors"
@@ -155,6 +158,26 @@ const EpisodeDetails = () => {
           <ArrowLeft size={20} />
           <span>Back to Episodes</span>
         </button>
+        <div className="flex items-center space-x-4 text-sm">
+          {episode.prev_id && (
+            <button
+              onClick={() => navigate(`/episodes/${episode.prev_id}`)}
+              className="flex items-center space-x-1 text-gray-400 hover:text-white transition-colors"
+            >
+              <ChevronLeft size={16} />
+              <span>Newer</span>
+            </button>
+          )}
+          {episode.next_id && (
+            <button
+              onClick={() => navigate(`/episodes/${episode.next_id}`)}
+              className="flex items-center space-x-1 text-gray-400 hover:text-white transition-colors"
+            >
+              <span>Older</span>
+              <ChevronRight size={16} />
+            </button>
+          )}
+        </div>
       </div>
 
       {/* Episode Hero Section */}
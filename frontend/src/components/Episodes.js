@@ -3,21 +3,38 @@ import { useNavigate } from 'react-router-dom';
 import { Star } from 'lucide-react';
 import ApiService from '../api';
 
+const PAGE_SIZE = 30;
+
 const Episodes = () => {
   const navigate = useNavigate();
   const [episodes, setEpisodes] = useState([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     loadEpisodes();
+    // Apply pushed changes instead of re-fetching the list
+    return ApiService.subscribeToEvents((type, data) => {
+      if (type === 'episode_created') {
+        setEpisodes((current) => [data, ...current.filter((episode) => episode.id !== data.id)]);
+      } else if (type === 'episode_deleted') {
+        setEpisodes((current) => current.filter((episode) => !data.ids.includes(episode.id)));
+      } else if (type === 'episodes_cleared' || type === 'resync') {
+        loadEpisodes();
+      } else if (data.id !== undefined) {
+        setEpisodes((current) => current.map((episode) => (episode.id === data.id ? data : episode)));
+      }
+    });
   }, []);
 
   const loadEpisodes = async () => {
     try {
       setLoading(true);
-      const data = await ApiService.getEpisodes();
-      setEpisodes(data);
+      const page = await ApiService.getEpisodes({ limit: PAGE_SIZE, fields: 'summary' });
+      setEpisodes(page.items);
+      setNextCursor(page.next_cursor);
       setError('');
     } catch (err) {
       setError(`Error loading episodes: ${err.message}`);
@@ -26,15 +43,36 @@ const Episodes = () => {
     }
   };
 
+  const loadMoreEpisodes = async () => {
+    try {
+      setLoadingMore(true);
+      const page = await ApiService.getEpisodes({ limit: PAGE_SIZE, cursor: nextCursor, fields: 'summary' });
+      setEpisodes((current) => [...current, ...page.items]);
+      setNextCursor(page.next_cursor);
+    } catch (err) {
+      setError(`Error loading episodes: ${err.message}`);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
 
   const generatePreviewImage = (episode) => {
     // If episode has an image_url, use it
     if (episode.image_url) {
       return (
         <img 
-          src={`${process.env.REACT_APP_API_BASE_URL || 'https://netflux-production.up.railway.app'}${episode.image_url}`}
+          src={ApiService.imageUrl(episode.image_url)}
+          srcSet={ApiService.imageSrcSet(episode.image_variants)}
+          sizes="(min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw"
+          loading="lazy"
+          decoding="async"
           alt={episode.title}
           className="w-full h-full object-cover"
+          style={episode.image_variants?.placeholder ? {
+            backgroundImage: `url(${episode.image_variants.placeholder})`,
+            backgroundSize: 'cover',
+          } : undefined}
           onError={(e) => {
             // Fallback to gradient if image fails to load
             e.target.style.display = 'none';
@@ -164,7 +202,7 @@ const Episodes = () => {
                   
                   <h3 className="font-semibold text-lg mb-2 line-clamp-2">{episode.title}</h3>
                   <p className="text-gray-400 text-sm line-clamp-3 mb-3">
-                    {episode.comedy_description || episode.description}
+                    {episode.teaser}
                   </p>
                   
                   <div className="flex items-center justify-between text-xs text-gray-500">
@@ -181,6 +219,18 @@ const Episodes = () => {
           })}
         </div>
       )}
+
+      {nextCursor && (
+        <div className="mt-8 text-center">
+          <button
+            onClick={loadMoreEpisodes}
+            disabled={loadingMore}
+            className="bg-gray-800 hover:bg-gray-700 disabled:opacity-50 px-6 py-2 rounded"
+          >
+            {loadingMore ? 'Loading...' : 'Load More Episodes'}
+          </button>
+        </div>
+      )}
     </div>
   );
 };